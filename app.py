@@ -1,8 +1,9 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from functools import lru_cache
+from collections import namedtuple
 import json
 import re
 import sqlite3
@@ -11,12 +12,21 @@ import signal
 import sys
 from datetime import datetime
 import html
+import math
 import re as _re
 from logger import logger
 from markdown_utils import markdown_to_html, validate_markdown
 from auth import require_auth, get_auth
 from database_manager import get_db_manager
 from config_manager import get_config_manager
+from date_utils import normalize_date, normalize_datetime, migrate_task_dates, format_date_ru, format_datetime_ru
+from index_advisor import register_hot_query, run_index_advisor
+from instrumentation import get_instrumentation, timed_phase
+import metrics
+from metrics import get_metrics_registry
+from slow_query_log import get_slow_query_log
+from job_scheduler import get_job_scheduler
+from leader_election import get_leader_elector
 
 app = Flask(__name__)
 # Генерируем секретный ключ для сессий и CSRF
@@ -27,6 +37,8 @@ app.secret_key = os.environ.get('SECRET_KEY', 'todolite_secret_key_2025_change_i
 # Включите её в config.json, добавив "security": {"csrf_enabled": true}
 try:
     config_manager = get_config_manager()
+    # Уровень, формат и приемники логов (секция logging)
+    logger.configure(**config_manager.get_logging_config())
     security_config = config_manager.get('security', {})
     csrf_enabled = security_config.get('csrf_enabled', False)  # По умолчанию ОТКЛЮЧЕНО для совместимости
 except Exception as e:
@@ -66,6 +78,13 @@ limiter = Limiter(
     storage_uri="memory://"
 )
 
+# Время запросов по фазам (db, render, markdown, config) и заголовок Server-Timing
+instrumentation = get_instrumentation()
+instrumentation.init_app(app)
+
+# Счетчики и гистограммы HTTP-запросов для /metrics
+metrics.init_app(app)
+
 # Настройка security headers
 @app.after_request
 def set_security_headers(response):
@@ -100,6 +119,31 @@ def signal_handler(signum, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
+# Горячие запросы (проверяются index_advisor при старте)
+ACTIVE_TASKS_SQL = "SELECT * FROM tasks WHERE archived = 0 ORDER BY created_at DESC"
+
+# Комментарии коррелированным подзапросом: порядок берется из idx_tasks_archive без сортировки
+ARCHIVED_TASKS_SQL = """
+    SELECT 
+        t.*,
+        (SELECT GROUP_CONCAT(tc.comment, ' ') FROM task_comments tc WHERE tc.task_id = t.id) as comments
+    FROM tasks t 
+    WHERE t.archived = 1 
+    ORDER BY t.archived_at DESC
+"""
+
+TAG_COUNTS_SQL = """
+    SELECT tags, COUNT(*) as count 
+    FROM tasks 
+    WHERE tags IS NOT NULL AND tags != '' 
+    GROUP BY tags
+    ORDER BY count DESC, tags ASC
+"""
+
+register_hot_query('active_tasks', ACTIVE_TASKS_SQL, source='app')
+register_hot_query('archived_tasks', ARCHIVED_TASKS_SQL, source='app')
+register_hot_query('tag_counts', TAG_COUNTS_SQL, source='app')
+
 # Инициализация базы данных
 def init_db():
     conn = sqlite3.connect('tasks.db')
@@ -125,7 +169,8 @@ def init_db():
             ('due_date', 'DATE'),
             ('reminder_time', 'DATETIME'),
             ('tags', 'TEXT'),
-            ('completed_at', 'TIMESTAMP')
+            ('completed_at', 'TIMESTAMP'),
+            ('next_migration_at', 'TEXT')
         ]
         
         for col_name, col_type in new_columns:
@@ -156,7 +201,8 @@ def init_db():
                       completed_at TIMESTAMP,
                       archived BOOLEAN DEFAULT 0,
                       archived_at TIMESTAMP,
-                      archived_from_status TEXT)''')
+                      archived_from_status TEXT,
+                      next_migration_at TEXT)''')
     
     # Создаем таблицу комментариев
     c.execute('''CREATE TABLE IF NOT EXISTS task_comments
@@ -187,38 +233,71 @@ def init_db():
                 except sqlite3.OperationalError as e:
                     logger.warning(f"Не удалось добавить поле {col_name}: {e}", "MIGRATION")
     
-    # Создаем индексы для оптимизации запросов (только если колонки существуют)
-    if table_exists:
-        c.execute("PRAGMA table_info(tasks)")
-        columns = [column[1] for column in c.fetchall()]
-        
-        # Создаем индексы только для существующих колонок
-        indexes = []
-        if 'archived' in columns:
-            indexes.append(("idx_tasks_archived", "tasks", "archived"))
-        if 'status' in columns:
-            indexes.append(("idx_tasks_status", "tasks", "status"))
-        if 'due_date' in columns:
-            indexes.append(("idx_tasks_due_date", "tasks", "due_date"))
-        if 'scheduled_date' in columns:
-            indexes.append(("idx_tasks_scheduled_date", "tasks", "scheduled_date"))
-        if 'created_at' in columns:
-            indexes.append(("idx_tasks_created_at", "tasks", "created_at"))
-        
-        # Проверяем существование таблицы комментариев
-        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='task_comments'")
-        if c.fetchone():
-            indexes.append(("idx_task_comments_task_id", "task_comments", "task_id"))
-        
-        for index_name, table_name, column_name in indexes:
-            try:
-                c.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_name})")
-                logger.database(f"Создан индекс {index_name} на {table_name}.{column_name}", "MIGRATION")
-            except sqlite3.OperationalError as e:
-                logger.warning(f"Ошибка создания индекса {index_name}: {e}", "MIGRATION")
+    # Триггеры, помечающие задачу к проверке миграцией категорий при изменении дат
+    from category_migration_manager import ensure_migration_schema
+    ensure_migration_schema(conn)
+    
+    # Создаем индексы для оптимизации запросов (только если колонки существуют;
+    # в том числе для только что созданной таблицы)
+    c.execute("PRAGMA table_info(tasks)")
+    columns = [column[1] for column in c.fetchall()]
+    
+    # Создаем индексы только для существующих колонок
+    indexes = []
+    # Индексы под составные запросы (частичные, по выражениям) создает index_advisor
+    if 'status' in columns:
+        indexes.append(("idx_tasks_status", "tasks", "status"))
+    if 'due_date' in columns:
+        indexes.append(("idx_tasks_due_date", "tasks", "due_date"))
+    if 'scheduled_date' in columns:
+        indexes.append(("idx_tasks_scheduled_date", "tasks", "scheduled_date"))
+    if 'reminder_time' in columns:
+        indexes.append(("idx_tasks_reminder_time", "tasks", "reminder_time"))
+    if 'created_at' in columns:
+        indexes.append(("idx_tasks_created_at", "tasks", "created_at"))
+    
+    # Проверяем существование таблицы комментариев
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='task_comments'")
+    if c.fetchone():
+        indexes.append(("idx_task_comments_task_id", "task_comments", "task_id"))
+    
+    for index_name, table_name, column_name in indexes:
+        try:
+            c.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({column_name})")
+            logger.database(f"Создан индекс {index_name} на {table_name}.{column_name}", "MIGRATION")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Ошибка создания индекса {index_name}: {e}", "MIGRATION")
+    
+    # Миграции данных, выполняемые один раз (версия хранится в PRAGMA user_version)
+    c.execute("PRAGMA user_version")
+    schema_version = c.fetchone()[0]
+    if schema_version < 1:
+        # Даты в каноническом виде ('YYYY-MM-DD', 'YYYY-MM-DDTHH:MM', NULL вместо '')
+        migrate_task_dates(c)
+        c.execute("PRAGMA user_version = 1")
     
     conn.commit()
     conn.close()
+    
+    # Триггеры журнала изменений - под схему после добавления колонок (или снять, если журнал отключен)
+    try:
+        from backup_manager import BackupManager
+        from change_journal import STALE_PENDING_SECONDS
+        journal = BackupManager().journal
+        journal.sync()
+        # Записи удаляет только задача journal_ship ведущего процесса
+        pending_age = journal.pending_age_seconds() if journal.enabled else None
+        if pending_age and pending_age > STALE_PENDING_SECONDS:
+            logger.warning(f"Журнал изменений не отгружался {pending_age / 60:.0f} мин: отгрузку выполняет "
+                           f"ведущий процесс (python -m todolite serve или трей) с планировщиками", "JOURNAL")
+    except Exception as e:
+        logger.error(f"Ошибка настройки журнала изменений: {e}", "JOURNAL")
+    
+    # Индексы под горячие запросы и отчет по их планам
+    try:
+        run_index_advisor('tasks.db')
+    except Exception as e:
+        logger.error(f"Ошибка проверки индексов: {e}", "INDEX")
 
 # Получить все задачи (исключая архивированные)
 def get_tasks():
@@ -226,10 +305,7 @@ def get_tasks():
     # Проверяем наличие колонки archived для обратной совместимости
     try:
         # Пытаемся выполнить запрос с проверкой archived
-        tasks = db.execute_query(
-            "SELECT * FROM tasks WHERE (archived = 0 OR archived IS NULL) ORDER BY created_at DESC",
-            fetch=True
-        )
+        tasks = db.execute_query(ACTIVE_TASKS_SQL, fetch=True)
     except sqlite3.OperationalError:
         # Если колонка archived отсутствует, получаем все задачи
         logger.warning("Колонка 'archived' отсутствует, получаем все задачи", "MIGRATION")
@@ -276,17 +352,37 @@ def _clean_json(text: str) -> str:
     text = re.sub(r",\s*(\}|\])", r"\1", text)
     return text
 
+# Кэш config.json: файл перечитывается только при изменении (mtime и размер)
+_config_cache = {'key': None, 'config': None, 'hits': 0, 'misses': 0}
+CacheInfo = namedtuple('CacheInfo', 'hits misses currsize')
+
+def _config_cache_info():
+    return CacheInfo(_config_cache['hits'], _config_cache['misses'], 1 if _config_cache['config'] is not None else 0)
+
+get_metrics_registry().register_cache('config', _config_cache_info)
+
+@timed_phase('config')
 def load_config():
-    """Загружает конфигурацию из config.json"""
+    """Загружает конфигурацию из config.json (с кэшем до изменения файла)"""
     try:
-        with open('config.json', 'r', encoding='utf-8') as f:
+        path = os.path.abspath('config.json')
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if _config_cache['key'] == key:
+            _config_cache['hits'] += 1
+            return _config_cache['config']
+        _config_cache['misses'] += 1
+        with open(path, 'r', encoding='utf-8') as f:
             raw = f.read()
-            try:
-                return json.loads(raw)
-            except Exception:
-                # Пытаемся почистить и распарсить с мягкой толерантностью к комментам/висячим запятым
-                cleaned = _clean_json(raw)
-                return json.loads(cleaned)
+        try:
+            config = json.loads(raw)
+        except Exception:
+            # Пытаемся почистить и распарсить с мягкой толерантностью к комментам/висячим запятым
+            cleaned = _clean_json(raw)
+            config = json.loads(cleaned)
+        _config_cache['key'] = key
+        _config_cache['config'] = config
+        return config
     except Exception:
         return {
             "statuses_order": ["new","think","later","waiting","working","tracking","done","cancelled"],
@@ -300,60 +396,7 @@ def load_config():
         }
 
 
-# Фильтр Jinja для форматирования даты в российском формате (ДД.ММ.ГГГГ)
-def format_date_ru(value: str):
-    if not value:
-        return ''
-    try:
-        # Попытка ISO с временем
-        # Обрезаем возможные микросекунды/таймзону
-        cleaned = str(value).strip()
-        # Если только дата
-        try:
-            dt = datetime.strptime(cleaned[:10], '%Y-%m-%d')
-            return dt.strftime('%d.%m.%Y')
-        except Exception as e:
-            logger.debug(f"Ошибка форматирования даты: {e}", "FORMAT")
-        # Дата+время
-        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f'):
-            try:
-                dt = datetime.strptime(cleaned[:26], fmt)
-                return dt.strftime('%d.%m.%Y')
-            except Exception:
-                continue
-        # Последняя попытка: fromisoformat если доступно
-        try:
-            dt = datetime.fromisoformat(cleaned)
-            return dt.strftime('%d.%m.%Y')
-        except Exception:
-            return cleaned
-    except Exception:
-        return ''
-
-
-def format_datetime_ru(value: str):
-    """Форматирует дату и время в русском формате"""
-    if not value:
-        return ''
-    try:
-        cleaned = str(value).strip()
-        # Попытка ISO с временем
-        for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f'):
-            try:
-                dt = datetime.strptime(cleaned[:26], fmt)
-                return dt.strftime('%d.%m.%Y %H:%M')
-            except Exception:
-                continue
-        # Последняя попытка: fromisoformat если доступно
-        try:
-            dt = datetime.fromisoformat(cleaned)
-            return dt.strftime('%d.%m.%Y %H:%M')
-        except Exception:
-            return cleaned
-    except Exception:
-        return ''
-
-# Регистрируем фильтры в Jinja
+# Регистрируем фильтры в Jinja (форматирование дат с кэшем - см. date_utils)
 app.jinja_env.filters['ru_date'] = format_date_ru
 app.jinja_env.filters['ru_datetime'] = format_datetime_ru
 
@@ -477,18 +520,33 @@ def get_task_with_comments(task_id):
     
     return task, comments
 
+# Перенести задачу в колонку по ее датам сразу после записи (не дожидаясь планировщика)
+def apply_category_migration(task_id):
+    try:
+        from category_migration_manager import get_migration_manager
+        return get_migration_manager().migrate_task(task_id)
+    except Exception as e:
+        logger.error(f"Ошибка пересчета категории задачи #{task_id}: {e}", "MIGRATION")
+        return None
+
 # Добавить новую задачу
 def add_task(title, short_description, full_description, status, priority, eisenhower_priority, 
              assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags):
+    # Даты сохраняются в каноническом виде (ValueError при некорректной дате)
+    scheduled_date = normalize_date(scheduled_date)
+    due_date = normalize_date(due_date)
+    reminder_time = normalize_datetime(reminder_time)
+    
     logger.task(f"Создание новой задачи: '{title[:30]}...'", "CREATE")
     logger.database(f"Сохранение в БД: assigned_to='{assigned_to}', threads='{related_threads}'", "DB_WRITE")
     
     db = get_db_manager()
-    db.execute_query("""INSERT INTO tasks (title, short_description, full_description, status, priority, 
+    task_id = db.execute_query("""INSERT INTO tasks (title, short_description, full_description, status, priority, 
                  eisenhower_priority, assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags) 
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
               (title, short_description, full_description, status, priority, eisenhower_priority,
                assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags))
+    apply_category_migration(task_id)
     
     # Очищаем кэш тегов при изменении задач
     _get_cached_tags.cache_clear()
@@ -498,6 +556,11 @@ def add_task(title, short_description, full_description, status, priority, eisen
 # Обновить задачу
 def update_task(task_id, title, short_description, full_description, status, priority, 
                 eisenhower_priority, assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags):
+    # Даты сохраняются в каноническом виде (ValueError при некорректной дате)
+    scheduled_date = normalize_date(scheduled_date)
+    due_date = normalize_date(due_date)
+    reminder_time = normalize_datetime(reminder_time)
+    
     logger.task(f"Обновление задачи ID {task_id}: '{title[:30]}...'", "UPDATE")
     logger.database(f"Обновление в БД: status='{status}', threads='{related_threads}', reminder_time='{reminder_time}'", "DB_WRITE")
     
@@ -529,6 +592,7 @@ def update_task(task_id, title, short_description, full_description, status, pri
             assigned_to, related_threads, tags, scheduled_date, due_date, reminder_time, status, task_id
         )
     )
+    apply_category_migration(task_id)
     
     # Очищаем кэш тегов при изменении задач
     _get_cached_tags.cache_clear()
@@ -636,6 +700,7 @@ def restore_task(task_id):
                 status = ?
             WHERE id = ?
         """, (original_status, task_id))
+    apply_category_migration(task_id)
     
     # Очищаем кэш тегов при изменении задач
     _get_cached_tags.cache_clear()
@@ -654,16 +719,7 @@ def get_archived_tasks():
     
     # Проверяем наличие колонки archived_at для сортировки
     if db._check_column_exists('tasks', 'archived_at'):
-        tasks = db.execute_query("""
-            SELECT 
-                t.*,
-                GROUP_CONCAT(tc.comment, ' ') as comments
-            FROM tasks t 
-            LEFT JOIN task_comments tc ON t.id = tc.task_id
-            WHERE t.archived = 1 
-            GROUP BY t.id
-            ORDER BY t.archived_at DESC
-        """, fetch=True)
+        tasks = db.execute_query(ARCHIVED_TASKS_SQL, fetch=True)
     else:
         # Старая БД без archived_at - сортируем по created_at
         tasks = db.execute_query("""
@@ -728,15 +784,17 @@ def add_task_route():
     due_date = request.form.get('due_date', '')
     reminder_time = request.form.get('reminder_time', '')
     
-    # Отладочная информация
-    logger.form(f"related_threads = '{related_threads}'", "FORM_DATA")
-    logger.form(f"assigned_to = '{assigned_to}'", "FORM_DATA")
-    logger.form(f"scheduled_date = '{scheduled_date}'", "FORM_DATA")
-    logger.form(f"due_date = '{due_date}'", "FORM_DATA")
-    logger.form(f"reminder_time = '{reminder_time}'", "FORM_DATA")
+    # Отладочная информация (форматируется только при уровне DEBUG)
+    logger.form("related_threads = '%s', assigned_to = '%s', scheduled_date = '%s', due_date = '%s', "
+                "reminder_time = '%s'", "FORM_DATA",
+                related_threads, assigned_to, scheduled_date, due_date, reminder_time)
     
-    add_task(title, short_description, full_description, status, priority, eisenhower_priority,
-             assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags)
+    try:
+        add_task(title, short_description, full_description, status, priority, eisenhower_priority,
+                 assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags)
+    except ValueError as e:
+        logger.warning(f"Некорректная дата в новой задаче: {e}", "INVALID_DATE")
+        flash(f"Задача не создана: {e}", 'error')
     return redirect(url_for('index'))
 
 @app.route('/update_task/<int:task_id>', methods=['POST'])
@@ -758,13 +816,17 @@ def update_task_route(task_id):
     due_date = request.form.get('due_date', '')
     reminder_time = request.form.get('reminder_time', '')
     
-    # Отладочная информация
-    logger.form(f"UPDATE - reminder_time = '{reminder_time}'", "FORM_DATA")
-    logger.form(f"UPDATE - scheduled_date = '{scheduled_date}'", "FORM_DATA")
-    logger.form(f"UPDATE - due_date = '{due_date}'", "FORM_DATA")
+    # Отладочная информация (форматируется только при уровне DEBUG)
+    logger.form("UPDATE - reminder_time = '%s', scheduled_date = '%s', due_date = '%s'", "FORM_DATA",
+                reminder_time, scheduled_date, due_date)
     
-    update_task(task_id, title, short_description, full_description, status, priority,
-                eisenhower_priority, assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags)
+    try:
+        update_task(task_id, title, short_description, full_description, status, priority,
+                    eisenhower_priority, assigned_to, related_threads, scheduled_date, due_date, reminder_time, tags)
+    except ValueError as e:
+        logger.warning(f"Некорректная дата в задаче ID {task_id}: {e}", "INVALID_DATE")
+        flash(f"Изменения не сохранены: {e}", 'error')
+        return redirect(url_for('view_task', task_id=task_id, open_edit=1))
     return redirect(url_for('view_task', task_id=task_id))
 
 @app.route('/add_comment/<int:task_id>', methods=['POST'])
@@ -951,12 +1013,14 @@ def update_task_status():
             END
         WHERE id = ?
     """, (new_status, new_status, task_id))
+    # Даты задачи могут требовать другую колонку - сообщаем клиенту итоговый статус
+    migrated_status = apply_category_migration(task_id)
     
     # Очищаем кэш тегов при изменении задач (на случай если изменились теги)
     _get_cached_tags.cache_clear()
     
-    logger.success(f"Статус задачи ID {task_id} обновлен на '{new_status}'", "STATUS_UPDATE")
-    return {'success': True}
+    logger.success(f"Статус задачи ID {task_id} обновлен на '{migrated_status or new_status}'", "STATUS_UPDATE")
+    return {'success': True, 'status': migrated_status or new_status, 'migrated': migrated_status is not None}
 
 
 @app.route('/api/update_priority', methods=['POST'])
@@ -1027,15 +1091,11 @@ def _get_cached_tags():
     Кэш очищается при изменении задач
     """
     db = get_db_manager()
-    tags_data = db.execute_query("""
-        SELECT tags, COUNT(*) as count 
-        FROM tasks 
-        WHERE tags IS NOT NULL AND tags != '' 
-        GROUP BY tags
-        ORDER BY count DESC, tags ASC
-    """, fetch=True)
+    tags_data = db.execute_query(TAG_COUNTS_SQL, fetch=True)
     return tags_data
 
+get_metrics_registry().register_cache('tags', _get_cached_tags.cache_info)
+
 @app.route('/api/tags')
 def get_tags():
     """API для получения всех тегов с количеством задач"""
@@ -1071,27 +1131,141 @@ def test_api_page():
 @limiter.limit("5 per minute")
 @require_auth
 def migrate_tasks():
-    """Ручной запуск миграции задач"""
+    """Ручной запуск миграции задач (повторный запуск присоединяется к текущему)"""
     try:
         from category_migration_manager import get_migration_manager
         migration_manager = get_migration_manager()
         
         # Запускаем миграцию в отдельном потоке
-        result = {'status': 'started', 'message': 'Миграция запущена'}
-        migration_manager.migrate_tasks_async()
+        job, created = migration_manager.start_migration_job('manual')
+        result = {
+            'status': 'started' if created else 'running',
+            'message': 'Миграция запущена' if created else 'Миграция уже выполняется',
+            'job_id': job.id,
+            'job': job.to_dict()
+        }
         
         return jsonify(result), 202  # 202 Accepted - запрос принят, обработка началась
     except Exception as e:
         logger.error(f"Ошибка при запуске миграции: {e}", "MIGRATION")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# Максимальное время ожидания изменений в /migrate_tasks_status?wait=N, секунды
+MIGRATION_STATUS_MAX_WAIT = 30
+
 @app.route('/migrate_tasks_status', methods=['GET'])
 @require_auth
 def migrate_tasks_status():
-    """Получить статус последней миграции (для будущего использования)"""
-    # Пока просто возвращаем успешный статус
-    # В будущем можно добавить отслеживание статуса миграции
-    return jsonify({'status': 'completed', 'message': 'Миграция выполнена'}), 200
+    """
+    Статус запуска миграции: ?job_id=N (без него - последний запуск).
+    С ?wait=N&since=<version> ответ задерживается до изменения прогресса
+    или завершения, но не дольше N секунд (long-polling).
+    """
+    from category_migration_manager import get_migration_manager
+    migration_manager = get_migration_manager()
+    try:
+        job_id = request.args.get('job_id', type=int)
+        wait = float(request.args.get('wait', 0))
+        if not math.isfinite(wait):
+            # nan не ограничивается min/max и превращает ожидание в цикл без паузы
+            raise ValueError(f"wait={wait}")
+        wait = min(max(wait, 0.0), MIGRATION_STATUS_MAX_WAIT)
+        since = int(request.args.get('since', -1))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Некорректные параметры'}), 400
+    
+    job = migration_manager.get_job(job_id)
+    if job is None:
+        if job_id is None:
+            return jsonify({'status': 'idle', 'message': 'Миграция еще не запускалась'}), 200
+        return jsonify({'status': 'error', 'message': 'Запуск миграции не найден'}), 404
+    
+    if wait and not job.finished:
+        job = migration_manager.wait_for_job(job, since, wait)
+    
+    result = job.to_dict()
+    result['status'] = job.state
+    return jsonify(result), 200
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics_endpoint():
+    """Метрики в текстовом формате Prometheus"""
+    if not get_config_manager().get('metrics.enabled', True):
+        return "Метрики отключены", 404
+    return app.response_class(get_metrics_registry().render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/admin/slow_queries', methods=['GET'])
+@require_auth
+def admin_slow_queries():
+    """Самые медленные отпечатки запросов и последние медленные запросы"""
+    slow_log = get_slow_query_log()
+    if request.args.get('reset'):
+        slow_log.reset()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError:
+        limit = 10
+    return jsonify({
+        'threshold_ms': slow_log.threshold_ms,
+        'top': slow_log.top(limit, request.args.get('order', 'max_ms')),
+        'recent': slow_log.recent(limit)
+    }), 200
+
+@app.route('/api/admin/jobs', methods=['GET'])
+@require_auth
+def admin_jobs():
+    """Фоновые задачи этого процесса, ведущий процесс и история запусков"""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+    except ValueError:
+        limit = 50
+    scheduler = get_job_scheduler()
+    return jsonify({
+        'leader': get_leader_elector().get_status(),
+        'scheduler': scheduler.get_status(),
+        'history': scheduler.get_history(request.args.get('job'), limit)
+    }), 200
+
+@app.route('/api/admin/jobs/<name>/run', methods=['POST'])
+@require_auth
+def admin_run_job(name):
+    """Запуск фоновой задачи вне расписания"""
+    if not get_leader_elector().is_leader:
+        return jsonify({
+            'status': 'error',
+            'message': 'Процесс не ведущий: фоновые задачи запускаются только в ведущем процессе'
+        }), 409
+    if not get_job_scheduler().run_now(name):
+        return jsonify({
+            'status': 'error',
+            'message': 'Задача не запланирована в этом процессе (планировщики работают в ведущем процессе)'
+        }), 404
+    logger.info(f"Задача {name} запущена вручную", "JOBS")
+    return jsonify({'status': 'success'}), 202
+
+@app.route('/api/debug/timings', methods=['GET'])
+@require_auth
+def debug_timings():
+    """Скользящие гистограммы времени: маршруты, фазы, SQL-запросы"""
+    if request.args.get('reset'):
+        instrumentation.reset()
+    profiles = [{key: value for key, value in profile.items() if key != 'report'}
+                for profile in instrumentation.profiles]
+    return jsonify({
+        'settings': instrumentation.settings,
+        'histograms': instrumentation.snapshot(),
+        'profiles': profiles
+    }), 200
+
+@app.route('/api/debug/profiles/<int:profile_id>', methods=['GET'])
+@require_auth
+def debug_profile(profile_id):
+    """Отчет cProfile запроса, выполненного с ?_profile=1"""
+    profile = instrumentation.get_profile(profile_id)
+    if not profile:
+        return jsonify({'status': 'error', 'message': 'Профиль не найден'}), 404
+    return app.response_class(profile['report'], mimetype='text/plain')
 
 if __name__ == '__main__':
     logger.info("Запуск ToDoLite приложения", "STARTUP")
@@ -1099,14 +1273,9 @@ if __name__ == '__main__':
     init_db()
     logger.success("База данных инициализирована", "DB_INIT")
     
-    # Запускаем менеджер миграции категорий
-    try:
-        from category_migration_manager import get_migration_manager
-        migration_manager = get_migration_manager()
-        migration_manager.start_scheduler()
-        logger.success("Менеджер миграции категорий запущен", "MIGRATION")
-    except Exception as e:
-        logger.error(f"Ошибка запуска менеджера миграции категорий: {e}", "MIGRATION")
+    # Запускаем менеджер миграции категорий (если процесс станет ведущим)
+    from todolite import start_schedulers
+    start_schedulers()
     
     logger.http("Запуск Flask сервера на http://0.0.0.0:5000", "SERVER_START")
     app.run(debug=True, host='0.0.0.0', port=5000)
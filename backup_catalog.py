@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Каталог резервных копий (индекс на каждое направление бэкапа)
+"""
+
+import sqlite3
+import os
+import re
+import hashlib
+from datetime import datetime
+from logger import logger
+
+# Имя файла каталога внутри директории направления.
+# Не совпадает с шаблоном имен резервных копий, чтобы не попасть в очистку.
+CATALOG_FILENAME = 'todolite_catalog.sqlite3'
+
+BACKUP_NAME_PATTERN = re.compile(r"^todolite_backup_(\d{8}_\d{6})\.db(\.gz)?$")
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Вычисляет SHA-256 файла потоково."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupCatalog:
+    """
+    Постоянный индекс резервных копий одного направления.
+
+    Хранится в SQLite-файле рядом с копиями и обновляется транзакционно
+    при создании и удалении копий, поэтому поиск последней копии, список
+    копий и ротация не требуют сканирования директории.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.catalog_path = os.path.join(directory, CATALOG_FILENAME)
+
+    def _connect(self):
+        """Открывает каталог, создавая и заполняя его при первом обращении."""
+        is_new = not os.path.exists(self.catalog_path)
+        conn = sqlite3.connect(self.catalog_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('''CREATE TABLE IF NOT EXISTS backups
+                        (name TEXT PRIMARY KEY,
+                         created_at TEXT NOT NULL,
+                         size INTEGER NOT NULL,
+                         sha256 TEXT,
+                         codec TEXT NOT NULL)''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_backups_created_at ON backups(created_at)")
+        conn.execute('''CREATE TABLE IF NOT EXISTS journal_segments
+                        (name TEXT PRIMARY KEY,
+                         first_ts INTEGER NOT NULL,
+                         last_ts INTEGER NOT NULL,
+                         entries INTEGER NOT NULL,
+                         size INTEGER NOT NULL)''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_segments_last_ts ON journal_segments(last_ts)")
+        conn.commit()
+        if is_new:
+            self._import_existing(conn)
+        return conn
+
+    def _import_existing(self, conn):
+        """Однократно переносит в каталог копии, созданные до его появления."""
+        imported = 0
+        try:
+            for name in os.listdir(self.directory):
+                m = BACKUP_NAME_PATTERN.match(name)
+                if not m:
+                    continue
+                try:
+                    ts = datetime.strptime(m.group(1), "%Y%m%d_%H%M%S")
+                    full_path = os.path.join(self.directory, name)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO backups (name, created_at, size, sha256, codec) VALUES (?, ?, ?, ?, ?)",
+                        (name, ts.strftime(TIMESTAMP_FORMAT), os.path.getsize(full_path),
+                         file_sha256(full_path), 'gzip' if m.group(2) else 'none')
+                    )
+                    imported += 1
+                except Exception as e:
+                    logger.warning(f"Не удалось добавить {name} в каталог: {e}", "BACKUP")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка первичного заполнения каталога {self.directory}: {e}", "BACKUP")
+        if imported:
+            logger.info(f"Каталог {self.catalog_path} создан, импортировано копий: {imported}", "BACKUP")
+
+    def _row_to_entry(self, row):
+        return {
+            'name': row['name'],
+            'path': os.path.join(self.directory, row['name']),
+            'size': row['size'],
+            'sha256': row['sha256'],
+            'codec': row['codec'],
+            'timestamp': datetime.strptime(row['created_at'], TIMESTAMP_FORMAT)
+        }
+
+    def add(self, name, timestamp, size, sha256, codec):
+        """Регистрирует созданную копию."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO backups (name, created_at, size, sha256, codec) VALUES (?, ?, ?, ?, ?)",
+                    (name, timestamp.strftime(TIMESTAMP_FORMAT), size, sha256, codec)
+                )
+        finally:
+            conn.close()
+
+    def remove(self, name):
+        """Удаляет запись о копии из каталога."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM backups WHERE name = ?", (name,))
+        finally:
+            conn.close()
+
+    def list(self, since=None, until=None, limit=None):
+        """
+        Возвращает копии в порядке убывания времени.
+
+        Args:
+            since: Нижняя граница времени (включительно), datetime или None
+            until: Верхняя граница времени (включительно), datetime или None
+            limit: Максимальное количество записей
+        """
+        query = "SELECT * FROM backups"
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since.strftime(TIMESTAMP_FORMAT))
+        if until is not None:
+            conditions.append("created_at <= ?")
+            params.append(until.strftime(TIMESTAMP_FORMAT))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, name DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        conn = self._connect()
+        try:
+            return [self._row_to_entry(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def latest(self, until=None):
+        """Возвращает самую свежую копию (не позже until) или None."""
+        entries = self.list(until=until, limit=1)
+        return entries[0] if entries else None
+
+    def add_segment(self, name, first_ts, last_ts, entries, size):
+        """Регистрирует сегмент журнала изменений (метки времени в мс epoch)."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO journal_segments (name, first_ts, last_ts, entries, size) VALUES (?, ?, ?, ?, ?)",
+                    (name, first_ts, last_ts, entries, size)
+                )
+        finally:
+            conn.close()
+
+    def remove_segment(self, name):
+        """Удаляет запись о сегменте журнала."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM journal_segments WHERE name = ?", (name,))
+        finally:
+            conn.close()
+
+    def list_segments(self, since_ms=None, until_ms=None, strictly_before=False):
+        """
+        Возвращает сегменты журнала в порядке имен (времени отгрузки).
+
+        Args:
+            since_ms: Сегменты, содержащие записи не раньше этого момента
+            until_ms: Сегменты, содержащие записи не позже этого момента
+            strictly_before: Вернуть только сегменты, целиком старше until_ms
+        """
+        conditions = []
+        params = []
+        if strictly_before:
+            conditions.append("last_ts < ?")
+            params.append(until_ms)
+        else:
+            if since_ms is not None:
+                conditions.append("last_ts >= ?")
+                params.append(since_ms)
+            if until_ms is not None:
+                conditions.append("first_ts <= ?")
+                params.append(until_ms)
+        query = "SELECT * FROM journal_segments"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY name"
+
+        conn = self._connect()
+        try:
+            return [
+                dict(row, path=os.path.join(self.directory, row['name']))
+                for row in conn.execute(query, params)
+            ]
+        finally:
+            conn.close()
+
+    def select_expired(self, max_backups=10, retention=None):
+        """
+        Возвращает копии, которые не попадают под политику хранения.
+
+        Args:
+            max_backups: Сколько последних копий хранить, если retention не задан
+            retention: Политика GFS, например {"hourly": 24, "daily": 30, "weekly": 8, "monthly": 12}
+        """
+        entries = self.list()
+        if retention:
+            keep = set()
+            buckets = {
+                'hourly': lambda ts: ts.strftime('%Y%m%d%H'),
+                'daily': lambda ts: ts.strftime('%Y%m%d'),
+                'weekly': lambda ts: '%d-%02d' % ts.isocalendar()[:2],
+                'monthly': lambda ts: ts.strftime('%Y%m'),
+            }
+            for period, key_func in buckets.items():
+                slots = int(retention.get(period, 0) or 0)
+                if slots <= 0:
+                    continue
+                seen = set()
+                # Записи отсортированы от новых к старым: в каждом периоде остается самая свежая копия
+                for entry in entries:
+                    key = key_func(entry['timestamp'])
+                    if key in seen:
+                        continue
+                    if len(seen) >= slots:
+                        break
+                    seen.add(key)
+                    keep.add(entry['name'])
+            # Самую свежую копию не удаляем никогда
+            if entries:
+                keep.add(entries[0]['name'])
+            return [entry for entry in entries if entry['name'] not in keep]
+
+        if max_backups <= 0:
+            return []
+        return entries[max_backups:]
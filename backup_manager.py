@@ -15,6 +15,19 @@ import threading
 from logger import logger
 import re
 import tempfile
+import hashlib
+from backup_catalog import BackupCatalog
+from change_journal import ChangeJournal, datetime_to_ms, REPLAY_MARGIN_MS
+from metrics import get_metrics_registry
+
+BACKUP_SECONDS = get_metrics_registry().histogram(
+    'todolite_backup_duration_seconds', 'Длительность записи резервной копии', ('destination',))
+BACKUP_BYTES = get_metrics_registry().counter(
+    'todolite_backup_bytes_total', 'Записано байт резервных копий', ('destination',))
+BACKUP_FAILURES = get_metrics_registry().counter(
+    'todolite_backup_failures_total', 'Ошибки записи резервных копий', ('destination',))
+BACKUP_LAST_SUCCESS = get_metrics_registry().gauge(
+    'todolite_backup_last_success_timestamp_seconds', 'Время последней успешной копии (unix)', ('destination',))
 
 class BackupManager:
     """
@@ -27,6 +40,7 @@ class BackupManager:
         self.config = self._load_config()
         self.backup_settings = self.config.get('backup', {})
         self.lock = threading.Lock()  # Для обеспечения атомарности операций с БД
+        self.journal = ChangeJournal(self)
         logger.info("BackupManager инициализирован", "BACKUP")
     
     def _load_config(self):
@@ -116,6 +130,47 @@ class BackupManager:
             logger.error(f"Ошибка получения размера базы данных {self.db_path}: {e}", "BACKUP")
             return 0
     
+    def _write_backup(self, directory, backup_filename, backup_time):
+        """Записывает копию БД в директорию и регистрирует её в каталоге.
+
+        Файл сначала пишется под временным именем и затем атомарно
+        переименовывается, поэтому в каталог попадают только полные копии.
+        Возвращает путь к созданной копии.
+        """
+        compress = self.backup_settings.get('compress', True)
+        dest_name = backup_filename + '.gz' if compress else backup_filename
+        dest_path = os.path.join(directory, dest_name)
+        temp_path = dest_path + '.tmp'
+
+        digest = hashlib.sha256()
+        try:
+            with open(self.db_path, 'rb') as f_in, open(temp_path, 'wb') as raw_out:
+                f_out = _HashingWriter(raw_out, digest)
+                if compress:
+                    with gzip.GzipFile(filename=backup_filename, mode='wb', fileobj=f_out) as gz_out:
+                        shutil.copyfileobj(f_in, gz_out)
+                else:
+                    shutil.copyfileobj(f_in, f_out)
+            shutil.copystat(self.db_path, temp_path)
+            os.replace(temp_path, dest_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        logger.info(f"Файл базы данных скопирован: {self.db_path} -> {dest_path}", "BACKUP")
+        if compress:
+            logger.info(f"Резервная копия сжата: {dest_path}", "BACKUP")
+
+        BackupCatalog(directory).add(
+            dest_name, backup_time, os.path.getsize(dest_path), digest.hexdigest(),
+            'gzip' if compress else 'none'
+        )
+        logger.success(f"Резервная копия успешно создана: {dest_path}", "BACKUP")
+        return dest_path
+
     def create_backup(self):
         """
         Создает резервную копию базы данных.
@@ -134,10 +189,10 @@ class BackupManager:
                 logger.warning("База данных пуста или не существует, резервная копия не создана", "BACKUP")
                 return None
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"todolite_backup_{timestamp}.db"
+            backup_time = datetime.now().replace(microsecond=0)
+            backup_filename = f"todolite_backup_{backup_time.strftime('%Y%m%d_%H%M%S')}.db"
             
-            backup_paths = self._get_backup_paths()
+            backup_paths = self.get_destinations()
             if not backup_paths:
                 logger.error("Не настроены пути для резервного копирования", "BACKUP")
                 return None
@@ -146,23 +201,7 @@ class BackupManager:
             
             for path in backup_paths:
                 try:
-                    dest_path = os.path.join(path, backup_filename)
-                    
-                    # Копируем файл базы данных
-                    shutil.copy2(self.db_path, dest_path)
-                    logger.info(f"Файл базы данных скопирован: {self.db_path} -> {dest_path}", "BACKUP")
-                    
-                    # Если включено сжатие
-                    if self.backup_settings.get('compress', True):
-                        compressed_path = dest_path + '.gz'
-                        with open(dest_path, 'rb') as f_in:
-                            with gzip.open(compressed_path, 'wb') as f_out:
-                                shutil.copyfileobj(f_in, f_out)
-                        os.remove(dest_path)  # Удаляем несжатую копию
-                        dest_path = compressed_path
-                        logger.info(f"Резервная копия сжата: {dest_path}", "BACKUP")
-                    
-                    logger.success(f"Резервная копия успешно создана: {dest_path}", "BACKUP")
+                    dest_path = self._write_backup(path, backup_filename, backup_time)
                     self._cleanup_old_backups(path)  # Очистка старых копий после успешного создания
                     return dest_path
                 except Exception as e:
@@ -191,8 +230,8 @@ class BackupManager:
                 logger.warning("База данных пуста или не существует, резервная копия не создана", "BACKUP")
                 return []
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"todolite_backup_{timestamp}.db"
+            backup_time = datetime.now().replace(microsecond=0)
+            backup_filename = f"todolite_backup_{backup_time.strftime('%Y%m%d_%H%M%S')}.db"
 
             destinations = self.get_destinations()
             if not destinations:
@@ -201,27 +240,26 @@ class BackupManager:
 
             self._ensure_backup_dirs(destinations)
 
+            # Отгружаем накопленный журнал, чтобы он не рос между снимками
+            if self.journal.enabled:
+                try:
+                    self.journal.ship()
+                except Exception as e:
+                    logger.error(f"Ошибка отгрузки журнала изменений перед снимком: {e}", "JOURNAL")
+
             successes = []
             for path in destinations:
+                started = time.perf_counter()
                 try:
-                    dest_path = os.path.join(path, backup_filename)
-                    shutil.copy2(self.db_path, dest_path)
-                    logger.info(f"Файл базы данных скопирован: {self.db_path} -> {dest_path}", "BACKUP")
-
-                    if self.backup_settings.get('compress', True):
-                        compressed_path = dest_path + '.gz'
-                        with open(dest_path, 'rb') as f_in:
-                            with gzip.open(compressed_path, 'wb') as f_out:
-                                shutil.copyfileobj(f_in, f_out)
-                        os.remove(dest_path)
-                        dest_path = compressed_path
-                        logger.info(f"Резервная копия сжата: {dest_path}", "BACKUP")
-
-                    logger.success(f"Резервная копия успешно создана: {dest_path}", "BACKUP")
+                    dest_path = self._write_backup(path, backup_filename, backup_time)
                     successes.append(dest_path)
+                    BACKUP_SECONDS.labels(destination=path).observe(time.perf_counter() - started)
+                    BACKUP_BYTES.labels(destination=path).inc(os.path.getsize(dest_path))
+                    BACKUP_LAST_SUCCESS.labels(destination=path).set(time.time())
                     # Чистим старые копии в ЭТОМ направлении независимо
                     self._cleanup_old_backups(path)
                 except Exception as e:
+                    BACKUP_FAILURES.labels(destination=path).inc()
                     logger.error(f"Ошибка при создании резервной копии в {path}: {e}", "BACKUP")
 
             if not successes:
@@ -240,41 +278,37 @@ class BackupManager:
         except Exception:
             return False
 
-    def find_latest_backup(self):
+    def find_latest_backup(self, until=None):
         """Находит самую свежую резервную копию среди всех направлений.
 
+        Использует каталоги направлений вместо сканирования директорий.
         Возвращает словарь { 'path': str, 'timestamp': datetime } либо None.
         При равенстве времени выбирает по приоритету направлений (раньше в списке — выше приоритет).
-        """
-        pattern = re.compile(r"^todolite_backup_(\d{8}_\d{6})\.db(\.gz)?$")
-        destinations = self.get_destinations()
-        candidates = []
 
-        for priority, base in enumerate(destinations):
+        Args:
+            until: Если указан, ищется последняя копия не позже этого момента
+        """
+        best = None
+        for base in self.get_destinations():
             try:
                 if not os.path.exists(base):
                     continue
-                for name in os.listdir(base):
-                    m = pattern.match(name)
-                    if not m:
-                        continue
-                    ts_str = m.group(1)
-                    try:
-                        ts = datetime.strptime(ts_str, "%Y%m%d_%H%M%S")
-                    except Exception:
-                        continue
-                    full_path = os.path.join(base, name)
-                    candidates.append((ts, priority, full_path))
+                catalog = BackupCatalog(base)
+                for entry in catalog.list(until=until):
+                    if os.path.exists(entry['path']):
+                        # Строгое сравнение сохраняет приоритет более раннего направления
+                        if best is None or entry['timestamp'] > best['timestamp']:
+                            best = entry
+                        break
+                    # Файл удален вручную — убираем устаревшую запись
+                    logger.warning(f"Копия из каталога не найдена на диске: {entry['path']}", "BACKUP")
+                    catalog.remove(entry['name'])
             except Exception as e:
-                logger.error(f"Ошибка сканирования каталога бэкапов {base}: {e}", "BACKUP")
+                logger.error(f"Ошибка чтения каталога бэкапов {base}: {e}", "BACKUP")
 
-        if not candidates:
+        if best is None:
             return None
-
-        # Сортировка: по времени убыв., затем по приоритету возр.
-        candidates.sort(key=lambda x: (-int(x[0].strftime('%Y%m%d%H%M%S')), x[1]))
-        ts, _, path = candidates[0]
-        return { 'path': path, 'timestamp': ts }
+        return { 'path': best['path'], 'timestamp': best['timestamp'] }
 
     def restore_latest_on_start(self):
         """Пытается восстановить БД из последней копии при старте.
@@ -305,23 +339,32 @@ class BackupManager:
             return False
     
     def _cleanup_old_backups(self, path):
-        """Удаляет старые резервные копии, оставляя только max_backups."""
+        """Удаляет старые резервные копии согласно политике хранения.
+
+        По умолчанию хранятся max_backups последних копий. Если задан
+        backup.retention (например {"hourly": 24, "daily": 30}), применяется
+        схема GFS: по одной последней копии на каждый час/день/неделю/месяц.
+        Порядок определяется временем копии из каталога, а не mtime файла.
+        """
         max_backups = self.backup_settings.get('max_backups', 10)
-        if max_backups <= 0:
+        retention = self.backup_settings.get('retention')
+        if max_backups <= 0 and not retention:
             return
         
         try:
-            backup_files = []
-            for f in os.listdir(path):
-                if f.startswith('todolite_backup_') and (f.endswith('.db') or f.endswith('.db.gz')):
-                    file_path = os.path.join(path, f)
-                    backup_files.append((os.path.getmtime(file_path), file_path))
-            
-            backup_files.sort(key=lambda x: x[0], reverse=True)  # Сортируем по дате изменения (новые в начале)
-            
-            for i in range(max_backups, len(backup_files)):
-                os.remove(backup_files[i][1])
-                logger.info(f"Удалена старая резервная копия: {backup_files[i][1]}", "BACKUP")
+            catalog = BackupCatalog(path)
+            for entry in catalog.select_expired(max_backups=max_backups, retention=retention):
+                try:
+                    os.remove(entry['path'])
+                except FileNotFoundError:
+                    pass
+                catalog.remove(entry['name'])
+                logger.info(f"Удалена старая резервная копия: {entry['path']}", "BACKUP")
+
+            # Сегменты журнала старше самой старой оставшейся копии больше не нужны
+            remaining = catalog.list()
+            if remaining:
+                self.journal.prune_segments(path, remaining[-1]['timestamp'])
         except Exception as e:
             logger.error(f"Ошибка при очистке старых резервных копий в {path}: {e}", "BACKUP")
     
@@ -385,6 +428,52 @@ class BackupManager:
                 except Exception as e:
                     logger.warning(f"Не удалось удалить временную копию текущей БД {current_db_backup_path}: {e}", "BACKUP")
     
+    def restore_to_point_in_time(self, target_time):
+        """
+        Восстанавливает БД на произвольный момент времени.
+
+        Берет последний снимок не позже target_time и воспроизводит поверх
+        него журнал изменений до target_time, затем подменяет текущую БД
+        обычным путем restore_backup (с валидацией и откатом).
+
+        Args:
+            target_time: Локальное время (datetime), на которое нужно восстановить БД
+
+        Returns:
+            True если успешно, False если ошибка
+        """
+        snapshot = self.find_latest_backup(until=target_time)
+        if not snapshot:
+            logger.error(f"Не найден снимок не позже {target_time}", "BACKUP")
+            return False
+
+        logger.info(f"Восстановление на {target_time}: снимок {snapshot['path']}", "BACKUP")
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as temp_file:
+            temp_path = temp_file.name
+        try:
+            if snapshot['path'].endswith('.gz'):
+                with gzip.open(snapshot['path'], 'rb') as f_in:
+                    with open(temp_path, 'wb') as f_out:
+                        shutil.copyfileobj(f_in, f_out)
+            else:
+                shutil.copy2(snapshot['path'], temp_path)
+
+            applied = self.journal.replay(
+                temp_path,
+                since_ms=datetime_to_ms(snapshot['timestamp']) - REPLAY_MARGIN_MS,
+                until_ms=datetime_to_ms(target_time)
+            )
+            logger.info(f"Воспроизведено изменений журнала: {applied}", "BACKUP")
+            return self.restore_backup(temp_path)
+        except Exception as e:
+            logger.error(f"Ошибка восстановления на момент времени: {e}", "BACKUP")
+            return False
+        finally:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
     def _validate_backup(self, db_file):
         """Внутренняя функция для проверки целостности файла SQLite."""
         conn = None
@@ -438,35 +527,44 @@ class BackupManager:
         return {
             'enabled': backup_config.get('enabled', False),
             'interval_hours': backup_config.get('interval_hours', 1),
+            'cron': backup_config.get('cron'),
             'primary_paths': [os.path.expandvars(p) for p in backup_config.get('primary_paths', [])],
             'fallback_path': os.path.expandvars(backup_config.get('fallback_path', '')),
             'max_backups': backup_config.get('max_backups', 10),
+            'retention': backup_config.get('retention'),
             'compress': backup_config.get('compress', True)
         }
     
-    def get_backup_list(self):
-        """Возвращает список доступных резервных копий."""
+    def get_backup_list(self, since=None, until=None):
+        """Возвращает список доступных резервных копий.
+
+        Args:
+            since: Нижняя граница времени копий (datetime или None)
+            until: Верхняя граница времени копий (datetime или None)
+        """
         all_backups = []
-        for path in self._get_backup_paths():
+        for path in self.get_destinations():
             try:
                 if os.path.exists(path):
-                    for f in os.listdir(path):
-                        if f.startswith('todolite_backup_') and (f.endswith('.db') or f.endswith('.db.gz')):
-                            file_path = os.path.join(path, f)
-                            try:
-                                timestamp_str = f.replace('todolite_backup_', '').split('.')[0]
-                                timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                                all_backups.append({
-                                    'name': f,
-                                    'path': file_path,
-                                    'size': os.path.getsize(file_path),
-                                    'timestamp': timestamp
-                                })
-                            except ValueError:
-                                logger.warning(f"Не удалось разобрать метку времени для файла: {f}", "BACKUP")
+                    all_backups.extend(BackupCatalog(path).list(since=since, until=until))
             except Exception as e:
                 logger.error(f"Ошибка получения списка резервных копий из {path}: {e}", "BACKUP")
         
         # Сортируем по убыванию даты
         all_backups.sort(key=lambda x: x['timestamp'], reverse=True)
         return all_backups
+
+
+class _HashingWriter:
+    """Обертка над файлом, считающая хеш записываемых данных."""
+
+    def __init__(self, fileobj, digest):
+        self._fileobj = fileobj
+        self._digest = digest
+
+    def write(self, data):
+        self._digest.update(data)
+        return self._fileobj.write(data)
+
+    def flush(self):
+        self._fileobj.flush()
@@ -8,11 +8,16 @@ import threading
 import time
 from datetime import datetime, timedelta
 from backup_manager import BackupManager
+from job_scheduler import get_job_scheduler, IntervalTrigger, CronTrigger, IDLE
 from logger import logger
 from notifications_windows import notify
 import os
 import subprocess
 
+BACKUP_JOB = 'backup'
+JOURNAL_JOB = 'journal_ship'
+BACKUP_JITTER_SECONDS = 60
+
 class BackupScheduler:
     """
     Планировщик для автоматического создания резервных копий базы данных.
@@ -22,64 +27,65 @@ class BackupScheduler:
         self.backup_manager = BackupManager(config_path=config_path, db_path=db_path)
         self.config = self.backup_manager.get_backup_info()
         self.interval_hours = self.config.get('interval_hours', 1)
+        self.cron = self.config.get('cron')
         self.enabled = self.config.get('enabled', True)
         self.running = False
-        self.thread = None
         self.next_backup_time = None
+        self._trigger_description = None
         
         logger.info(f"BackupScheduler инициализирован (интервал: {self.interval_hours}ч, включен: {self.enabled})", "BACKUP")
     
-    def _run_scheduler(self):
-        """Основной цикл планировщика."""
-        while self.running:
-            self.update_config()  # Проверяем актуальность конфигурации
-            
-            if not self.enabled:
-                logger.info("Резервное копирование отключено в конфигурации, планировщик приостановлен", "BACKUP")
-                time.sleep(60)  # Ждем минуту перед следующей проверкой
-                continue
-            
-            if self.next_backup_time is None or datetime.now() >= self.next_backup_time:
-                logger.info("Время для создания резервной копии (массово)", "BACKUP")
-                results = self.backup_manager.create_backup_all()
-                if results and len(results) > 0:
-                    logger.success(f"Автоматические резервные копии созданы: {len(results)} шт.", "BACKUP")
-                else:
-                    logger.error("Не удалось создать автоматические резервные копии ни в одном из направлений", "BACKUP")
-                    # Пытаемся нативное уведомление из приложения; fallback внутри notify
-                    try:
-                        notify(
-                            "⚠️ ToDoLite: Резервное копирование",
-                            "📦 Не удалось создать резервную копию ни в одном из указанных мест"
-                        )
-                    except Exception as e:
-                        logger.warning(f"Не удалось показать уведомление: {e}", "BACKUP")
-                
-                self.next_backup_time = datetime.now() + timedelta(hours=self.interval_hours)
-                logger.info(f"Следующее резервное копирование запланировано на: {self.next_backup_time}", "BACKUP")
-            
-            # Конвертируем часы в секунды
-            sleep_seconds = self.interval_hours * 3600
-            logger.debug(f"Ожидание {self.interval_hours} часов до следующего резервного копирования", "BACKUP")
-            
-            # Ждем с проверкой каждую минуту, чтобы можно было быстро остановить
-            minutes_to_wait = int(sleep_seconds // 60)
-            for _ in range(minutes_to_wait):
-                if not self.running:
-                    break
-                time.sleep(60)
-            
-            # Ждем оставшиеся секунды
-            remaining_seconds = sleep_seconds % 60
-            if remaining_seconds > 0 and self.running:
-                time.sleep(remaining_seconds)
-    
+    def _trigger(self):
+        """Расписание бэкапа: backup.cron, если задан, иначе каждые interval_hours."""
+        if self.cron:
+            try:
+                return CronTrigger(self.cron)
+            except ValueError as e:
+                logger.error(f"Некорректное расписание backup.cron, используется интервал: {e}", "BACKUP")
+        return IntervalTrigger(self.interval_hours * 3600)
+
+    def _schedule(self, run_immediately=False):
+        job = get_job_scheduler().add_job(
+            BACKUP_JOB, self._scheduled_backup, self._trigger(),
+            jitter_seconds=BACKUP_JITTER_SECONDS, run_immediately=run_immediately
+        )
+        self._trigger_description = job.trigger.describe()
+        self._update_next_backup_time()
+
+    def _update_next_backup_time(self):
+        job = get_job_scheduler().get_job(BACKUP_JOB)
+        self.next_backup_time = datetime.fromtimestamp(job.next_run_at) if job and job.next_run_at else None
+
+    def _scheduled_backup(self):
+        """Создание резервных копий по расписанию (задача backup планировщика задач)."""
+        self.update_config()  # Проверяем актуальность конфигурации
+        if not self.running or not self.enabled:
+            return IDLE
+
+        logger.info("Время для создания резервной копии (массово)", "BACKUP")
+        results = self.backup_manager.create_backup_all()
+        if results and len(results) > 0:
+            logger.success(f"Автоматические резервные копии созданы: {len(results)} шт.", "BACKUP")
+        else:
+            logger.error("Не удалось создать автоматические резервные копии ни в одном из направлений", "BACKUP")
+            # Пытаемся нативное уведомление из приложения; fallback внутри notify
+            try:
+                notify(
+                    "⚠️ ToDoLite: Резервное копирование",
+                    "📦 Не удалось создать резервную копию ни в одном из указанных мест"
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось показать уведомление: {e}", "BACKUP")
+
+        self._update_next_backup_time()
+        logger.info(f"Следующее резервное копирование запланировано на: {self.next_backup_time}", "BACKUP")
+
     def start(self):
-        """Запускает планировщик в отдельном потоке."""
+        """Запускает планировщик (задача backup планировщика задач)."""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
-            self.thread.start()
+            # Первый бэкап сразу после запуска, как и раньше
+            self._schedule(run_immediately=self.next_backup_time is None)
             logger.info("BackupScheduler запущен", "BACKUP")
         else:
             logger.warning("BackupScheduler уже запущен", "BACKUP")
@@ -88,10 +94,10 @@ class BackupScheduler:
         """Останавливает планировщик."""
         if self.running:
             self.running = False
-            if self.thread and self.thread.is_alive():
-                self.thread.join(timeout=5)  # Ждем завершения потока
-                if self.thread.is_alive():
-                    logger.warning("Поток BackupScheduler не завершился корректно", "BACKUP")
+            scheduler = get_job_scheduler()
+            # Из самой задачи backup (отключение в конфигурации) ждать ее завершения нельзя
+            in_job = threading.current_thread().name == f"job-{BACKUP_JOB}"
+            scheduler.remove_job(BACKUP_JOB, timeout=None if in_job else 5)
             logger.info("BackupScheduler остановлен", "BACKUP")
         else:
             logger.warning("BackupScheduler не запущен", "BACKUP")
@@ -101,7 +107,12 @@ class BackupScheduler:
         logger.info("Принудительное создание резервной копии", "BACKUP")
         backup_path = self.backup_manager.create_backup()
         if backup_path:
-            self.next_backup_time = datetime.now() + timedelta(hours=self.interval_hours)
+            # Интервал отсчитывается от принудительной копии (расписание cron не сдвигается)
+            if self.running and not self.cron:
+                get_job_scheduler().reschedule(BACKUP_JOB, time.time() + self.interval_hours * 3600)
+                self._update_next_backup_time()
+            elif not self.running:
+                self.next_backup_time = datetime.now() + timedelta(hours=self.interval_hours)
             logger.success(f"Принудительная резервная копия создана: {backup_path}", "BACKUP")
         else:
             logger.error("Не удалось создать принудительную резервную копию", "BACKUP")
@@ -113,6 +124,7 @@ class BackupScheduler:
             'running': self.running,
             'enabled': self.enabled,
             'interval_hours': self.interval_hours,
+            'cron': self.cron,
             'next_backup': self.next_backup_time.strftime("%Y-%m-%d %H:%M:%S") if self.next_backup_time else None
         }
     
@@ -121,12 +133,23 @@ class BackupScheduler:
         try:
             # Перезагружаем конфигурацию из файла
             self.backup_manager.config = self.backup_manager._load_config()
+            self.backup_manager.backup_settings = self.backup_manager.config.get('backup', {})
             self.config = self.backup_manager.get_backup_info()
             self.interval_hours = self.config.get('interval_hours', 1)
+            self.cron = self.config.get('cron')
             self.enabled = self.config.get('enabled', True)
             
             logger.info(f"Конфигурация планировщика обновлена (интервал: {self.interval_hours}ч, включен: {self.enabled})", "BACKUP")
             
+            # Изменилось расписание - перепланируем следующий запуск
+            if self.running and self.enabled and self._trigger().describe() != self._trigger_description:
+                logger.info("Расписание резервного копирования изменено", "BACKUP")
+                self._schedule()
+            
+            # Журнал включен/выключен или изменен интервал отгрузки
+            if self.running:
+                start_journal_shipping(self.backup_manager)
+            
             # Если планировщик был отключен, останавливаем его
             if not self.enabled and self.running:
                 logger.info("Резервное копирование отключено в конфигурации, останавливаем планировщик", "BACKUP")
@@ -189,3 +212,34 @@ def stop_backup_scheduler():
     """Останавливает глобальный планировщик резервного копирования."""
     scheduler = get_backup_scheduler()
     scheduler.stop()
+
+def _ship_journal(journal):
+    """Отгрузка журнала изменений в направления бэкапа (задача journal_ship)."""
+    if not journal.enabled or not journal.ship():
+        return IDLE
+
+def start_journal_shipping(backup_manager=None):
+    """
+    Приводит триггеры журнала изменений к настройкам и запускает задачу journal_ship.
+
+    Вызывается в ведущем процессе (сервер и трей): записи журнала удаляются
+    из БД только отгрузкой, без нее таблица change_journal растет.
+    """
+    journal = (backup_manager or BackupManager()).journal
+    try:
+        journal.sync()
+        interval = journal.ship_interval_seconds
+        if interval:
+            get_job_scheduler().add_job(JOURNAL_JOB, lambda: _ship_journal(journal), IntervalTrigger(interval))
+            logger.info(f"Отгрузка журнала изменений запущена (интервал: {interval}с)", "JOURNAL")
+        else:
+            get_job_scheduler().remove_job(JOURNAL_JOB, timeout=5)
+            if journal.enabled:
+                logger.warning("Периодическая отгрузка журнала отключена (ship_interval_seconds = 0): "
+                               "журнал очищается только при создании резервной копии", "JOURNAL")
+    except Exception as e:
+        logger.error(f"Ошибка настройки журнала изменений: {e}", "JOURNAL")
+
+def stop_journal_shipping():
+    """Снимает задачу journal_ship (процесс перестал быть ведущим)."""
+    get_job_scheduler().remove_job(JOURNAL_JOB, timeout=5)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Бенчмарки производительности
+
+Запуск из корня проекта, например:
+    python -m benchmarks.bench_date_filters
+"""
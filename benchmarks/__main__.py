@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Точка входа бенчмарков
+
+    python -m benchmarks run [--sizes 1000,4000,16000] [--only export_json,import_json]
+                             [--output FILE] [--baseline FILE] [--save-baseline]
+    python -m benchmarks compare BASELINE.json RESULTS.json [--threshold 1.25]
+    python -m benchmarks http ...         (см. benchmarks.bench_http)
+    python -m benchmarks plans ...        (см. benchmarks.query_plans)
+    python -m benchmarks date-filters ... (см. benchmarks.bench_date_filters)
+
+Код возврата run/compare - 1, если найдены регрессии относительно базового файла.
+"""
+
+import os
+import sys
+import argparse
+
+from benchmarks.common import ROOT_DIR, load_json, save_json
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'subsystems.json')
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+def _report_regressions(regressions):
+    if regressions:
+        print("\nРегрессии относительно базового файла:")
+        for line in regressions:
+            print(f"  ! {line}")
+        return 1
+    print("\nРегрессий относительно базового файла нет")
+    return 0
+
+
+def cmd_run(args):
+    from benchmarks import bench_subsystems
+
+    names = [name for name in (args.only or '').split(',') if name] or None
+    unknown = [name for name in names or [] if name not in bench_subsystems.BENCHMARKS]
+    if unknown:
+        print(f"Неизвестные бенчмарки: {', '.join(unknown)}. Доступны: {', '.join(bench_subsystems.BENCHMARKS)}")
+        return 2
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = bench_subsystems.run(sizes, names, args.repeat, args.comments_per_task, args.verbose)
+    bench_subsystems.print_results(results)
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"subsystems_{results['environment']['timestamp'].replace(':', '').replace('-', '')}.json")
+    save_json(output, results)
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.save_baseline:
+        save_json(args.baseline, results)
+        print(f"Базовые результаты записаны: {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    if baseline is None:
+        return 0
+    return _report_regressions(bench_subsystems.compare(baseline, results, args.threshold))
+
+
+def cmd_compare(args):
+    from benchmarks import bench_subsystems
+
+    baseline = load_json(args.baseline)
+    results = load_json(args.results)
+    if baseline is None or results is None:
+        print("Файл результатов не найден")
+        return 2
+    return _report_regressions(bench_subsystems.compare(baseline, results, args.threshold))
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    # Отдельные наборы со своими аргументами
+    delegated = {
+        'http': 'benchmarks.bench_http',
+        'plans': 'benchmarks.query_plans',
+        'date-filters': 'benchmarks.bench_date_filters',
+    }
+    if argv and argv[0] in delegated:
+        import importlib
+        return importlib.import_module(delegated[argv[0]]).main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Бенчмарки ToDoLite")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help="Микробенчмарки подсистем (бэкап, экспорт, импорт, ...)")
+    run_parser.add_argument('--sizes', default='1000,4000,16000', help="Размеры наборов данных (задач)")
+    run_parser.add_argument('--only', help="Только указанные бенчмарки, через запятую")
+    run_parser.add_argument('--repeat', type=int, default=3, help="Повторов на каждый размер")
+    run_parser.add_argument('--comments-per-task', type=float, default=1.5, help="Среднее число комментариев на задачу")
+    run_parser.add_argument('--output', help="Файл результатов JSON")
+    run_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Базовый файл для сравнения")
+    run_parser.add_argument('--save-baseline', action='store_true', help="Записать результаты как базовые")
+    run_parser.add_argument('--threshold', type=float, default=1.25, help="Допустимое замедление (во сколько раз)")
+    run_parser.add_argument('--verbose', action='store_true', help="Показывать логи подсистем")
+    run_parser.set_defaults(handler=cmd_run)
+
+    compare_parser = subparsers.add_parser('compare', help="Сравнить два файла результатов")
+    compare_parser.add_argument('baseline', help="Базовый файл")
+    compare_parser.add_argument('results', help="Новый файл результатов")
+    compare_parser.add_argument('--threshold', type=float, default=1.25, help="Допустимое замедление (во сколько раз)")
+    compare_parser.set_defaults(handler=cmd_compare)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'handler', None):
+        parser.print_help()
+        return 0
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
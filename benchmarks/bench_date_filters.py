@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Бенчмарк фильтров ru_date / ru_datetime
+
+Моделирует отрисовку доски из N карточек: для каждой карточки форматируются
+scheduled_date, due_date и reminder_time. Сравнивается прежний перебор
+форматов strptime с быстрым разбором и кэшем из date_utils.
+
+    python -m benchmarks.bench_date_filters [--cards 10000] [--renders 5]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_utils import format_date_ru, format_datetime_ru, _format_date_ru, _format_datetime_ru
+
+
+def legacy_format_date_ru(value):
+    """Прежняя реализация фильтра ru_date (перебор форматов strptime)."""
+    if not value:
+        return ''
+    cleaned = str(value).strip()
+    try:
+        return datetime.strptime(cleaned[:10], '%Y-%m-%d').strftime('%d.%m.%Y')
+    except Exception:
+        pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f'):
+        try:
+            return datetime.strptime(cleaned[:26], fmt).strftime('%d.%m.%Y')
+        except Exception:
+            continue
+    try:
+        return datetime.fromisoformat(cleaned).strftime('%d.%m.%Y')
+    except Exception:
+        return cleaned
+
+
+def legacy_format_datetime_ru(value):
+    """Прежняя реализация фильтра ru_datetime."""
+    if not value:
+        return ''
+    cleaned = str(value).strip()
+    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S.%f'):
+        try:
+            return datetime.strptime(cleaned[:26], fmt).strftime('%d.%m.%Y %H:%M')
+        except Exception:
+            continue
+    try:
+        return datetime.fromisoformat(cleaned).strftime('%d.%m.%Y %H:%M')
+    except Exception:
+        return cleaned
+
+
+def make_cards(count, seed=42):
+    """Генерирует даты карточек: ~полгода вокруг сегодняшнего дня, часть пустых."""
+    rnd = random.Random(seed)
+    today = date.today()
+    cards = []
+    for _ in range(count):
+        day = today + timedelta(days=rnd.randint(-90, 90))
+        scheduled = day.isoformat() if rnd.random() < 0.6 else None
+        due = (day + timedelta(days=rnd.randint(0, 14))).isoformat() if rnd.random() < 0.7 else None
+        reminder = f"{day.isoformat()}T{rnd.randint(8, 20):02d}:{rnd.choice((0, 15, 30, 45)):02d}" if rnd.random() < 0.3 else None
+        cards.append((scheduled, due, reminder))
+    return cards
+
+
+def render(cards, date_filter, datetime_filter):
+    for scheduled, due, reminder in cards:
+        date_filter(scheduled)
+        date_filter(due)
+        datetime_filter(reminder)
+
+
+def measure(cards, date_filter, datetime_filter, renders):
+    """Возвращает время одной отрисовки (лучшее из renders), мс."""
+    best = None
+    for _ in range(renders):
+        started = time.perf_counter()
+        render(cards, date_filter, datetime_filter)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк фильтров ru_date/ru_datetime")
+    parser.add_argument('--cards', type=int, default=10000, help="Количество карточек на доске")
+    parser.add_argument('--renders', type=int, default=5, help="Количество повторов")
+    args = parser.parse_args(argv)
+
+    cards = make_cards(args.cards)
+
+    # Проверка, что новая реализация дает тот же результат
+    for scheduled, due, reminder in cards:
+        for value in (scheduled, due):
+            assert format_date_ru(value) == legacy_format_date_ru(value), value
+        assert format_datetime_ru(reminder) == legacy_format_datetime_ru(reminder), reminder
+
+    legacy_ms = measure(cards, legacy_format_date_ru, legacy_format_datetime_ru, args.renders)
+
+    _format_date_ru.cache_clear()
+    _format_datetime_ru.cache_clear()
+    cold_ms = measure(cards, format_date_ru, format_datetime_ru, 1)
+    warm_ms = measure(cards, format_date_ru, format_datetime_ru, args.renders)
+    info = _format_date_ru.cache_info()
+
+    print(f"Карточек: {args.cards}, вызовов фильтров на отрисовку: {args.cards * 3}")
+    print(f"  strptime (прежняя реализация): {legacy_ms:8.2f} мс")
+    print(f"  быстрый разбор, холодный кэш:  {cold_ms:8.2f} мс")
+    print(f"  быстрый разбор, теплый кэш:    {warm_ms:8.2f} мс  (x{legacy_ms / warm_ms:.1f})")
+    print(f"  кэш ru_date: {info.currsize}/{info.maxsize} записей, попаданий {info.hits}, промахов {info.misses}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
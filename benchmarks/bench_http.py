@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Сквозной HTTP-бенчмарк основных маршрутов
+
+Для каждого размера набора данных запускается отдельный процесс (чтобы
+пиковая память не накапливалась между наборами): создается синтетическая БД,
+приложение прогоняется через тестовый клиент Flask и через настоящий
+WSGI-сервер (werkzeug) по HTTP. Результаты - p50/p95/p99, пропускная
+способность и пиковый RSS - сохраняются в JSON для сравнения между коммитами.
+
+    python -m benchmarks.bench_http [--sizes 1000,10000,100000] [--modes client,server]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode
+
+from benchmarks.common import (ROOT_DIR, prepare_workdir, init_schema, seed_tasks, latency_stats,
+                               peak_rss_mb, environment_info, load_json, save_json)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+MARKDOWN_SAMPLE = (
+    "# Заголовок\n\nТекст с **жирным**, *курсивом* и `кодом`.\n\n"
+    "- пункт 1\n- пункт 2\n\n| A | B |\n|---|---|\n| 1 | 2 |\n\n"
+    "```python\nprint('hello')\n```\n"
+)
+
+
+def build_scenarios(task_ids, rnd):
+    """
+    Описания запросов: имя -> функция, возвращающая (метод, путь, тело, заголовки).
+
+    Изменяющие запросы (статус, комментарий) работают со случайными задачами,
+    поэтому повторы не попадают в одну и ту же строку.
+    """
+    statuses = ('new', 'later', 'working', 'waiting', 'think')
+    json_headers = {'Content-Type': 'application/json'}
+    form_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    return {
+        'board_kanban': lambda: ('GET', '/', None, {}),
+        'board_eisenhower': lambda: ('GET', '/?mode=eisenhower', None, {}),
+        'task_detail': lambda: ('GET', f"/task/{rnd.choice(task_ids)}", None, {}),
+        'archive': lambda: ('GET', '/archive', None, {}),
+        'api_tags': lambda: ('GET', '/api/tags', None, {}),
+        'update_task_status': lambda: ('POST', '/update_task_status', json.dumps(
+            {'task_id': rnd.choice(task_ids), 'status': rnd.choice(statuses)}), json_headers),
+        'markdown_preview': lambda: ('POST', '/markdown_preview', json.dumps(
+            {'markdown': MARKDOWN_SAMPLE}), json_headers),
+        'add_comment': lambda: ('POST', f"/add_comment/{rnd.choice(task_ids)}", urlencode(
+            {'comment': 'Комментарий из бенчмарка с **markdown**'}), form_headers),
+    }
+
+
+def run_scenario(send, make_request, requests, warmup, max_seconds):
+    """Прогоняет один сценарий; ограничен числом запросов и временем."""
+    for _ in range(warmup):
+        send(*make_request())
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        request = make_request()
+        request_started = time.perf_counter()
+        status = send(*request)
+        samples.append((time.perf_counter() - request_started) * 1000)
+        if status >= 400:
+            errors += 1
+        # Минимум 5 замеров даже для очень медленных страниц
+        if len(samples) >= 5 and time.perf_counter() - started > max_seconds:
+            break
+    stats = latency_stats(samples, time.perf_counter() - started)
+    stats['errors'] = errors
+    return stats
+
+
+def client_sender(app):
+    """Отправка запросов через тестовый клиент Flask (без сети)."""
+    client = app.test_client()
+
+    def send(method, path, body, headers):
+        response = client.open(path, method=method, data=body, headers=headers)
+        response.get_data()
+        return response.status_code
+    return send, lambda: None
+
+
+def server_sender(app):
+    """Отправка запросов по HTTP на werkzeug-сервер в фоновом потоке."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_port
+
+    def send(method, path, body, headers):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+        try:
+            conn.request(method, path, body=body.encode('utf-8') if body else None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        finally:
+            conn.close()
+
+    def stop():
+        server.shutdown()
+        thread.join(timeout=5)
+    return send, stop
+
+
+SENDERS = {'client': client_sender, 'server': server_sender}
+
+
+def run_dataset(size, modes, scenarios, requests, warmup, max_seconds, comments_per_task):
+    """Бенчмарк одного набора данных (выполняется в дочернем процессе)."""
+    with tempfile.TemporaryDirectory(prefix='todolite_http_') as workdir:
+        prepare_workdir(workdir)
+        db_path = init_schema(workdir)
+        seed_started = time.perf_counter()
+        task_count, comment_count = seed_tasks(db_path, size, comments_per_task)
+        seed_seconds = time.perf_counter() - seed_started
+
+        import app as app_module
+        app_module.limiter.enabled = False
+        app = app_module.app
+
+        previous = os.getcwd()
+        os.chdir(workdir)
+        try:
+            task_ids = list(range(1, task_count + 1))
+            results = {}
+            for mode in modes:
+                send, stop = SENDERS[mode](app)
+                try:
+                    available = build_scenarios(task_ids, random.Random(1))
+                    results[mode] = {
+                        name: run_scenario(send, available[name], requests, warmup, max_seconds)
+                        for name in scenarios
+                    }
+                finally:
+                    stop()
+        finally:
+            os.chdir(previous)
+
+    return {
+        'tasks': task_count,
+        'comments': comment_count,
+        'seed_seconds': round(seed_seconds, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'modes': results,
+    }
+
+
+def run_child(size, args):
+    """Запускает набор данных в отдельном процессе и возвращает его результат."""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        result_path = f.name
+    try:
+        command = [sys.executable, '-m', 'benchmarks.bench_http', '--child', str(size),
+                   '--child-output', result_path, '--modes', ','.join(args.modes),
+                   '--scenarios', ','.join(args.scenarios), '--requests', str(args.requests),
+                   '--warmup', str(args.warmup), '--max-seconds', str(args.max_seconds),
+                   '--comments-per-task', str(args.comments_per_task)]
+        # Логи приложения пишутся в stdout - в замеры попадает их стоимость, но не вывод
+        subprocess.run(command, cwd=ROOT_DIR, check=True,
+                       stdout=None if args.verbose else subprocess.DEVNULL)
+        return load_json(result_path)
+    finally:
+        os.remove(result_path)
+
+
+def print_results(results):
+    for size, dataset in results['datasets'].items():
+        print(f"\nНабор {size}: задач {dataset['tasks']}, комментариев {dataset['comments']}, "
+              f"пиковый RSS {dataset['peak_rss_mb']} МБ")
+        for mode, scenarios in dataset['modes'].items():
+            print(f"  [{mode}] {'сценарий':<20} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'зап/с':>8} {'n':>4}")
+            for name, stats in scenarios.items():
+                errors = f"  ошибок: {stats['errors']}" if stats['errors'] else ''
+                print(f"  [{mode}] {name:<20} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+                      f"{stats['p99_ms']:9.2f} {stats['throughput_rps']:8.1f} {stats['count']:>4}{errors}")
+
+
+def main(argv=None):
+    scenario_names = list(build_scenarios([1], random.Random()).keys())
+
+    parser = argparse.ArgumentParser(description="HTTP-бенчмарк маршрутов ToDoLite")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="Размеры наборов данных (задач)")
+    parser.add_argument('--modes', default=','.join(SENDERS), help="client - тестовый клиент, server - WSGI-сервер")
+    parser.add_argument('--scenarios', default=','.join(scenario_names), help="Сценарии через запятую")
+    parser.add_argument('--requests', type=int, default=50, help="Запросов на сценарий")
+    parser.add_argument('--warmup', type=int, default=3, help="Прогревочных запросов на сценарий")
+    parser.add_argument('--max-seconds', type=float, default=20.0, help="Ограничение времени на сценарий")
+    parser.add_argument('--comments-per-task', type=float, default=1.5, help="Среднее число комментариев на задачу")
+    parser.add_argument('--output', help="Файл результатов JSON (по умолчанию benchmarks/results/http_<время>.json)")
+    parser.add_argument('--verbose', action='store_true', help="Показывать логи приложения")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    args.modes = [mode for mode in args.modes.split(',') if mode]
+    args.scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = [mode for mode in args.modes if mode not in SENDERS] + \
+              [name for name in args.scenarios if name not in scenario_names]
+    if unknown:
+        parser.error(f"Неизвестные режимы/сценарии: {', '.join(unknown)}")
+
+    if args.child:
+        result = run_dataset(args.child, args.modes, args.scenarios, args.requests,
+                             args.warmup, args.max_seconds, args.comments_per_task)
+        save_json(args.child_output, result)
+        return 0
+
+    results = {'environment': environment_info(), 'datasets': {}}
+    for size in (int(value) for value in args.sizes.split(',') if value):
+        print(f"Набор данных {size} задач...", flush=True)
+        results['datasets'][str(size)] = run_child(size, args)
+
+    print_results(results)
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"http_{results['environment']['timestamp'].replace(':', '').replace('-', '')}.json")
+    save_json(output, results)
+    print(f"\nРезультаты сохранены: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Микробенчмарки фоновых подсистем
+
+Каждый бенчмарк выполняется на синтетических данных возрастающего размера,
+по замерам оценивается показатель роста времени (t ~ n^k): k около 1 -
+линейная зависимость, около 2 - квадратичная. Результаты сохраняются в JSON
+и сравниваются с базовым файлом (см. python -m benchmarks).
+
+Перед каждым повтором БД восстанавливается из эталонной копии, поэтому
+изменяющие операции (миграция, импорт, восстановление) всегда стартуют из
+одного и того же состояния; подготовка в замер не входит.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import tempfile
+import contextlib
+
+from benchmarks.common import prepare_workdir, init_schema, seed_tasks, percentile, environment_info
+
+DEFAULT_SIZES = (1000, 4000, 16000)
+
+# Показатель роста, начиная с которого зависимость считается сверхлинейной
+SUPERLINEAR_EXPONENT = 1.5
+
+
+def _write_backup_config(workdir, compress):
+    """Конфигурация бэкапа для бенчмарка: одно направление внутри рабочей директории."""
+    config_path = os.path.join(workdir, 'config.json')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['backup'] = {
+        'enabled': True,
+        'destinations': [os.path.join(workdir, 'backups')],
+        'max_backups': 1000,
+        'compress': compress,
+        'journal': {'enabled': False},
+    }
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return config_path
+
+
+def bench_backup_create(ctx):
+    from backup_manager import BackupManager
+    manager = BackupManager(config_path=_write_backup_config(ctx['workdir'], True), db_path=ctx['db_path'])
+    return manager.create_backup_all
+
+
+def bench_backup_restore(ctx):
+    from backup_manager import BackupManager
+    manager = BackupManager(config_path=_write_backup_config(ctx['workdir'], True), db_path=ctx['db_path'])
+    backup_path = ctx.get('backup_path')
+    if not backup_path:
+        backup_path = manager.create_backup_all()[0]
+        ctx['backup_path'] = backup_path
+    return lambda: manager.restore_backup(backup_path)
+
+
+def _bench_export(export_format):
+    def bench(ctx):
+        from export_manager import ExportManager
+        manager = ExportManager(ctx['db_path'])
+        extension = 'db' if export_format == 'sqlite' else export_format
+        output_path = os.path.join(ctx['workdir'], f"export.{extension}")
+        return lambda: manager.export_tasks(format=export_format, output_path=output_path)
+    return bench
+
+
+def bench_import(ctx):
+    from export_manager import ExportManager
+    from import_manager import ImportManager
+    source = ctx.get('import_source')
+    if not source:
+        source = os.path.join(ctx['workdir'], 'import_source.json')
+        ExportManager(ctx['pristine_path']).export_tasks(format='json', output_path=source)
+        ctx['import_source'] = source
+    # Импорт в пустую БД с той же схемой
+    shutil.copy2(ctx['empty_path'], ctx['db_path'])
+    manager = ImportManager(ctx['db_path'])
+    return lambda: manager.import_tasks(source)
+
+
+def bench_migration(ctx):
+    from category_migration_manager import CategoryMigrationManager
+    manager = CategoryMigrationManager(ctx['db_path'])
+    manager.enabled = True
+    return manager.migrate_tasks
+
+
+def bench_reminders(ctx):
+    from reminder_manager import ReminderManager
+    manager = ReminderManager(ctx['db_path'])
+    return manager.get_tasks_with_reminders
+
+
+def bench_markdown(ctx):
+    from markdown_utils import MarkdownProcessor
+    processor = MarkdownProcessor()
+    # Документ растет вместе с размером набора: один раздел на 10 задач
+    sections = []
+    for i in range(max(1, ctx['size'] // 10)):
+        sections.append(
+            f"## Раздел {i}\n\nТекст с **жирным**, *курсивом*, `кодом` и [ссылкой](https://example.com/{i}).\n\n"
+            f"- пункт {i}.1\n- пункт {i}.2\n\n| A | B |\n|---|---|\n| {i} | {i * 2} |\n"
+        )
+    text = "\n".join(sections)
+    return lambda: processor.to_html(text)
+
+
+BENCHMARKS = {
+    'backup_create_all': bench_backup_create,
+    'backup_restore': bench_backup_restore,
+    'export_json': _bench_export('json'),
+    'export_csv': _bench_export('csv'),
+    'export_xml': _bench_export('xml'),
+    'export_ndjson': _bench_export('ndjson'),
+    'export_sqlite': _bench_export('sqlite'),
+    'import_json': bench_import,
+    'migrate_tasks': bench_migration,
+    'reminders': bench_reminders,
+    'markdown_to_html': bench_markdown,
+}
+
+
+@contextlib.contextmanager
+def _quiet(enabled=True):
+    """Подавляет вывод логгера (print в stdout) на время замера."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def scaling_exponent(points):
+    """
+    Показатель k в t ~ n^k (наклон прямой в log-log координатах, МНК).
+
+    Args:
+        points: Список пар (n, секунды)
+    """
+    points = [(n, t) for n, t in points if n > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if not denominator:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator, 2)
+
+
+def run_size(size, names, repeat, comments_per_task, verbose=False):
+    """Выполняет выбранные бенчмарки на наборе данных одного размера."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='todolite_bench_') as workdir:
+        previous = os.getcwd()
+        with _quiet(not verbose):
+            prepare_workdir(workdir)
+            empty_path = os.path.join(workdir, 'empty.db')
+            db_path = init_schema(workdir)
+            shutil.copy2(db_path, empty_path)
+            seed_tasks(db_path, size, comments_per_task)
+            pristine_path = os.path.join(workdir, 'pristine.db')
+            shutil.copy2(db_path, pristine_path)
+
+        ctx = {'size': size, 'workdir': workdir, 'db_path': db_path,
+               'pristine_path': pristine_path, 'empty_path': empty_path}
+        os.chdir(workdir)
+        try:
+            for name in names:
+                samples = []
+                for _ in range(repeat):
+                    with _quiet(not verbose):
+                        shutil.copy2(pristine_path, db_path)
+                        operation = BENCHMARKS[name](ctx)
+                        started = time.perf_counter()
+                        operation()
+                        samples.append(time.perf_counter() - started)
+                samples.sort()
+                results[name] = {
+                    'median_s': round(percentile(samples, 0.5), 6),
+                    'min_s': round(samples[0], 6),
+                    'max_s': round(samples[-1], 6),
+                }
+                print(f"  {name:<20} n={size:<7} {results[name]['median_s'] * 1000:10.2f} мс", flush=True)
+        finally:
+            os.chdir(previous)
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, names=None, repeat=3, comments_per_task=1.5, verbose=False):
+    """
+    Выполняет бенчмарки на всех размерах.
+
+    Returns:
+        {environment, sizes, benchmarks: {имя: {sizes: {n: {...}}, exponent}}}
+    """
+    names = list(names or BENCHMARKS)
+    benchmarks = {name: {'sizes': {}, 'exponent': None} for name in names}
+    for size in sizes:
+        print(f"Набор данных: {size} задач", flush=True)
+        for name, stats in run_size(size, names, repeat, comments_per_task, verbose).items():
+            benchmarks[name]['sizes'][str(size)] = stats
+    for name, item in benchmarks.items():
+        item['exponent'] = scaling_exponent([(int(n), stats['median_s']) for n, stats in item['sizes'].items()])
+    return {
+        'environment': environment_info(),
+        'sizes': list(sizes),
+        'repeat': repeat,
+        'benchmarks': benchmarks,
+    }
+
+
+def print_results(results):
+    sizes = [str(size) for size in results['sizes']]
+    header = ''.join(f"{'n=' + size:>12}" for size in sizes)
+    print(f"\n{'бенчмарк':<20}{header}{'рост k':>9}")
+    for name, item in results['benchmarks'].items():
+        cells = ''.join(
+            f"{item['sizes'][size]['median_s'] * 1000:10.2f}мс" if size in item['sizes'] else f"{'-':>12}"
+            for size in sizes
+        )
+        exponent = item['exponent']
+        flag = '  сверхлинейный рост' if exponent is not None and exponent >= SUPERLINEAR_EXPONENT else ''
+        print(f"{name:<20}{cells}{exponent if exponent is not None else '-':>9}{flag}")
+
+
+def compare(baseline, results, threshold=1.25, min_delta_s=0.002, exponent_delta=0.3):
+    """
+    Сравнивает результаты с базовыми.
+
+    Регрессия - медиана выросла более чем в threshold раз (и более чем на
+    min_delta_s секунд) или показатель роста увеличился более чем на exponent_delta.
+
+    Returns:
+        Список строк с описанием регрессий
+    """
+    regressions = []
+    for name, item in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            continue
+        for size, stats in item['sizes'].items():
+            base_stats = base['sizes'].get(size)
+            if not base_stats or not base_stats['median_s']:
+                continue
+            ratio = stats['median_s'] / base_stats['median_s']
+            if ratio > threshold and stats['median_s'] - base_stats['median_s'] > min_delta_s:
+                regressions.append(
+                    f"{name} n={size}: {base_stats['median_s'] * 1000:.2f} -> {stats['median_s'] * 1000:.2f} мс (x{ratio:.2f})"
+                )
+        if (item['exponent'] is not None and base.get('exponent') is not None
+                and item['exponent'] - base['exponent'] > exponent_delta):
+            regressions.append(f"{name}: показатель роста {base['exponent']} -> {item['exponent']}")
+    return regressions
+
+
+if __name__ == '__main__':
+    from benchmarks.__main__ import main
+    sys.exit(main(['run'] + sys.argv[1:]))
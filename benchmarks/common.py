@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Общие функции бенчмарков: синтетическая БД и статистика
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import sqlite3
+import platform
+import subprocess
+from datetime import datetime, date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+STATUSES = ('new', 'later', 'tracking', 'working', 'waiting', 'think', 'done', 'cancelled')
+PRIORITIES = ('low', 'medium', 'high', 'urgent')
+EISENHOWER = ('urgent_important', 'urgent_not_important', 'not_urgent_important', 'not_urgent_not_important')
+TAGS = ('работа', 'дом', 'срочно', 'встреча', 'отчет', 'звонок', 'покупки', 'идея')
+
+
+def prepare_workdir(workdir):
+    """Копирует в рабочую директорию файлы, которые приложение читает по относительному пути."""
+    config_path = os.path.join(ROOT_DIR, 'config.json')
+    if os.path.exists(config_path):
+        shutil.copy2(config_path, os.path.join(workdir, 'config.json'))
+
+
+def init_schema(workdir):
+    """
+    Создает БД приложения в workdir через app.init_db (схема, индексы, миграции).
+
+    init_db работает с 'tasks.db' в текущей директории, поэтому на время
+    вызова выполняется переход в workdir.
+
+    Returns:
+        Путь к созданной БД
+    """
+    import app
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app.init_db()
+    finally:
+        os.chdir(previous)
+    return os.path.join(workdir, 'tasks.db')
+
+
+def seed_tasks(db_path, count, comments_per_task=1.0, archived_share=0.3, seed=42):
+    """
+    Заполняет БД синтетическими задачами с распределениями, похожими на реальные.
+
+    Даты лежат вокруг сегодняшнего дня, часть задач архивирована, у части
+    есть теги, напоминания и комментарии.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+    now = datetime.now()
+
+    def some_date(spread):
+        return (today + timedelta(days=rnd.randint(-spread, spread))).isoformat()
+
+    tasks = []
+    for i in range(1, count + 1):
+        archived = 1 if rnd.random() < archived_share else 0
+        status = rnd.choice(STATUSES)
+        created = now - timedelta(days=rnd.randint(0, 720), minutes=rnd.randint(0, 1439))
+        updated = created + timedelta(days=rnd.randint(0, 30))
+        reminder = None
+        if rnd.random() < 0.1:
+            reminder = f"{some_date(30)}T{rnd.randint(8, 20):02d}:{rnd.choice((0, 15, 30, 45)):02d}"
+        tasks.append((
+            i, f"Задача {i}", f"Краткое описание {i}", f"Полное описание задачи {i}\n\n- пункт 1\n- пункт 2",
+            status, rnd.choice(PRIORITIES), rnd.choice(EISENHOWER),
+            some_date(60) if rnd.random() < 0.4 else None,
+            some_date(60) if rnd.random() < 0.5 else None,
+            reminder,
+            ', '.join(rnd.sample(TAGS, rnd.randint(1, 3))) if rnd.random() < 0.4 else None,
+            created.strftime('%Y-%m-%d %H:%M:%S'), updated.strftime('%Y-%m-%d %H:%M:%S'),
+            archived, updated.strftime('%Y-%m-%d %H:%M:%S') if archived else None,
+            status if archived else None,
+        ))
+
+    comments = []
+    for task_id in range(1, count + 1):
+        for _ in range(int(comments_per_task) + (1 if rnd.random() < comments_per_task % 1 else 0)):
+            comments.append((task_id, f"Комментарий к задаче {task_id}"))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.executemany(
+                """INSERT INTO tasks (id, title, short_description, full_description, status, priority,
+                                      eisenhower_priority, scheduled_date, due_date, reminder_time, tags,
+                                      created_at, updated_at, archived, archived_at, archived_from_status)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                tasks
+            )
+            conn.executemany("INSERT INTO task_comments (task_id, comment) VALUES (?, ?)", comments)
+        # Статистика для планировщика, как после запуска приложения
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return len(tasks), len(comments)
+
+
+def percentile(values, fraction):
+    """Перцентиль (линейная интерполяция) для отсортированного списка."""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def latency_stats(samples_ms, elapsed_seconds=None):
+    """Сводка по задержкам: перцентили (мс) и пропускная способность (операций/с)."""
+    values = sorted(samples_ms)
+    total = elapsed_seconds if elapsed_seconds is not None else sum(values) / 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'p99_ms': round(percentile(values, 0.99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+        'throughput_rps': round(len(values) / total, 2) if total else 0.0,
+    }
+
+
+def peak_rss_mb():
+    """Пиковый объем резидентной памяти процесса (МБ) или None, если недоступно."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux - килобайты, macOS - байты
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def git_revision():
+    """Короткий хеш текущего коммита (для сравнения результатов между коммитами)."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment_info():
+    """Описание окружения для файлов результатов."""
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+    }
+
+
+def load_json(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
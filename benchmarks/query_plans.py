@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Проверка планов горячих запросов
+
+Создает БД через app.init_db, прогоняет все зарегистрированные запросы
+(app, database_manager, reminder_manager, category_migration_manager,
+export_manager) через EXPLAIN QUERY PLAN сначала на пустой БД (как сразу
+после установки, без статистики), затем на заполненной синтетическими
+задачами, и завершается с кодом 1, если запрос, которому нужен индекс,
+полностью сканирует таблицу хотя бы в одной из них. Время выполнения
+запросов на заполненной БД сравнивается с базовым файлом.
+
+    python -m benchmarks.query_plans [--tasks 10000] [--update-baseline]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+
+from benchmarks.common import ROOT_DIR, init_schema, seed_tasks, percentile, environment_info, load_json, save_json
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'query_plans.json')
+
+# Замедление относительно базового файла, о котором выводится предупреждение
+SLOWDOWN_WARNING = 1.5
+# Разница меньше этой (мс) считается шумом измерения
+SLOWDOWN_MIN_MS = 5.0
+
+
+def time_query(conn, sql, params, repeat):
+    """Возвращает медиану времени выполнения запроса (с выборкой всех строк), мс."""
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(sql, params).fetchall())
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return percentile(samples, 0.5), rows
+
+
+def run(tasks, comments_per_task, repeat):
+    """
+    Создает БД, проверяет планы и замеряет запросы.
+
+    Returns:
+        Словарь результатов {environment, tasks, comments, queries: {имя: {...}}};
+        у запроса, полностью сканирующего пустую БД, есть empty_db_plan
+    """
+    import app  # регистрирует запросы app.py
+    from index_advisor import load_hot_queries, check_query_plans, HOT_QUERIES
+
+    with tempfile.TemporaryDirectory(prefix='todolite_plans_') as workdir:
+        db_path = init_schema(workdir)
+        load_hot_queries()
+
+        previous = os.getcwd()
+        os.chdir(workdir)
+        try:
+            # Пустая БД: планы без статистики, как у новой установки
+            conn = sqlite3.connect(db_path)
+            try:
+                empty_report = {item['name']: item for item in check_query_plans(conn, db_path)}
+            finally:
+                conn.close()
+        finally:
+            os.chdir(previous)
+
+        task_count, comment_count = seed_tasks(db_path, tasks, comments_per_task)
+
+        os.chdir(workdir)
+        conn = sqlite3.connect(db_path)
+        try:
+            report = check_query_plans(conn, db_path)
+            queries = {}
+            for item in report:
+                entry = HOT_QUERIES[item['name']]
+                result = {
+                    'source': item['source'],
+                    'plan': item['plan'],
+                    'full_scans': item['full_scans'],
+                    'expected_index': entry['expected_index'],
+                    'ok': item['ok'],
+                    'error': item['error'],
+                }
+                empty = empty_report.get(item['name'])
+                if empty is not None and not empty['ok']:
+                    result['ok'] = False
+                    result['empty_db_plan'] = empty['plan']
+                    result['error'] = result['error'] or empty['error']
+                if not item['error']:
+                    sql = entry['sql'](db_path) if callable(entry['sql']) else entry['sql']
+                    result['median_ms'], result['rows'] = time_query(conn, sql, entry['params'], repeat)
+                queries[item['name']] = result
+        finally:
+            conn.close()
+            os.chdir(previous)
+
+    return {
+        'environment': environment_info(),
+        'tasks': task_count,
+        'comments': comment_count,
+        'queries': queries,
+    }
+
+
+def print_report(results, baseline):
+    base_queries = (baseline or {}).get('queries', {})
+    same_size = baseline is not None and baseline.get('tasks') == results['tasks']
+    print(f"Задач: {results['tasks']}, комментариев: {results['comments']}, SQLite {results['environment']['sqlite']}")
+    print(f"{'запрос':<24} {'источник':<28} {'строк':>7} {'мс':>9} {'база, мс':>9}  план")
+    failures = 0
+    for name, item in sorted(results['queries'].items()):
+        if item['error']:
+            failures += 1
+            print(f"{name:<24} {item['source'] or '':<28} ОШИБКА: {item['error']}")
+            continue
+        base = base_queries.get(name) if same_size else None
+        base_ms = f"{base['median_ms']:9.2f}" if base and base.get('median_ms') is not None else f"{'-':>9}"
+        status = 'OK' if item['ok'] else 'FULL SCAN'
+        print(f"{name:<24} {item['source'] or '':<28} {item['rows']:>7} {item['median_ms']:9.2f} {base_ms}  "
+              f"{status}: {'; '.join(item['plan'])}")
+        if item.get('empty_db_plan'):
+            print(f"  ! на пустой БД: {'; '.join(item['empty_db_plan'])}")
+        if not item['ok']:
+            failures += 1
+        if (base and base.get('median_ms') and item['median_ms'] > base['median_ms'] * SLOWDOWN_WARNING
+                and item['median_ms'] - base['median_ms'] > SLOWDOWN_MIN_MS):
+            print(f"  ! медленнее базового в {item['median_ms'] / base['median_ms']:.1f} раза")
+        if base and base.get('plan') and base['plan'] != item['plan']:
+            print(f"  ! план изменился, было: {'; '.join(base['plan'])}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка планов горячих SQL-запросов ToDoLite")
+    parser.add_argument('--tasks', type=int, default=10000, help="Размер синтетической БД (задач)")
+    parser.add_argument('--comments-per-task', type=float, default=1.0, help="Среднее число комментариев на задачу")
+    parser.add_argument('--repeat', type=int, default=5, help="Повторов замера каждого запроса")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Файл базовых результатов")
+    parser.add_argument('--update-baseline', action='store_true', help="Записать результаты как базовые")
+    args = parser.parse_args(argv)
+
+    results = run(args.tasks, args.comments_per_task, args.repeat)
+    failures = print_report(results, load_json(args.baseline))
+
+    if args.update_baseline:
+        save_json(args.baseline, results)
+        print(f"Базовые результаты записаны: {args.baseline}")
+
+    if failures:
+        print(f"Запросов без подходящего индекса: {failures}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
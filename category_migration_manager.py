@@ -6,10 +6,235 @@ ToDoLite - Менеджер автоматического перемещени
 
 import sqlite3
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, date
 from typing import Optional, Tuple
 from logger import logger
 from config_manager import get_config_manager
+from date_utils import parse_date
+from index_advisor import register_hot_query
+from metrics import get_metrics_registry
+from job_scheduler import get_job_scheduler, IntervalTrigger
+
+# Активные задачи с датами (полный проход); условие совпадает с частичным индексом
+# idx_tasks_active_dated
+MIGRATION_CANDIDATES_SQL = """
+    SELECT id, status, due_date, scheduled_date, next_migration_at
+    FROM tasks
+    WHERE archived = 0
+    AND (due_date IS NOT NULL OR scheduled_date IS NOT NULL)
+    AND status NOT IN ('done', 'cancelled')
+"""
+
+register_hot_query('migration_candidates', MIGRATION_CANDIDATES_SQL, source='category_migration_manager')
+
+# Условие частичного индекса idx_tasks_next_migration
+MIGRATION_PENDING_WHERE = """
+    archived = 0
+    AND status NOT IN ('done', 'cancelled')
+    AND next_migration_at IS NOT NULL
+"""
+
+# Задачи, которым подошло время сменить колонку
+MIGRATION_DUE_SQL = f"""
+    SELECT id, status, due_date, scheduled_date, next_migration_at
+    FROM tasks
+    WHERE {MIGRATION_PENDING_WHERE}
+    AND next_migration_at <= ?
+"""
+
+register_hot_query('migration_due', MIGRATION_DUE_SQL, ('2025-01-01',), source='category_migration_manager')
+
+# Ближайший день смены колонки - до него планировщик спит
+MIGRATION_NEXT_SQL = f"""
+    SELECT MIN(next_migration_at)
+    FROM tasks
+    WHERE {MIGRATION_PENDING_WHERE}
+"""
+
+register_hot_query('migration_next', MIGRATION_NEXT_SQL, source='category_migration_manager')
+
+# Одна задача для пересчета колонки после записи
+MIGRATION_TASK_SQL = """
+    SELECT status, due_date, scheduled_date, next_migration_at
+    FROM tasks
+    WHERE id = ? AND archived = 0
+    AND status NOT IN ('done', 'cancelled')
+"""
+
+# next_migration_at зависит только от дат задачи. Изменение дат любым писателем
+# (импорт, другой процесс, прямой SQL) помечает задачу к проверке сегодня;
+# точную дату следующего перехода ставит проход миграции
+MIGRATION_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_next_migration_insert
+    AFTER INSERT ON tasks
+    WHEN NEW.due_date IS NOT NULL OR NEW.scheduled_date IS NOT NULL
+    BEGIN
+        UPDATE tasks SET next_migration_at = date('now', 'localtime') WHERE id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_next_migration_update
+    AFTER UPDATE OF due_date, scheduled_date ON tasks
+    WHEN NEW.due_date IS NOT OLD.due_date OR NEW.scheduled_date IS NOT OLD.scheduled_date
+    BEGIN
+        UPDATE tasks SET next_migration_at = date('now', 'localtime') WHERE id = NEW.id;
+    END
+    """,
+)
+
+
+def ensure_migration_schema(conn: sqlite3.Connection):
+    """Колонка next_migration_at и триггеры, сбрасывающие ее при изменении дат"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    if not columns:
+        return
+    if 'next_migration_at' not in columns:
+        conn.execute("ALTER TABLE tasks ADD COLUMN next_migration_at TEXT")
+        logger.database("Добавлено поле next_migration_at в таблицу tasks", "MIGRATION")
+    for sql in MIGRATION_TRIGGERS:
+        conn.execute(sql)
+
+
+MIGRATION_SECONDS = get_metrics_registry().histogram(
+    'todolite_migration_duration_seconds', 'Длительность прохода миграции категорий')
+MIGRATION_CHECKED = get_metrics_registry().counter(
+    'todolite_migration_checked_tasks_total', 'Задач проверено миграцией категорий')
+MIGRATION_MOVED = get_metrics_registry().counter(
+    'todolite_migration_moved_tasks_total', 'Задач перемещено миграцией категорий')
+MIGRATION_LAST_RUN = get_metrics_registry().gauge(
+    'todolite_migration_last_run_timestamp_seconds', 'Время последнего прохода миграции (unix)')
+
+MIGRATION_JOB = 'category_migration'
+MIGRATION_JITTER_SECONDS = 30
+
+# Минимальная пауза перед следующим проходом по next_migration_at (секунды)
+RESCHEDULE_MIN_DELAY_SECONDS = 60
+
+# Сколько завершенных запусков миграции хранить для /migrate_tasks_status
+MIGRATION_JOB_HISTORY = 20
+
+# Запуск, прогресс которого не обновлялся дольше этого срока, считается
+# прерванным (процесс, выполнявший миграцию, завершился)
+MIGRATION_JOB_STALE_SECONDS = 120
+
+# Как часто перечитывать запуск из БД, если он выполняется в другом процессе
+MIGRATION_JOB_POLL_SECONDS = 0.25
+
+# Реестр запусков общий для всех процессов (воркеры gunicorn, трей):
+# не больше одного запуска в состоянии running, статус доступен любому процессу
+MIGRATION_JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS migration_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        state TEXT NOT NULL,
+        total INTEGER,
+        checked INTEGER NOT NULL DEFAULT 0,
+        moved INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        started_at TEXT NOT NULL,
+        finished_at TEXT,
+        duration REAL,
+        version INTEGER NOT NULL DEFAULT 0,
+        heartbeat_at REAL NOT NULL
+    )
+"""
+
+# Прогресс публикуется (будит ожидающих) каждые N проверенных задач
+PROGRESS_STEP = 100
+
+
+class MigrationJob:
+    """
+    Запуск миграции: состояние, прогресс и результат.
+    
+    Запуск, выполняемый этим процессом, сохраняет изменения в migration_jobs
+    через on_change; запуски других процессов читаются из таблицы (from_row).
+    """
+    
+    def __init__(self, job_id: Optional[int], source: str, cond: threading.Condition, on_change=None):
+        self.id = job_id
+        self.source = source  # manual, scheduler
+        self.state = 'running'  # running, completed, failed
+        self.total = None
+        self.checked = 0
+        self.moved = 0
+        self.error = None
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.duration = None
+        # Номер изменения: клиент ждет, пока он не станет больше известного ему
+        self.version = 0
+        self._cond = cond
+        self._on_change = on_change
+    
+    @classmethod
+    def from_row(cls, row: sqlite3.Row, cond: threading.Condition) -> 'MigrationJob':
+        """Снимок запуска из migration_jobs"""
+        job = cls(row['id'], row['source'], cond)
+        job.state = row['state']
+        job.total = row['total']
+        job.checked = row['checked']
+        job.moved = row['moved']
+        job.error = row['error']
+        job.started_at = datetime.fromisoformat(row['started_at'])
+        job.finished_at = datetime.fromisoformat(row['finished_at']) if row['finished_at'] else None
+        job.duration = row['duration']
+        job.version = row['version']
+        return job
+    
+    @property
+    def local(self) -> bool:
+        """Запуск выполняется этим процессом"""
+        return self._on_change is not None
+    
+    @property
+    def finished(self) -> bool:
+        return self.state != 'running'
+    
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self)
+    
+    def update(self, checked: int, moved: int, total: Optional[int] = None):
+        """Обновляет прогресс и будит ожидающих"""
+        with self._cond:
+            if total is not None:
+                self.total = total
+            self.checked = checked
+            self.moved = moved
+            self.version += 1
+            self._cond.notify_all()
+        self._changed()
+    
+    def finish(self, error: Optional[str] = None):
+        with self._cond:
+            self.state = 'failed' if error else 'completed'
+            self.error = error
+            self.finished_at = datetime.now()
+            self.duration = (self.finished_at - self.started_at).total_seconds()
+            self.version += 1
+            self._cond.notify_all()
+        self._changed()
+    
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'source': self.source,
+            'state': self.state,
+            'total': self.total,
+            'checked': self.checked,
+            'moved': self.moved,
+            'progress': round(self.checked / self.total, 4) if self.total else (1.0 if self.finished else 0.0),
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'duration_seconds': round(self.duration, 3) if self.duration is not None else None,
+            'result': {'checked': self.checked, 'moved': self.moved} if self.state == 'completed' else None,
+            'error': self.error,
+            'version': self.version,
+        }
 
 
 class CategoryMigrationManager:
@@ -28,10 +253,17 @@ class CategoryMigrationManager:
         """
         self.db_path = db_path
         self.config_manager = config_manager or get_config_manager()
-        self.scheduler_thread = None
         self.scheduler_running = False
         self.scheduler_lock = threading.Lock()
         
+        # Запуски миграции этого процесса (ручные и по расписанию); общий реестр - migration_jobs
+        self._jobs = OrderedDict()
+        self._jobs_cond = threading.Condition()
+        self._active_job = None
+        # Полный проход выполнен (дальше проверяются только задачи с наступившим next_migration_at)
+        self._full_sweep_done = False
+        self._schema_ready = False
+        
         # Получаем настройки из конфигурации
         config = self.config_manager.get_config()
         auto_migration_config = config.get('auto_migration', {})
@@ -61,21 +293,12 @@ class CategoryMigrationManager:
             return date_value
         
         if isinstance(date_value, str):
-            # Пропускаем пустые строки
-            if not date_value.strip():
-                return None
+            # Даты хранятся в каноническом виде - parse_date разбирает их без strptime
             try:
-                # Пробуем разные форматы
-                for fmt in ['%Y-%m-%d', '%Y/%m/%d', '%d.%m.%Y', '%d/%m/%Y']:
-                    try:
-                        return datetime.strptime(date_value.strip(), fmt).date()
-                    except ValueError:
-                        continue
+                return parse_date(date_value)
+            except ValueError:
                 logger.warning(f"Не удалось распарсить дату: {date_value}", "MIGRATION")
                 return None
-            except Exception as e:
-                logger.error(f"Ошибка парсинга даты {date_value}: {e}", "MIGRATION")
-                return None
         
         return None
     
@@ -224,9 +447,124 @@ class CategoryMigrationManager:
         
         return False
     
-    def migrate_tasks(self) -> Tuple[int, int]:
+    def get_migration_target(self, current_status: str, due_date, scheduled_date) -> Optional[str]:
+        """
+        Определяет, в какую категорию переместить задачу
+        
+        Returns:
+            Целевая категория или None, если задачу перемещать не нужно
+        """
+        # Определяем целевую категорию
+        target_category = self.get_category_by_date(due_date, scheduled_date)
+        
+        if target_category is None:
+            return None  # Нет даты или не нужно перемещать
+        
+        # Проверяем просроченность
+        target_date = self._parse_date(due_date) if due_date else self._parse_date(scheduled_date)
+        is_overdue = target_date < datetime.now().date() if target_date else False
+        
+        # Проверяем, можно ли перемещать (передаём целевую категорию для проверки правил)
+        if not self.should_migrate_task(current_status, is_overdue, target_category):
+            return None
+        
+        # Если категория не изменилась, пропускаем
+        if current_status == target_category:
+            return None
+        
+        # Дополнительная проверка: из "new" можно перемещать ТОЛЬКО в "later" или "working"
+        if current_status == 'new' and target_category not in ['later', 'working']:
+            return None
+        
+        return target_category
+    
+    def get_next_migration_date(self, due_date, scheduled_date) -> Optional[date]:
+        """
+        День, в который категория задачи по датам сменится в следующий раз
+        
+        Колонка меняется только в полночь: в понедельник за 8 дней и меньше
+        до даты ("Далекие" -> "На неделе"), за день до даты ("Завтра"),
+        в сам день ("Сегодня") и на следующий ("просрочена"). После этого
+        переходов нет.
+        
+        Returns:
+            Дата перехода или None, если переходов больше не будет
+        """
+        target_date = self._parse_date(due_date) if due_date else self._parse_date(scheduled_date)
+        if target_date is None:
+            return None
+        
+        today = datetime.now().date()
+        # Первый понедельник, с которого дата не дальше вторника следующей недели
+        week_window = target_date - timedelta(days=8)
+        week_window += timedelta(days=(7 - week_window.weekday()) % 7)
+        candidates = (
+            week_window,
+            target_date - timedelta(days=1),
+            target_date,
+            target_date + timedelta(days=1),
+        )
+        return min((day for day in candidates if day > today), default=None)
+    
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        if not self._schema_ready:
+            ensure_migration_schema(conn)
+            conn.commit()
+            self._schema_ready = True
+    
+    def migrate_task(self, task_id: int) -> Optional[str]:
         """
-        Выполняет миграцию всех задач, которые нужно переместить
+        Пересчитывает категорию одной задачи (после создания или изменения дат/статуса)
+        и день ее следующего перехода
+        
+        Args:
+            task_id: ID задачи
+        
+        Returns:
+            Новая категория, если задача перемещена, иначе None
+        """
+        if not self.enabled or not task_id:
+            return None
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._ensure_schema(conn)
+            row = conn.execute(MIGRATION_TASK_SQL, (task_id,)).fetchone()
+            if row is None:
+                return None
+            current_status, due_date, scheduled_date, stored_next = row
+            target_category = self.get_migration_target(current_status, due_date, scheduled_date)
+            next_date = self.get_next_migration_date(due_date, scheduled_date)
+            next_value = next_date.isoformat() if next_date else None
+            if target_category is not None:
+                conn.execute("""
+                    UPDATE tasks
+                    SET status = ?, next_migration_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (target_category, next_value, task_id))
+            elif next_value != stored_next:
+                conn.execute("UPDATE tasks SET next_migration_at = ? WHERE id = ?", (next_value, task_id))
+            conn.commit()
+        finally:
+            conn.close()
+        
+        if next_date is not None:
+            self._wake_scheduler(next_date)
+        if target_category is None:
+            return None
+        MIGRATION_MOVED.inc()
+        logger.info(f"Задача #{task_id} перемещена из '{current_status}' в '{target_category}'", "MIGRATION")
+        return target_category
+    
+    def migrate_tasks(self, job: Optional[MigrationJob] = None, due_only: bool = False) -> Tuple[int, int]:
+        """
+        Выполняет миграцию всех задач, которые нужно переместить,
+        и обновляет у проверенных задач next_migration_at
+        
+        Args:
+            job: Запуск из реестра, в который пишется прогресс (опционально)
+            due_only: Проверять только задачи, у которых наступил next_migration_at
+                (по умолчанию - все активные задачи с датами)
         
         Returns:
             Кортеж (количество проверенных задач, количество перемещённых задач)
@@ -235,45 +573,36 @@ class CategoryMigrationManager:
             logger.debug("Автоматическая миграция отключена", "MIGRATION")
             return (0, 0)
         
+        started = time.perf_counter()
         try:
             conn = sqlite3.connect(self.db_path)
+            self._ensure_schema(conn)
             c = conn.cursor()
             
-            # Получаем все активные задачи с датами
-            c.execute("""
-                SELECT id, status, due_date, scheduled_date
-                FROM tasks
-                WHERE (archived IS NULL OR archived = 0)
-                AND (due_date IS NOT NULL OR scheduled_date IS NOT NULL)
-                AND status NOT IN ('done', 'cancelled')
-            """)
+            # Получаем активные задачи с датами (все или только те, чей переход наступил)
+            if due_only:
+                c.execute(MIGRATION_DUE_SQL, (datetime.now().date().isoformat(),))
+            else:
+                c.execute(MIGRATION_CANDIDATES_SQL)
             
             tasks = c.fetchall()
             checked_count = len(tasks)
             migrated_count = 0
+            next_updates = []
+            if job:
+                job.update(0, 0, total=checked_count)
             
-            for task_id, current_status, due_date, scheduled_date in tasks:
+            for index, (task_id, current_status, due_date, scheduled_date, stored_next) in enumerate(tasks, 1):
+                if job and index % PROGRESS_STEP == 0:
+                    job.update(index, migrated_count)
                 try:
-                    # Определяем целевую категорию
-                    target_category = self.get_category_by_date(due_date, scheduled_date)
+                    next_date = self.get_next_migration_date(due_date, scheduled_date)
+                    next_value = next_date.isoformat() if next_date else None
+                    if next_value != stored_next:
+                        next_updates.append((next_value, task_id))
                     
+                    target_category = self.get_migration_target(current_status, due_date, scheduled_date)
                     if target_category is None:
-                        continue  # Нет даты или не нужно перемещать
-                    
-                    # Проверяем просроченность
-                    target_date = self._parse_date(due_date) if due_date else self._parse_date(scheduled_date)
-                    is_overdue = target_date < datetime.now().date() if target_date else False
-                    
-                    # Проверяем, можно ли перемещать (передаём целевую категорию для проверки правил)
-                    if not self.should_migrate_task(current_status, is_overdue, target_category):
-                        continue
-                    
-                    # Если категория не изменилась, пропускаем
-                    if current_status == target_category:
-                        continue
-                    
-                    # Дополнительная проверка: из "new" можно перемещать ТОЛЬКО в "later" или "working"
-                    if current_status == 'new' and target_category not in ['later', 'working']:
                         continue
                     
                     # Выполняем перемещение
@@ -293,8 +622,16 @@ class CategoryMigrationManager:
                     logger.error(f"Ошибка при миграции задачи #{task_id}: {e}", "MIGRATION")
                     continue
             
+            c.executemany("UPDATE tasks SET next_migration_at = ? WHERE id = ?", next_updates)
             conn.commit()
             conn.close()
+            if job:
+                job.update(checked_count, migrated_count)
+            
+            MIGRATION_SECONDS.observe(time.perf_counter() - started)
+            MIGRATION_CHECKED.inc(checked_count)
+            MIGRATION_MOVED.inc(migrated_count)
+            MIGRATION_LAST_RUN.set(time.time())
             
             if migrated_count > 0:
                 logger.success(f"Миграция завершена: проверено {checked_count}, перемещено {migrated_count}", "MIGRATION")
@@ -305,33 +642,242 @@ class CategoryMigrationManager:
             
         except Exception as e:
             logger.error(f"Ошибка при выполнении миграции: {e}", "MIGRATION")
+            if job:
+                job.error = str(e)
             return (0, 0)
     
-    def _scheduler_loop(self):
-        """Основной цикл планировщика"""
-        logger.info(f"Планировщик миграции запущен (интервал: {self.interval_minutes} мин)", "MIGRATION")
-        
-        while self.scheduler_running:
+    # --- Реестр запусков ---------------------------------------------------
+    
+    def _connect_jobs(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(MIGRATION_JOBS_SCHEMA)
+        return conn
+    
+    def _fail_stale_jobs(self, conn: sqlite3.Connection):
+        """Завершает запуски, процесс которых перестал обновлять прогресс"""
+        conn.execute("""
+            UPDATE migration_jobs
+            SET state = 'failed', error = ?, finished_at = ?, version = version + 1
+            WHERE state = 'running' AND heartbeat_at < ?
+        """, ('Процесс, выполнявший миграцию, завершился', datetime.now().isoformat(timespec='seconds'),
+              time.time() - MIGRATION_JOB_STALE_SECONDS))
+    
+    def _begin_job(self, source: str) -> Tuple[MigrationJob, bool]:
+        """
+        Регистрирует запуск миграции. Если миграция уже выполняется (в этом
+        или другом процессе), возвращает текущий запуск вместо нового (created=False).
+        """
+        with self._jobs_cond:
+            if self._active_job is not None:
+                return self._active_job, False
+            job = MigrationJob(None, source, self._jobs_cond, on_change=self._save_job)
+            conn = self._connect_jobs()
             try:
-                # Выполняем миграцию
-                self.migrate_tasks()
-                
-                # Ждём указанный интервал
-                import time
-                sleep_seconds = int(self.interval_minutes * 60)
-                for _ in range(sleep_seconds):
-                    if not self.scheduler_running:
-                        break
-                    time.sleep(1)
-                    
-            except Exception as e:
-                logger.error(f"Ошибка в планировщике миграции: {e}", "MIGRATION")
-                import time
-                time.sleep(60)  # Ждём минуту перед повтором при ошибке
+                # Проверка и регистрация - одной транзакцией с блокировкой записи
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._fail_stale_jobs(conn)
+                    row = conn.execute(
+                        "SELECT * FROM migration_jobs WHERE state = 'running' ORDER BY id DESC LIMIT 1"
+                    ).fetchone()
+                    if row is None:
+                        job.id = conn.execute("""
+                            INSERT INTO migration_jobs (source, state, started_at, heartbeat_at)
+                            VALUES (?, ?, ?, ?)
+                        """, (source, job.state, job.started_at.isoformat(timespec='seconds'), time.time())).lastrowid
+                        conn.execute("DELETE FROM migration_jobs WHERE id <= ?", (job.id - MIGRATION_JOB_HISTORY,))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+            if row is not None:
+                return MigrationJob.from_row(row, self._jobs_cond), False
+            self._jobs[job.id] = job
+            while len(self._jobs) > MIGRATION_JOB_HISTORY:
+                self._jobs.popitem(last=False)
+            self._active_job = job
+            return job, True
+    
+    def _save_job(self, job: MigrationJob):
+        """Сохраняет прогресс запуска этого процесса (заодно продлевает heartbeat_at)"""
+        try:
+            conn = self._connect_jobs()
+            try:
+                conn.execute("""
+                    UPDATE migration_jobs
+                    SET state = ?, total = ?, checked = ?, moved = ?, error = ?, finished_at = ?,
+                        duration = ?, version = ?, heartbeat_at = ?
+                    WHERE id = ?
+                """, (job.state, job.total, job.checked, job.moved, job.error,
+                      job.finished_at.isoformat(timespec='seconds') if job.finished_at else None,
+                      job.duration, job.version, time.time(), job.id))
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения запуска миграции #{job.id}: {e}", "MIGRATION")
+    
+    def _load_job(self, job_id: Optional[int] = None) -> Optional[MigrationJob]:
+        """Запуск из migration_jobs по id; без id - последний"""
+        conn = self._connect_jobs()
+        try:
+            self._fail_stale_jobs(conn)
+            if job_id is None:
+                row = conn.execute("SELECT * FROM migration_jobs ORDER BY id DESC LIMIT 1").fetchone()
+            else:
+                row = conn.execute("SELECT * FROM migration_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return MigrationJob.from_row(row, self._jobs_cond) if row else None
+    
+    def _run_job(self, job: MigrationJob, due_only: bool = False) -> Tuple[int, int]:
+        try:
+            result = self.migrate_tasks(job, due_only)
+        except Exception as e:
+            job.error = str(e)
+            result = (0, 0)
+        with self._jobs_cond:
+            self._active_job = None
+            if not job.error and not due_only:
+                self._full_sweep_done = True
+        job.finish(job.error)
+        return result
+    
+    def run_migration_job(self, source: str = 'scheduler', due_only: bool = False) -> Tuple[int, int]:
+        """
+        Выполняет миграцию в текущем потоке через реестр запусков
+        (если миграция уже идет, новая не начинается)
+        """
+        job, created = self._begin_job(source)
+        if not created:
+            logger.info(f"Миграция #{job.id} уже выполняется, запуск ({source}) пропущен", "MIGRATION")
+            return (0, 0)
+        return self._run_job(job, due_only)
+    
+    def run_scheduled_migration(self) -> Tuple[int, int]:
+        """
+        Проход по расписанию. Первый раз - полный (заполняет next_migration_at),
+        дальше - только задачи, у которых наступил день перехода. После прохода
+        задача планировщика переносится на ближайший next_migration_at.
+        """
+        try:
+            return self.run_migration_job('scheduler', due_only=self._full_sweep_done)
+        finally:
+            self._schedule_next_run()
+    
+    def get_next_migration_at(self) -> Optional[date]:
+        """Ближайший день, в который какая-то задача сменит колонку"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._ensure_schema(conn)
+            value = conn.execute(MIGRATION_NEXT_SQL).fetchone()[0]
+        finally:
+            conn.close()
+        return self._parse_date(value) if value else None
+    
+    def _schedule_next_run(self):
+        """
+        Переносит задачу планировщика на полночь ближайшего next_migration_at
+        
+        Не позже чем через interval_minutes: задачи, измененные другим процессом,
+        будят только свой процесс, а не ведущий.
+        """
+        if not self.scheduler_running:
+            return
+        now = datetime.now()
+        latest = now + timedelta(minutes=self.interval_minutes)
+        try:
+            next_date = self.get_next_migration_at()
+        except Exception as e:
+            logger.error(f"Ошибка получения ближайшего перехода: {e}", "MIGRATION")
+            return
+        if next_date is None:
+            run_at = latest
+        else:
+            # Не чаще раза в минуту, даже если проверить задачу не удалось и она осталась к проверке
+            earliest = now + timedelta(seconds=RESCHEDULE_MIN_DELAY_SECONDS)
+            run_at = min(max(datetime.combine(next_date, datetime.min.time()), earliest), latest)
+        get_job_scheduler().reschedule(MIGRATION_JOB, run_at.timestamp())
+        logger.debug(f"Следующая проверка миграции: {run_at.isoformat(timespec='seconds')}", "MIGRATION")
+    
+    def _wake_scheduler(self, next_date: date):
+        """Будит планировщик раньше, если переход задачи наступит до запланированной проверки"""
+        if not self.scheduler_running:
+            return
+        scheduler = get_job_scheduler()
+        job = scheduler.get_job(MIGRATION_JOB)
+        run_at = datetime.combine(next_date, datetime.min.time()).timestamp()
+        if job is not None and job.next_run_at is not None and run_at < job.next_run_at:
+            scheduler.reschedule(MIGRATION_JOB, max(run_at, time.time()))
+    
+    def start_migration_job(self, source: str = 'manual', callback=None) -> Tuple[MigrationJob, bool]:
+        """
+        Запускает миграцию в отдельном потоке
+        
+        Args:
+            source: Источник запуска (для статуса)
+            callback: Функция обратного вызова с результатом (checked_count, migrated_count)
+        
+        Returns:
+            Кортеж (запуск, создан ли новый); при уже идущей миграции возвращается она
+        """
+        job, created = self._begin_job(source)
+        if not created:
+            return job, False
+        
+        def run_migration():
+            result = self._run_job(job)
+            if callback:
+                try:
+                    callback(result)
+                except Exception as e:
+                    logger.error(f"Ошибка при асинхронной миграции: {e}", "MIGRATION")
+        
+        threading.Thread(target=run_migration, name=f"migration-{job.id}", daemon=True).start()
+        return job, True
+    
+    def get_job(self, job_id: Optional[int] = None) -> Optional[MigrationJob]:
+        """Запуск по id; без id - последний (из всех процессов)"""
+        with self._jobs_cond:
+            if job_id is not None and job_id in self._jobs:
+                return self._jobs[job_id]
+        job = self._load_job(job_id)
+        if job is None:
+            return None
+        with self._jobs_cond:
+            # Запуск этого процесса отдаем живым объектом, чтобы ждать его без опроса БД
+            return self._jobs.get(job.id, job)
+    
+    def wait_for_job(self, job: MigrationJob, since_version: int, timeout: float) -> MigrationJob:
+        """
+        Ждет изменения запуска (прогресс или завершение) не дольше timeout секунд
+        
+        Returns:
+            Запуск с последним известным состоянием (для запуска другого процесса - новый снимок)
+        """
+        deadline = time.monotonic() + timeout
+        if not job.local:
+            # Запуск другого процесса: опрашиваем migration_jobs
+            while job.version <= since_version and not job.finished:
+                remaining = deadline - time.monotonic()
+                if not remaining > 0:  # в том числе nan
+                    break
+                time.sleep(min(MIGRATION_JOB_POLL_SECONDS, remaining))
+                job = self._load_job(job.id) or job
+            return job
+        with self._jobs_cond:
+            while job.version <= since_version and not job.finished:
+                remaining = deadline - time.monotonic()
+                if not remaining > 0:  # в том числе nan
+                    break
+                self._jobs_cond.wait(remaining)
+        return job
     
     def start_scheduler(self, interval_minutes: Optional[int] = None):
         """
-        Запускает периодическую проверку
+        Запускает периодическую проверку (задача category_migration планировщика задач)
         
         Args:
             interval_minutes: Интервал проверки в минутах (если None, используется из конфига)
@@ -349,9 +895,12 @@ class CategoryMigrationManager:
                 return
             
             self.scheduler_running = True
-            self.scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
-            self.scheduler_thread.start()
-            logger.success("Планировщик миграции запущен", "MIGRATION")
+            # Первый проход сразу, как и раньше; небольшой разброс, чтобы не совпадать с бэкапом
+            get_job_scheduler().add_job(
+                MIGRATION_JOB, self.run_scheduled_migration, IntervalTrigger(self.interval_minutes * 60),
+                jitter_seconds=MIGRATION_JITTER_SECONDS, run_immediately=True
+            )
+            logger.success(f"Планировщик миграции запущен (интервал: {self.interval_minutes} мин)", "MIGRATION")
     
     def stop_scheduler(self):
         """Останавливает планировщик"""
@@ -360,8 +909,7 @@ class CategoryMigrationManager:
                 return
             
             self.scheduler_running = False
-            if self.scheduler_thread and self.scheduler_thread.is_alive():
-                self.scheduler_thread.join(timeout=5)
+            get_job_scheduler().remove_job(MIGRATION_JOB, timeout=5)
             
             logger.info("Планировщик миграции остановлен", "MIGRATION")
     
@@ -371,20 +919,12 @@ class CategoryMigrationManager:
         
         Args:
             callback: Функция обратного вызова с результатом (checked_count, migrated_count)
+        
+        Returns:
+            Запуск миграции (MigrationJob)
         """
-        def run_migration():
-            try:
-                result = self.migrate_tasks()
-                if callback:
-                    callback(result)
-            except Exception as e:
-                logger.error(f"Ошибка при асинхронной миграции: {e}", "MIGRATION")
-                if callback:
-                    callback((0, 0))
-        
-        thread = threading.Thread(target=run_migration, daemon=True)
-        thread.start()
-        return thread
+        job, _ = self.start_migration_job('manual', callback)
+        return job
 
 
 # Глобальный экземпляр
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Журнал изменений для восстановления на момент времени
+"""
+
+import sqlite3
+import os
+import gzip
+import json
+import threading
+from datetime import datetime
+from logger import logger
+from backup_catalog import BackupCatalog
+
+# Таблицы, изменения которых попадают в журнал
+JOURNALED_TABLES = ('tasks', 'task_comments')
+
+# Текущее время в миллисекундах Unix epoch (не зависит от часового пояса)
+_NOW_MS_SQL = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+# Запас при воспроизведении: изменения, сделанные во время копирования снимка
+REPLAY_MARGIN_MS = 60 * 1000
+
+# Служебные колонки, которые приложение пересчитывает само (не журналируются)
+JOURNAL_IGNORED_COLUMNS = {'tasks': ('next_migration_at',)}
+
+# Колонки, изменение только которых не создает запись журнала
+# (например, отметка об отправленном напоминании)
+JOURNAL_UNCOMPARED_COLUMNS = ('updated_at',)
+
+# Неотгруженные записи старше этого срока означают, что отгрузка не работает
+# (не запущен ведущий процесс с планировщиками)
+STALE_PENDING_SECONDS = 15 * 60
+
+
+def datetime_to_ms(value):
+    """Переводит локальный datetime в миллисекунды Unix epoch."""
+    return int(value.timestamp() * 1000)
+
+
+class ChangeJournal:
+    """
+    Журнал изменений задач и комментариев.
+
+    Изменения фиксируются триггерами SQLite в таблицу change_journal
+    (полный образ строки для вставки/обновления, id для удаления),
+    периодически отгружаются сжатыми сегментами во все направления
+    бэкапа и воспроизводятся поверх снимка при восстановлении.
+    """
+
+    def __init__(self, backup_manager, db_path=None):
+        self.backup_manager = backup_manager
+        self.db_path = db_path or backup_manager.db_path
+        self.lock = threading.Lock()
+
+    @property
+    def settings(self):
+        """Настройки журнала из backup.journal."""
+        return self.backup_manager.backup_settings.get('journal', {}) or {}
+
+    @property
+    def enabled(self):
+        return bool(self.settings.get('enabled', False))
+
+    @property
+    def ship_interval_seconds(self):
+        """
+        Интервал отгрузки (backup.journal.ship_interval_seconds); None - периодической
+        отгрузки нет: журнал отключен или интервал 0 (отгрузка только перед снимком).
+        """
+        if not self.enabled:
+            return None
+        interval = int(self.settings.get('ship_interval_seconds', 5))
+        return interval if interval > 0 else None
+
+    def pending_age_seconds(self):
+        """Возраст самой старой неотгруженной записи в секундах (None - журнал пуст)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_journal'").fetchone():
+                return None
+            oldest_ms = conn.execute("SELECT MIN(ts) FROM change_journal").fetchone()[0]
+        finally:
+            conn.close()
+        if oldest_ms is None:
+            return None
+        return max(0.0, datetime.now().timestamp() - oldest_ms / 1000)
+
+    def sync(self):
+        """Приводит триггеры к настройкам: пересоздает под текущую схему или снимает."""
+        if self.enabled:
+            self.install()
+        else:
+            self.uninstall()
+
+    def install(self):
+        """
+        Создает таблицу журнала и (пере)создает триггеры под текущую схему.
+
+        Вызывается из init_db после добавления колонок, иначе новые колонки
+        не попадут в журналируемые строки.
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute('''CREATE TABLE IF NOT EXISTS change_journal
+                         (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                          ts INTEGER NOT NULL,
+                          table_name TEXT NOT NULL,
+                          op TEXT NOT NULL,
+                          row_id INTEGER NOT NULL,
+                          data TEXT)''')
+            for table in JOURNALED_TABLES:
+                c.execute("PRAGMA table_info(%s)" % table)
+                ignored = JOURNAL_IGNORED_COLUMNS.get(table, ())
+                columns = [column[1] for column in c.fetchall() if column[1] not in ignored]
+                if not columns:
+                    continue
+                self._drop_triggers(c, table)
+                row_json = "json_object(%s)" % ", ".join(
+                    "'%s', NEW.%s" % (col, col) for col in columns
+                )
+                # UPDATE без изменения данных (служебные колонки, повторная запись тех же значений) не журналируется
+                changed = " OR ".join(
+                    "NEW.%s IS NOT OLD.%s" % (col, col) for col in columns if col not in JOURNAL_UNCOMPARED_COLUMNS
+                )
+                for event in ('INSERT', 'UPDATE'):
+                    when = f"WHEN {changed}" if event == 'UPDATE' else ""
+                    c.execute(f'''CREATE TRIGGER trg_journal_{table}_{event.lower()}
+                                  AFTER {event} ON {table}
+                                  {when}
+                                  BEGIN
+                                      INSERT INTO change_journal (ts, table_name, op, row_id, data)
+                                      VALUES ({_NOW_MS_SQL}, '{table}', 'upsert', NEW.id, {row_json});
+                                  END''')
+                c.execute(f'''CREATE TRIGGER trg_journal_{table}_delete
+                              AFTER DELETE ON {table}
+                              BEGIN
+                                  INSERT INTO change_journal (ts, table_name, op, row_id, data)
+                                  VALUES ({_NOW_MS_SQL}, '{table}', 'delete', OLD.id, NULL);
+                              END''')
+            conn.commit()
+            logger.info("Триггеры журнала изменений установлены", "JOURNAL")
+        finally:
+            conn.close()
+
+    def uninstall(self):
+        """Удаляет триггеры журнала (таблица с неотгруженными изменениями сохраняется)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            for table in JOURNALED_TABLES:
+                self._drop_triggers(c, table)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _drop_triggers(self, cursor, table):
+        for event in ('insert', 'update', 'delete'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_journal_{table}_{event}")
+
+    def ship(self, max_entries=10000):
+        """
+        Отгружает накопленные изменения сегментом во все направления бэкапа.
+
+        Изменения удаляются из БД только после записи хотя бы в одно направление.
+
+        Returns:
+            Количество отгруженных записей
+        """
+        with self.lock:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                c = conn.cursor()
+                c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='change_journal'")
+                if not c.fetchone():
+                    return 0
+                c.execute(
+                    "SELECT seq, ts, table_name, op, row_id, data FROM change_journal ORDER BY seq LIMIT ?",
+                    (max_entries,)
+                )
+                rows = c.fetchall()
+                if not rows:
+                    return 0
+
+                lines = []
+                for seq, ts, table_name, op, row_id, data in rows:
+                    lines.append(json.dumps({
+                        'seq': seq, 'ts': ts, 'table': table_name, 'op': op,
+                        'id': row_id, 'data': json.loads(data) if data else None
+                    }, ensure_ascii=False))
+                payload = gzip.compress(("\n".join(lines) + "\n").encode('utf-8'))
+                segment_name = f"todolite_journal_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl.gz"
+                first_ts, last_ts = rows[0][1], rows[-1][1]
+
+                shipped = 0
+                for directory in self.backup_manager.get_destinations():
+                    try:
+                        os.makedirs(directory, exist_ok=True)
+                        segment_path = os.path.join(directory, segment_name)
+                        with open(segment_path + '.tmp', 'wb') as f:
+                            f.write(payload)
+                        os.replace(segment_path + '.tmp', segment_path)
+                        BackupCatalog(directory).add_segment(segment_name, first_ts, last_ts, len(rows), len(payload))
+                        shipped += 1
+                    except Exception as e:
+                        logger.error(f"Не удалось отгрузить журнал в {directory}: {e}", "JOURNAL")
+
+                if not shipped:
+                    return 0
+
+                c.execute("DELETE FROM change_journal WHERE seq <= ?", (rows[-1][0],))
+                conn.commit()
+                logger.debug(f"Отгружено изменений журнала: {len(rows)} ({segment_name})", "JOURNAL")
+                return len(rows)
+            finally:
+                conn.close()
+
+    def _iter_entries(self, since_ms, until_ms):
+        """Возвращает записи журнала из всех направлений в порядке их появления."""
+        segments = {}
+        for directory in self.backup_manager.get_destinations():
+            if not os.path.exists(directory):
+                continue
+            try:
+                for segment in BackupCatalog(directory).list_segments(since_ms=since_ms, until_ms=until_ms):
+                    # Один и тот же сегмент лежит в нескольких направлениях — берем первый доступный
+                    if segment['name'] not in segments and os.path.exists(segment['path']):
+                        segments[segment['name']] = segment['path']
+            except Exception as e:
+                logger.error(f"Ошибка чтения сегментов журнала в {directory}: {e}", "JOURNAL")
+
+        for name in sorted(segments):
+            with gzip.open(segments[name], 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if since_ms <= entry['ts'] <= until_ms:
+                        yield entry
+
+    def replay(self, target_db_path, since_ms, until_ms):
+        """
+        Воспроизводит журнал поверх копии БД.
+
+        Записи содержат полный образ строки, поэтому повторное применение
+        изменений, уже попавших в снимок, безопасно.
+
+        Returns:
+            Количество примененных записей
+        """
+        conn = sqlite3.connect(target_db_path)
+        try:
+            c = conn.cursor()
+            table_columns = {}
+            applied = 0
+            for entry in self._iter_entries(since_ms, until_ms):
+                table = entry['table']
+                if table not in JOURNALED_TABLES:
+                    continue
+                if entry['op'] == 'delete':
+                    c.execute(f"DELETE FROM {table} WHERE id = ?", (entry['id'],))
+                else:
+                    if table not in table_columns:
+                        c.execute("PRAGMA table_info(%s)" % table)
+                        table_columns[table] = {column[1] for column in c.fetchall()}
+                    data = {k: v for k, v in entry['data'].items() if k in table_columns[table]}
+                    fields = list(data.keys())
+                    placeholders = ','.join('?' for _ in fields)
+                    c.execute(
+                        f"INSERT OR REPLACE INTO {table} ({','.join(fields)}) VALUES ({placeholders})",
+                        [data[f] for f in fields]
+                    )
+                applied += 1
+
+            # Неотгруженные на момент снимка изменения уже отражены в его данных,
+            # а записи, созданные триггерами при воспроизведении, уже есть в сегментах
+            c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='change_journal'")
+            if c.fetchone():
+                c.execute("DELETE FROM change_journal")
+            conn.commit()
+            return applied
+        finally:
+            conn.close()
+
+    def prune_segments(self, directory, before):
+        """Удаляет сегменты, которые целиком старше момента before (datetime)."""
+        catalog = BackupCatalog(directory)
+        for segment in catalog.list_segments(until_ms=datetime_to_ms(before) - REPLAY_MARGIN_MS, strictly_before=True):
+            try:
+                os.remove(segment['path'])
+            except FileNotFoundError:
+                pass
+            catalog.remove_segment(segment['name'])
+            logger.debug(f"Удален старый сегмент журнала: {segment['path']}", "JOURNAL")
@@ -38,7 +38,11 @@ class ConfigManager:
                     "D:\\Backups\\ToDoLite"
                 ],
                 "max_backups": 10,
-                "compress": True
+                "compress": True,
+                "journal": {
+                    "enabled": False,
+                    "ship_interval_seconds": 5
+                }
             },
             "notifications": {
                 "enabled": True,
@@ -62,6 +66,54 @@ class ConfigManager:
                 "enabled": True,
                 "interval_minutes": 30
             },
+            "instrumentation": {
+                "enabled": True,
+                "server_timing": True,
+                "profiler_enabled": False,
+                "profile_sample_rate": 0.0,
+                "window_minutes": 10
+            },
+            "metrics": {
+                "enabled": True
+            },
+            "database": {
+                "slow_query_ms": 100,
+                "slow_query_log_size": 200
+            },
+            "logging": {
+                "level": "INFO",
+                "format": "text",
+                "async": True,
+                "colors": True,
+                "file": {
+                    "enabled": False,
+                    "path": "logs/todolite.log",
+                    "max_bytes": 10485760,
+                    "backup_count": 5,
+                    "format": "json"
+                }
+            },
+            "server": {
+                "host": "0.0.0.0",
+                "port": 5000,
+                "engine": "auto",
+                "workers": 1,
+                "threads": 8,
+                "keepalive_seconds": 5,
+                "backlog": 1024,
+                "connection_limit": 100,
+                "timeout_seconds": 120,
+                "run_schedulers": True
+            },
+            "leader_election": {
+                "enabled": True,
+                "lease_ttl_seconds": 30,
+                "heartbeat_seconds": 10
+            },
+            "jobs": {
+                "history_size": 200,
+                "max_runtime_minutes": 30
+            },
             "eisenhower_order": [
                 "urgent_important",
                 "urgent_not_important", 
@@ -212,6 +264,63 @@ class ConfigManager:
             'interval_minutes': self.get('auto_migration.interval_minutes', 30)
         }
     
+    def get_instrumentation_config(self):
+        """Получает конфигурацию инструментирования запросов"""
+        return {
+            'enabled': self.get('instrumentation.enabled', True),
+            'server_timing': self.get('instrumentation.server_timing', True),
+            'profiler_enabled': self.get('instrumentation.profiler_enabled', False),
+            'profile_sample_rate': self.get('instrumentation.profile_sample_rate', 0.0),
+            'window_minutes': self.get('instrumentation.window_minutes', 10)
+        }
+    
+    def get_database_config(self):
+        """Получает конфигурацию работы с базой данных"""
+        return {
+            'slow_query_ms': self.get('database.slow_query_ms', 100),
+            'slow_query_log_size': self.get('database.slow_query_log_size', 200)
+        }
+    
+    def get_logging_config(self):
+        """Получает конфигурацию логирования (аргументы logger.configure)"""
+        return {
+            'level': self.get('logging.level', 'INFO'),
+            'format': self.get('logging.format', 'text'),
+            'async_mode': self.get('logging.async', True),
+            'colors': self.get('logging.colors', True),
+            'file': self.get('logging.file', {'enabled': False})
+        }
+    
+    def get_server_config(self):
+        """Получает конфигурацию WSGI-сервера (python -m todolite serve)"""
+        return {
+            'host': self.get('server.host', '0.0.0.0'),
+            'port': self.get('server.port', 5000),
+            'engine': self.get('server.engine', 'auto'),
+            'workers': self.get('server.workers', 1),
+            'threads': self.get('server.threads', 8),
+            'keepalive_seconds': self.get('server.keepalive_seconds', 5),
+            'backlog': self.get('server.backlog', 1024),
+            'connection_limit': self.get('server.connection_limit', 100),
+            'timeout_seconds': self.get('server.timeout_seconds', 120),
+            'run_schedulers': self.get('server.run_schedulers', True)
+        }
+    
+    def get_leader_election_config(self):
+        """Получает конфигурацию выбора ведущего процесса для планировщиков"""
+        return {
+            'enabled': self.get('leader_election.enabled', True),
+            'lease_ttl_seconds': self.get('leader_election.lease_ttl_seconds', 30),
+            'heartbeat_seconds': self.get('leader_election.heartbeat_seconds', 10)
+        }
+    
+    def get_jobs_config(self):
+        """Получает конфигурацию планировщика фоновых задач"""
+        return {
+            'history_size': self.get('jobs.history_size', 200),
+            'max_runtime_minutes': self.get('jobs.max_runtime_minutes', 30)
+        }
+    
     def get_config(self):
         """Получает полную конфигурацию"""
         return self.config
@@ -6,9 +6,20 @@ ToDoLite - Унифицированный менеджер базы данных
 
 import sqlite3
 import threading
+import time
 import os
 from contextlib import contextmanager
 from logger import logger
+from date_utils import normalize_task_dates
+from index_advisor import PRIORITY_RANK_SQL, register_hot_query
+from instrumentation import get_instrumentation
+from metrics import get_metrics_registry
+from slow_query_log import get_slow_query_log
+
+DB_LOCK_WAIT_SECONDS = get_metrics_registry().histogram(
+    'todolite_db_lock_wait_seconds', 'Ожидание блокировки DatabaseManager перед запросом')
+DB_QUERY_SECONDS = get_metrics_registry().histogram(
+    'todolite_db_query_seconds', 'Выполнение SQL-запросов DatabaseManager (без ожидания блокировки)')
 
 class DatabaseManager:
     """
@@ -144,30 +155,37 @@ class DatabaseManager:
         Returns:
             Результат запроса или None при ошибке
         """
-        with self.lock:
-            conn = self.get_connection()
-            try:
-                c = conn.cursor()
-                c.execute(query, params or ())
-                
-                if fetch:
-                    result = c.fetchall()
-                elif fetchone:
-                    result = c.fetchone()
-                else:
-                    result = c.lastrowid
-                
-                conn.commit()
-                return result
-                
-            except Exception as e:
-                conn.rollback()
-                logger.error(f"Ошибка выполнения запроса: {e}", "DATABASE")
-                logger.error(f"Запрос: {query}", "DATABASE")
-                logger.error(f"Параметры: {params}", "DATABASE")
-                raise
-            finally:
-                conn.close()
+        started = time.perf_counter()
+        acquired = finished = None
+        try:
+            with self.lock:
+                acquired = time.perf_counter()
+                conn = self.get_connection()
+                try:
+                    c = conn.cursor()
+                    c.execute(query, params or ())
+                    
+                    if fetch:
+                        result = c.fetchall()
+                    elif fetchone:
+                        result = c.fetchone()
+                    else:
+                        result = c.lastrowid
+                    
+                    conn.commit()
+                    return result
+                    
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Ошибка выполнения запроса: {e}", "DATABASE")
+                    logger.error(f"Запрос: {query}", "DATABASE")
+                    logger.error(f"Параметры: {params}", "DATABASE")
+                    raise
+                finally:
+                    conn.close()
+                    finished = time.perf_counter()
+        finally:
+            self._observe_query(query, params, started, acquired, finished)
     
     def execute_many(self, query, params_list):
         """
@@ -180,20 +198,44 @@ class DatabaseManager:
         Returns:
             Количество обработанных строк
         """
-        with self.lock:
-            conn = self.get_connection()
-            try:
-                c = conn.cursor()
-                c.executemany(query, params_list)
-                conn.commit()
-                return c.rowcount
-                
-            except Exception as e:
-                conn.rollback()
-                logger.error(f"Ошибка выполнения множественного запроса: {e}", "DATABASE")
-                raise
-            finally:
-                conn.close()
+        started = time.perf_counter()
+        acquired = finished = None
+        try:
+            with self.lock:
+                acquired = time.perf_counter()
+                conn = self.get_connection()
+                try:
+                    c = conn.cursor()
+                    c.executemany(query, params_list)
+                    conn.commit()
+                    return c.rowcount
+                    
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"Ошибка выполнения множественного запроса: {e}", "DATABASE")
+                    raise
+                finally:
+                    conn.close()
+                    finished = time.perf_counter()
+        finally:
+            # Для EXPLAIN берется первый набор параметров
+            self._observe_query(query, params_list[0] if params_list else None, started, acquired, finished)
+    
+    def _observe_query(self, query, params, started, acquired, finished):
+        """
+        Записывает метрики и журнал медленных запросов.
+
+        Вызывается после освобождения self.lock: для медленного запроса журнал
+        выполняет EXPLAIN QUERY PLAN на отдельном соединении, и другие потоки
+        не должны ждать его на блокировке.
+        """
+        if acquired is None or finished is None:
+            return
+        DB_LOCK_WAIT_SECONDS.observe(acquired - started)
+        DB_QUERY_SECONDS.observe(finished - acquired)
+        # Время с ожиданием блокировки - в фазу db текущего HTTP-запроса
+        get_instrumentation().record_query(query, finished - started)
+        get_slow_query_log().record(self.db_path, query, params, finished - acquired, acquired - started)
     
     def get_tasks(self, **filters):
         """
@@ -247,6 +289,9 @@ class DatabaseManager:
         Returns:
             ID созданной задачи
         """
+        # Даты сохраняются в каноническом виде (ValueError при некорректной дате)
+        normalize_task_dates(task_data)
+        
         # Подготавливаем поля и значения
         fields = list(task_data.keys())
         values = list(task_data.values())
@@ -270,12 +315,13 @@ class DatabaseManager:
         if not task_data:
             return 0
         
-        # Добавляем updated_at
-        task_data['updated_at'] = 'CURRENT_TIMESTAMP'
+        # Даты сохраняются в каноническом виде (ValueError при некорректной дате)
+        normalize_task_dates(task_data)
         
         fields = list(task_data.keys())
         values = list(task_data.values())
-        set_clause = ','.join([f"{field} = ?" for field in fields])
+        # updated_at выставляется самой БД (не строкой 'CURRENT_TIMESTAMP' в параметре)
+        set_clause = ','.join([f"{field} = ?" for field in fields] + ["updated_at = CURRENT_TIMESTAMP"])
         
         query = f"UPDATE tasks SET {set_clause} WHERE id = ?"
         values.append(task_id)
@@ -405,10 +451,12 @@ class DatabaseManager:
                 select_fields.append("t.tags")
             else:
                 select_fields.append("'' as tags")
-            select_fields.append("GROUP_CONCAT(tc.comment, ' ') as comments")
+            # Комментарии коррелированным подзапросом (по idx_task_comments_task_id):
+            # без GROUP BY сортировка доски берется из индекса, а не из временного B-дерева
+            select_fields.append("(SELECT GROUP_CONCAT(tc.comment, ' ') FROM task_comments tc WHERE tc.task_id = t.id) as comments")
             
-            from_clause = "FROM tasks t LEFT JOIN task_comments tc ON t.id = tc.task_id"
-            group_by = "GROUP BY t.id"
+            from_clause = "FROM tasks t"
+            group_by = ""
         else:
             select_fields = ["id", "title"]
             if has_short_desc:
@@ -460,9 +508,11 @@ class DatabaseManager:
         # Используем кэшированную информацию о структуре БД
         has_archived = self._check_column_exists('tasks', 'archived')
         if has_archived:
-            where_clause = "WHERE (archived = 0 OR archived IS NULL)"
+            # archived у активных задач всегда 0 (NULL нормализуется при старте),
+            # условие совпадает с условием частичных индексов
+            where_clause = "WHERE archived = 0"
             if include_comments:
-                where_clause = "WHERE (t.archived = 0 OR t.archived IS NULL)"
+                where_clause = "WHERE t.archived = 0"
         else:
             # Колонка отсутствует - не фильтруем по archived
             where_clause = ""
@@ -470,18 +520,13 @@ class DatabaseManager:
                 where_clause = ""
         
         # ORDER BY в зависимости от режима
+        # Даты хранятся в каноническом виде, пустые - NULL (сортируются первыми),
+        # поэтому сортировка по due_date не требует COALESCE
         if mode == 'eisenhower' or mode == 'kanban':
-            order_by = """
-                ORDER BY 
-                    CASE priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END,
-                    COALESCE(due_date, '') ASC
-            """
+            # Выражение ранга совпадает с индексом idx_tasks_board_rank
+            order_by = f"ORDER BY {PRIORITY_RANK_SQL.format(column='priority')}, due_date ASC"
             if include_comments:
-                order_by = """
-                    ORDER BY 
-                        CASE t.priority WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END,
-                        COALESCE(t.due_date, '') ASC
-                """
+                order_by = f"ORDER BY {PRIORITY_RANK_SQL.format(column='t.priority')}, t.due_date ASC"
         else:
             order_by = "ORDER BY created_at DESC"
             if include_comments:
@@ -538,3 +583,17 @@ def get_db_manager():
     if _db_manager is None:
         _db_manager = DatabaseManager()
     return _db_manager
+
+
+def _board_query(mode):
+    """Фабрика запроса доски для index_advisor (под схему проверяемой БД)."""
+    def build(db_path):
+        db = get_db_manager()
+        if os.path.abspath(db.db_path) != os.path.abspath(db_path):
+            db = DatabaseManager(db_path)
+        return db.get_tasks_base_query(mode=mode, include_comments=True)
+    return build
+
+
+register_hot_query('board_kanban', _board_query('kanban'), source='database_manager')
+register_hot_query('board_list', _board_query('list'), source='database_manager')
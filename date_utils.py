@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Разбор и нормализация дат
+
+Даты задач хранятся в каноническом виде, который сортируется как строка
+и поддерживается индексами:
+    scheduled_date, due_date - 'YYYY-MM-DD'
+    reminder_time            - 'YYYY-MM-DDTHH:MM' (формат input datetime-local)
+Пустое значение хранится как NULL.
+"""
+
+from datetime import datetime, date
+from functools import lru_cache
+from logger import logger
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M'
+
+# Колонки tasks с датой и с датой-временем
+DATE_COLUMNS = ('scheduled_date', 'due_date')
+DATETIME_COLUMNS = ('reminder_time',)
+
+# Размер кэша форматирования дат для шаблонов (ключ - исходная строка)
+FORMAT_CACHE_SIZE = 4096
+
+# Устаревшие форматы (ввод вручную, импорт); ISO 8601 разбирается отдельно
+LEGACY_DATE_FORMATS = ('%d.%m.%Y', '%Y/%m/%d', '%d/%m/%Y')
+LEGACY_DATETIME_FORMATS = ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%Y/%m/%d %H:%M', '%d/%m/%Y %H:%M')
+
+
+def _is_iso_date_prefix(text):
+    """Проверяет, что строка начинается с 'YYYY-MM-DD' (без strptime)."""
+    return (len(text) >= 10 and text[4] == '-' and text[7] == '-'
+            and text[:4].isdigit() and text[5:7].isdigit() and text[8:10].isdigit())
+
+
+def _to_local_naive(moment):
+    """Переводит время с часовым поясом в локальное и отбрасывает зону."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone()
+    return moment.replace(tzinfo=None)
+
+
+def parse_date(value):
+    """
+    Разбирает дату.
+
+    Args:
+        value: Строка, date/datetime или None
+
+    Returns:
+        Объект date или None для пустого значения
+
+    Raises:
+        ValueError: Если строку не удалось разобрать
+    """
+    if value is None:
+        return None
+    # datetime проверяем перед date, т.к. datetime наследуется от date
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if not text:
+        return None
+
+    if _is_iso_date_prefix(text):
+        # Быстрый путь: канонический вид
+        if len(text) == 10:
+            return date(int(text[:4]), int(text[5:7]), int(text[8:10]))
+        # ISO с временем: время проверяется так же, как в parse_datetime
+        if text[10] in 'T ':
+            return parse_datetime(text).date()
+
+    for fmt in LEGACY_DATE_FORMATS + LEGACY_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Некорректная дата: {value}")
+
+
+def parse_datetime(value):
+    """
+    Разбирает дату со временем (дата без времени - полночь).
+
+    Returns:
+        Объект datetime (локальное время без часового пояса) или None для пустого значения
+
+    Raises:
+        ValueError: Если строку не удалось разобрать
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return _to_local_naive(value)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+
+    text = str(value).strip()
+    if not text:
+        return None
+
+    if _is_iso_date_prefix(text):
+        # Быстрый путь: 'YYYY-MM-DD' и 'YYYY-MM-DD[T ]HH:MM[:SS]'
+        if len(text) == 10:
+            return datetime(int(text[:4]), int(text[5:7]), int(text[8:10]))
+        if len(text) in (16, 19) and text[10] in 'T ' and text[13] == ':' and text[11:13].isdigit() and text[14:16].isdigit():
+            second = 0
+            if len(text) == 19:
+                if text[16] != ':' or not text[17:19].isdigit():
+                    raise ValueError(f"Некорректное время: {value}")
+                second = int(text[17:19])
+            return datetime(int(text[:4]), int(text[5:7]), int(text[8:10]),
+                            int(text[11:13]), int(text[14:16]), second)
+        try:
+            return _to_local_naive(datetime.fromisoformat(text.replace('Z', '+00:00')))
+        except ValueError:
+            pass
+
+    for fmt in LEGACY_DATETIME_FORMATS + LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Некорректное время: {value}")
+
+
+def normalize_date(value):
+    """Приводит дату к виду 'YYYY-MM-DD' (None для пустого значения)."""
+    parsed = parse_date(value)
+    return parsed.strftime(DATE_FORMAT) if parsed else None
+
+
+def normalize_datetime(value):
+    """Приводит дату-время к виду 'YYYY-MM-DDTHH:MM' (None для пустого значения)."""
+    parsed = parse_datetime(value)
+    return parsed.strftime(DATETIME_FORMAT) if parsed else None
+
+
+def normalize_task_dates(task_data):
+    """
+    Нормализует поля дат в словаре данных задачи (на месте).
+
+    Raises:
+        ValueError: Если одна из дат некорректна
+    """
+    for column in DATE_COLUMNS:
+        if column in task_data:
+            task_data[column] = normalize_date(task_data[column])
+    for column in DATETIME_COLUMNS:
+        if column in task_data:
+            task_data[column] = normalize_datetime(task_data[column])
+    return task_data
+
+
+def migrate_task_dates(cursor):
+    """
+    Приводит сохраненные даты задач к каноническому виду.
+
+    Проверяются только строки с неканоническими значениями (пустая строка,
+    другой формат); некорректные значения заменяются на NULL с
+    предупреждением в логе.
+
+    Returns:
+        Количество исправленных значений
+    """
+    cursor.execute("PRAGMA table_info(tasks)")
+    existing = {column[1] for column in cursor.fetchall()}
+    checks = (
+        [(column, "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'", normalize_date)
+         for column in DATE_COLUMNS if column in existing]
+        + [(column, "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]'", normalize_datetime)
+           for column in DATETIME_COLUMNS if column in existing]
+    )
+
+    fixed = 0
+    for column, canonical_glob, normalize in checks:
+        cursor.execute(f"SELECT id, {column} FROM tasks WHERE {column} IS NOT NULL AND {column} NOT GLOB {canonical_glob}")
+        updates = []
+        for task_id, value in cursor.fetchall():
+            try:
+                normalized = normalize(value)
+            except ValueError:
+                logger.warning(f"Задача #{task_id}: некорректное значение {column}='{value}' заменено на NULL", "MIGRATION")
+                normalized = None
+            updates.append((normalized, task_id))
+        if updates:
+            cursor.executemany(f"UPDATE tasks SET {column} = ? WHERE id = ?", updates)
+            fixed += len(updates)
+
+    if fixed:
+        logger.database(f"Нормализовано значений дат: {fixed}", "MIGRATION")
+    return fixed
+
+
+# Фильтры вызываются для каждой карточки при каждой отрисовке доски, а
+# различных дат на доске немного - результат кэшируется по исходной строке
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_date_ru(text):
+    cleaned = text.strip()
+    try:
+        parsed = parse_date(cleaned)
+        return f"{parsed.day:02d}.{parsed.month:02d}.{parsed.year:04d}"
+    except ValueError:
+        pass
+    # Последняя попытка: fromisoformat
+    try:
+        parsed = datetime.fromisoformat(cleaned)
+        return f"{parsed.day:02d}.{parsed.month:02d}.{parsed.year:04d}"
+    except ValueError:
+        return cleaned
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_datetime_ru(text):
+    cleaned = text.strip()
+    try:
+        parsed = parse_datetime(cleaned)
+        return (f"{parsed.day:02d}.{parsed.month:02d}.{parsed.year:04d} "
+                f"{parsed.hour:02d}:{parsed.minute:02d}")
+    except ValueError:
+        return cleaned
+
+
+def format_date_ru(value):
+    """Фильтр Jinja: дата в российском формате (ДД.ММ.ГГГГ)."""
+    if not value:
+        return ''
+    try:
+        return _format_date_ru(str(value))
+    except Exception:
+        return ''
+
+
+def format_datetime_ru(value):
+    """Фильтр Jinja: дата и время в российском формате (ДД.ММ.ГГГГ ЧЧ:ММ)."""
+    if not value:
+        return ''
+    try:
+        return _format_datetime_ru(str(value))
+    except Exception:
+        return ''
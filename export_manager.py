@@ -7,10 +7,61 @@ ToDoLite - Менеджер экспорта задач
 import sqlite3
 import json
 import csv
-import xml.etree.ElementTree as ET
+import itertools
+import gzip
+import shutil
+import re
+import time
+from xml.sax.saxutils import escape, quoteattr
 from datetime import datetime
 import os
 from logger import logger
+from index_advisor import CHANGED_AT_SQL, register_hot_query
+from metrics import get_metrics_registry
+
+EXPORT_SECONDS = get_metrics_registry().histogram(
+    'todolite_export_duration_seconds', 'Длительность экспорта', ('format',))
+EXPORT_TASKS = get_metrics_registry().counter(
+    'todolite_export_tasks_total', 'Экспортировано задач', ('format',))
+EXPORT_THROUGHPUT = get_metrics_registry().gauge(
+    'todolite_export_throughput_tasks_per_second', 'Скорость последнего экспорта', ('format',))
+
+# Таблицы, переносимые при экспорте в SQLite
+EXPORT_TABLES = ('tasks', 'task_comments')
+
+# Отбор задач, измененных начиная с момента since
+SINCE_CONDITION = f"{CHANGED_AT_SQL} >= datetime(?)"
+
+# Индекс для отбора по since. Без статистики (новая или небольшая БД) планировщик
+# выбирает полный обход по id ради ORDER BY, поэтому индекс задается через INDEXED BY
+SINCE_INDEX = 'idx_tasks_changed_at'
+
+
+def build_export_queries(where="", index=None):
+    """
+    Возвращает запросы задач и комментариев для потокового экспорта.
+
+    Args:
+        where: Условие отбора задач без WHERE (см. ExportManager._build_filter)
+        index: Индекс таблицы tasks для условия (INDEXED BY), None - на выбор планировщика
+
+    Returns:
+        Кортеж (запрос задач, запрос комментариев); оба принимают параметры условия
+    """
+    tasks_table = f"tasks INDEXED BY {index}" if index else "tasks"
+    where_clause = ""
+    comments_where = ""
+    if where:
+        where_clause = f"WHERE {where}"
+        comments_where = f"WHERE task_id IN (SELECT id FROM {tasks_table} WHERE {where})"
+    tasks_query = f"SELECT * FROM {tasks_table} {where_clause} ORDER BY id DESC"
+    comments_query = f"""
+        SELECT id, task_id, comment, created_at
+        FROM task_comments
+        {comments_where}
+        ORDER BY task_id DESC, created_at, id
+    """
+    return tasks_query, comments_query
 
 class ExportManager:
     """
@@ -21,30 +72,100 @@ class ExportManager:
         self.db_path = db_path
         logger.info("ExportManager инициализирован", "EXPORT")
     
-    def get_all_tasks(self):
-        """Получает все задачи из базы данных."""
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _get_export_fields(self):
+        """Возвращает поля CSV, определенные по схеме таблицы tasks."""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT t.*, 
-                       GROUP_CONCAT(tc.comment, '|||') as comments
-                FROM tasks t
-                LEFT JOIN task_comments tc ON t.id = tc.task_id
-                GROUP BY t.id
-                ORDER BY t.created_at DESC
-            """)
-            
-            tasks = []
-            for row in cursor.fetchall():
+            columns = [column[1] for column in conn.execute("PRAGMA table_info(tasks)")]
+        finally:
+            conn.close()
+        # Убираем поля, которые не нужно экспортировать
+        exclude_fields = {'id', 'created_at', 'updated_at'}
+        return [field for field in sorted(set(columns) | {'comments'}) if field not in exclude_fields]
+
+    def _has_index(self, name):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+            ).fetchone() is not None
+        finally:
+            conn.close()
+
+    def _build_filter(self, task_ids=None, since=None):
+        """
+        Возвращает условие WHERE (без ключевого слова), параметры отбора задач
+        и индекс для INDEXED BY (None - без подсказки).
+        """
+        conditions = []
+        params = []
+        index = None
+        if task_ids:
+            conditions.append("id IN (%s)" % ','.join('?' * len(task_ids)))
+            params.extend(task_ids)
+        if since is not None:
+            # Инкрементальный экспорт: задачи, созданные или измененные начиная с since
+            if isinstance(since, datetime):
+                since = since.isoformat(sep=' ')
+            conditions.append(SINCE_CONDITION)
+            params.append(since)
+            # В БД, где индексы еще не созданы (init_db не выполнялся), INDEXED BY - ошибка
+            if not task_ids and self._has_index(SINCE_INDEX):
+                index = SINCE_INDEX
+        return " AND ".join(conditions), params, index
+
+    def count_tasks(self, task_ids=None, since=None):
+        """Возвращает количество задач для экспорта."""
+        where, params, index = self._build_filter(task_ids, since)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            query = f"SELECT COUNT(*) FROM tasks INDEXED BY {index}" if index else "SELECT COUNT(*) FROM tasks"
+            if where:
+                query += f" WHERE {where}"
+            return conn.execute(query, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_tasks(self, task_ids=None, since=None):
+        """
+        Потоково читает задачи из базы данных.
+
+        Задачи и комментарии читаются двумя курсорами, упорядоченными
+        по id задачи, и объединяются слиянием, поэтому память не зависит
+        ни от количества задач, ни от количества комментариев.
+
+        Args:
+            task_ids: Список ID задач (None = все задачи)
+            since: Только задачи, созданные или измененные с этого момента
+        """
+        where, params, index = self._build_filter(task_ids, since)
+        conn = self._connect()
+        try:
+            tasks_query, comments_query = build_export_queries(where, index)
+            tasks_cursor = conn.execute(tasks_query, params)
+            comments_cursor = conn.execute(comments_query, params)
+
+            comment = next(comments_cursor, None)
+            for row in tasks_cursor:
                 task = dict(row)
-                # Обрабатываем комментарии
-                if task.get('comments'):
-                    task['comments'] = task['comments'].split('|||')
-                else:
-                    task['comments'] = []
+
+                # Пропускаем комментарии удаленных задач и собираем комментарии текущей
+                while comment is not None and comment['task_id'] > task['id']:
+                    comment = next(comments_cursor, None)
+                comments = []
+                while comment is not None and comment['task_id'] == task['id']:
+                    comments.append({
+                        'id': comment['id'],
+                        'text': comment['comment'],
+                        'created_at': comment['created_at']
+                    })
+                    comment = next(comments_cursor, None)
+                task['comments'] = comments
                 
                 # Обрабатываем теги
                 if task.get('tags'):
@@ -52,11 +173,14 @@ class ExportManager:
                 else:
                     task['tags'] = []
                 
-                tasks.append(task)
-            
+                yield task
+        finally:
             conn.close()
-            return tasks
-            
+
+    def get_all_tasks(self):
+        """Получает все задачи из базы данных."""
+        try:
+            return list(self.iter_tasks())
         except Exception as e:
             logger.error(f"Ошибка получения задач для экспорта: {e}", "EXPORT")
             return []
@@ -67,64 +191,48 @@ class ExportManager:
             return []
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            placeholders = ','.join('?' * len(task_ids))
-            cursor.execute(f"""
-                SELECT t.*, 
-                       GROUP_CONCAT(tc.comment, '|||') as comments
-                FROM tasks t
-                LEFT JOIN task_comments tc ON t.id = tc.task_id
-                WHERE t.id IN ({placeholders})
-                GROUP BY t.id
-                ORDER BY t.created_at DESC
-            """, task_ids)
-            
-            tasks = []
-            for row in cursor.fetchall():
-                task = dict(row)
-                # Обрабатываем комментарии
-                if task.get('comments'):
-                    task['comments'] = task['comments'].split('|||')
-                else:
-                    task['comments'] = []
-                
-                # Обрабатываем теги
-                if task.get('tags'):
-                    task['tags'] = [tag.strip() for tag in task['tags'].split(',') if tag.strip()]
-                else:
-                    task['tags'] = []
-                
-                tasks.append(task)
-            
-            conn.close()
-            return tasks
-            
+            return list(self.iter_tasks(task_ids))
         except Exception as e:
             logger.error(f"Ошибка получения задач по ID для экспорта: {e}", "EXPORT")
             return []
     
-    def export_to_json(self, tasks, output_path=None):
-        """Экспортирует задачи в JSON формат."""
+    def export_to_json(self, tasks, output_path=None, total=None):
+        """Экспортирует задачи в JSON формат.
+
+        Задачи записываются в файл по одной, поэтому tasks может быть
+        генератором. Если total не передан и неизвестен заранее,
+        export_info записывается после списка задач.
+        """
         try:
             if output_path is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 output_path = f"todolite_export_{timestamp}.json"
             
-            # Подготавливаем данные для экспорта
-            export_data = {
-                'export_info': {
+            if total is None and hasattr(tasks, '__len__'):
+                total = len(tasks)
+
+            def export_info(total_tasks):
+                info = json.dumps({
                     'export_date': datetime.now().isoformat(),
-                    'total_tasks': len(tasks),
+                    'total_tasks': total_tasks,
                     'version': '1.0'
-                },
-                'tasks': tasks
-            }
-            
+                }, ensure_ascii=False, indent=2)
+                return '  "export_info": ' + info.replace('\n', '\n  ')
+
             with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+                f.write('{\n')
+                if total is not None:
+                    f.write(export_info(total) + ',\n')
+                f.write('  "tasks": [')
+                written = 0
+                for task in tasks:
+                    f.write(',\n' if written else '\n')
+                    f.write('    ' + json.dumps(task, ensure_ascii=False, indent=2).replace('\n', '\n    '))
+                    written += 1
+                f.write('\n  ]' if written else ']')
+                if total is None:
+                    f.write(',\n' + export_info(written))
+                f.write('\n}')
             
             logger.success(f"Экспорт в JSON завершен: {output_path}", "EXPORT")
             return output_path
@@ -133,31 +241,30 @@ class ExportManager:
             logger.error(f"Ошибка экспорта в JSON: {e}", "EXPORT")
             return None
     
-    def export_to_csv(self, tasks, output_path=None):
-        """Экспортирует задачи в CSV формат."""
+    def export_to_csv(self, tasks, output_path=None, fieldnames=None):
+        """Экспортирует задачи в CSV формат.
+
+        Заголовок берется из схемы таблицы tasks (или из fieldnames),
+        а строки пишутся по мере чтения.
+        """
         try:
             if output_path is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 output_path = f"todolite_export_{timestamp}.csv"
             
-            if not tasks:
+            tasks = iter(tasks)
+            first_task = next(tasks, None)
+            if first_task is None:
                 logger.warning("Нет задач для экспорта в CSV", "EXPORT")
                 return None
             
-            # Определяем все возможные поля
-            all_fields = set()
-            for task in tasks:
-                all_fields.update(task.keys())
-            
-            # Убираем поля, которые не нужно экспортировать
-            exclude_fields = {'id', 'created_at', 'updated_at'}
-            export_fields = [field for field in sorted(all_fields) if field not in exclude_fields]
+            export_fields = fieldnames or self._get_export_fields()
             
             with open(output_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.DictWriter(f, fieldnames=export_fields)
                 writer.writeheader()
                 
-                for task in tasks:
+                for task in itertools.chain([first_task], tasks):
                     # Подготавливаем строку для записи
                     row = {}
                     for field in export_fields:
@@ -165,7 +272,9 @@ class ExportManager:
                         
                         # Обрабатываем специальные поля
                         if field == 'comments' and isinstance(value, list):
-                            row[field] = ' | '.join(value)
+                            row[field] = ' | '.join(
+                                comment['text'] if isinstance(comment, dict) else comment for comment in value
+                            )
                         elif field == 'tags' and isinstance(value, list):
                             row[field] = ', '.join(value)
                         elif field in ['due_date', 'reminder_time'] and value:
@@ -190,52 +299,64 @@ class ExportManager:
             logger.error(f"Ошибка экспорта в CSV: {e}", "EXPORT")
             return None
     
-    def export_to_xml(self, tasks, output_path=None):
-        """Экспортирует задачи в XML формат."""
+    def export_to_xml(self, tasks, output_path=None, total=None):
+        """Экспортирует задачи в XML формат.
+
+        Документ пишется элемент за элементом (без построения дерева),
+        с тем же форматированием, что давал ET.indent.
+        """
         try:
             if output_path is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 output_path = f"todolite_export_{timestamp}.xml"
             
-            # Создаем корневой элемент
-            root = ET.Element("todolite_export")
-            root.set("export_date", datetime.now().isoformat())
-            root.set("total_tasks", str(len(tasks)))
-            root.set("version", "1.0")
-            
-            # Добавляем задачи
-            tasks_element = ET.SubElement(root, "tasks")
+            if total is None and hasattr(tasks, '__len__'):
+                total = len(tasks)
+
+            root_attrs = f' export_date={quoteattr(datetime.now().isoformat())}'
+            if total is not None:
+                root_attrs += f' total_tasks={quoteattr(str(total))}'
+            root_attrs += ' version="1.0"'
             
-            for task in tasks:
-                task_element = ET.SubElement(tasks_element, "task")
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+                f.write(f"<todolite_export{root_attrs}>\n")
+                f.write("  <tasks>\n")
                 
-                # Добавляем основные поля
-                for key, value in task.items():
-                    if key in ['comments', 'tags']:
-                        continue  # Обработаем отдельно
+                for task in tasks:
+                    f.write("    <task>\n")
                     
-                    if value is not None:
-                        field_element = ET.SubElement(task_element, key)
-                        field_element.text = str(value)
-                
-                # Добавляем комментарии
-                if task.get('comments'):
-                    comments_element = ET.SubElement(task_element, "comments")
-                    for comment in task['comments']:
-                        comment_element = ET.SubElement(comments_element, "comment")
-                        comment_element.text = comment
+                    # Добавляем основные поля
+                    for key, value in task.items():
+                        if key in ['comments', 'tags']:
+                            continue  # Обработаем отдельно
+                        
+                        if value is not None:
+                            f.write(f"      <{key}>{escape(str(value))}</{key}>\n")
+                    
+                    # Добавляем комментарии
+                    if task.get('comments'):
+                        f.write("      <comments>\n")
+                        for comment in task['comments']:
+                            if isinstance(comment, dict):
+                                f.write(f"        <comment id={quoteattr(str(comment['id']))}"
+                                        f" created_at={quoteattr(str(comment['created_at'] or ''))}>"
+                                        f"{escape(comment['text'] or '')}</comment>\n")
+                            else:
+                                f.write(f"        <comment>{escape(comment)}</comment>\n")
+                        f.write("      </comments>\n")
+                    
+                    # Добавляем теги
+                    if task.get('tags'):
+                        f.write("      <tags>\n")
+                        for tag in task['tags']:
+                            f.write(f"        <tag>{escape(tag)}</tag>\n")
+                        f.write("      </tags>\n")
+                    
+                    f.write("    </task>\n")
                 
-                # Добавляем теги
-                if task.get('tags'):
-                    tags_element = ET.SubElement(task_element, "tags")
-                    for tag in task['tags']:
-                        tag_element = ET.SubElement(tags_element, "tag")
-                        tag_element.text = tag
-            
-            # Записываем XML
-            tree = ET.ElementTree(root)
-            ET.indent(tree, space="  ", level=0)  # Форматируем XML
-            tree.write(output_path, encoding='utf-8', xml_declaration=True)
+                f.write("  </tasks>\n")
+                f.write("</todolite_export>")
             
             logger.success(f"Экспорт в XML завершен: {output_path}", "EXPORT")
             return output_path
@@ -244,42 +365,165 @@ class ExportManager:
             logger.error(f"Ошибка экспорта в XML: {e}", "EXPORT")
             return None
     
-    def export_tasks(self, task_ids=None, format='json', output_path=None):
+    def export_to_ndjson(self, tasks, output_path=None, compress=False):
+        """Экспортирует задачи в NDJSON (одна задача - одна строка JSON).
+
+        Формат читается построчно без разбора всего файла и подходит
+        для загрузки в аналитические инструменты. При compress=True
+        файл сжимается gzip.
+        """
+        try:
+            if output_path is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_path = f"todolite_export_{timestamp}.ndjson" + ('.gz' if compress else '')
+            
+            opener = gzip.open if compress else open
+            with opener(output_path, 'wt', encoding='utf-8', newline='\n') as f:
+                for task in tasks:
+                    f.write(json.dumps(task, ensure_ascii=False, separators=(',', ':')))
+                    f.write('\n')
+            
+            logger.success(f"Экспорт в NDJSON завершен: {output_path}", "EXPORT")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Ошибка экспорта в NDJSON: {e}", "EXPORT")
+            return None
+    
+    def export_to_sqlite(self, output_path=None, task_ids=None, since=None, compress=False):
+        """Экспортирует задачи и комментарии в отдельную базу SQLite.
+
+        Данные копируются средствами SQLite через ATTACH, без выборки
+        строк в Python. Переносятся только таблицы EXPORT_TABLES
+        (служебные таблицы и триггеры не копируются).
+        """
+        temp_path = None
+        try:
+            if output_path is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_path = f"todolite_export_{timestamp}.db" + ('.gz' if compress else '')
+            
+            # Без сжатия база пишется сразу в файл назначения, со сжатием - во временный
+            temp_path = output_path[:-3] if compress and output_path.endswith('.gz') else output_path
+            if compress and temp_path == output_path:
+                temp_path = output_path + '.db'
+            temp_path += '.tmp'
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            
+            where, params, index = self._build_filter(task_ids, since)
+            tasks_table = f"main.tasks INDEXED BY {index}" if index else "main.tasks"
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("ATTACH DATABASE ? AS export", (temp_path,))
+                for table in EXPORT_TABLES:
+                    row = conn.execute(
+                        "SELECT sql FROM main.sqlite_master WHERE type='table' AND name=?", (table,)
+                    ).fetchone()
+                    if not row:
+                        continue
+                    # Создаем таблицу в целевой БД по исходной схеме
+                    conn.execute(re.sub(r'^CREATE TABLE\s+["`\[]?\w+["`\]]?', f'CREATE TABLE export.{table}', row[0]))
+                    if not where:
+                        conn.execute(f"INSERT INTO export.{table} SELECT * FROM main.{table}")
+                    elif table == 'tasks':
+                        conn.execute(f"INSERT INTO export.tasks SELECT * FROM {tasks_table} WHERE {where}", params)
+                    else:
+                        conn.execute(
+                            f"INSERT INTO export.{table} SELECT * FROM main.{table} "
+                            f"WHERE task_id IN (SELECT id FROM {tasks_table} WHERE {where})",
+                            params
+                        )
+                conn.commit()
+                conn.execute("DETACH DATABASE export")
+            finally:
+                conn.close()
+            
+            if compress:
+                with open(temp_path, 'rb') as src, gzip.open(output_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, output_path)
+            temp_path = None
+            
+            logger.success(f"Экспорт в SQLite завершен: {output_path}", "EXPORT")
+            return output_path
+            
+        except Exception as e:
+            logger.error(f"Ошибка экспорта в SQLite: {e}", "EXPORT")
+            return None
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def export_tasks(self, task_ids=None, format='json', output_path=None, compress=False, since=None):
         """
         Экспортирует задачи в указанном формате.
         
         Args:
             task_ids: Список ID задач для экспорта (None = все задачи)
-            format: Формат экспорта ('json', 'csv', 'xml')
+            format: Формат экспорта ('json', 'csv', 'xml', 'ndjson', 'sqlite')
             output_path: Путь к файлу экспорта (None = автогенерация)
+            compress: Сжать результат gzip (для 'ndjson' и 'sqlite')
+            since: Только задачи, созданные или измененные с этого момента
+                   (datetime или строка 'YYYY-MM-DD[ HH:MM:SS]')
         
         Returns:
             str: Путь к созданному файлу или None при ошибке
         """
         try:
-            # Получаем задачи
+            # Считаем задачи; сами задачи читаются потоково при записи файла
+            total = self.count_tasks(task_ids, since)
             if task_ids:
-                tasks = self.get_tasks_by_ids(task_ids)
-                logger.info(f"Экспорт {len(tasks)} задач по ID", "EXPORT")
+                logger.info(f"Экспорт {total} задач по ID", "EXPORT")
+            elif since is not None:
+                logger.info(f"Экспорт задач, измененных с {since} ({total} шт.)", "EXPORT")
             else:
-                tasks = self.get_all_tasks()
-                logger.info(f"Экспорт всех задач ({len(tasks)} шт.)", "EXPORT")
+                logger.info(f"Экспорт всех задач ({total} шт.)", "EXPORT")
             
-            if not tasks:
+            if not total:
                 logger.warning("Нет задач для экспорта", "EXPORT")
                 return None
             
-            # Экспортируем в нужном формате
-            if format.lower() == 'json':
-                return self.export_to_json(tasks, output_path)
-            elif format.lower() == 'csv':
-                return self.export_to_csv(tasks, output_path)
-            elif format.lower() == 'xml':
-                return self.export_to_xml(tasks, output_path)
+            format = format.lower()
+            started = time.perf_counter()
+            if format == 'sqlite':
+                path = self.export_to_sqlite(output_path, task_ids, since, compress)
             else:
-                logger.error(f"Неподдерживаемый формат экспорта: {format}", "EXPORT")
-                return None
+                tasks = self.iter_tasks(task_ids, since)
+                
+                # Экспортируем в нужном формате
+                if format == 'json':
+                    path = self.export_to_json(tasks, output_path, total=total)
+                elif format == 'csv':
+                    path = self.export_to_csv(tasks, output_path)
+                elif format == 'xml':
+                    path = self.export_to_xml(tasks, output_path, total=total)
+                elif format == 'ndjson':
+                    path = self.export_to_ndjson(tasks, output_path, compress)
+                else:
+                    logger.error(f"Неподдерживаемый формат экспорта: {format}", "EXPORT")
+                    return None
+            
+            if path:
+                seconds = time.perf_counter() - started
+                EXPORT_SECONDS.labels(format=format).observe(seconds)
+                EXPORT_TASKS.labels(format=format).inc(total)
+                if seconds > 0:
+                    EXPORT_THROUGHPUT.labels(format=format).set(total / seconds)
+            return path
                 
         except Exception as e:
             logger.error(f"Ошибка экспорта задач: {e}", "EXPORT")
             return None
+
+
+# Полный экспорт читает всю таблицу задач по определению
+register_hot_query('export_all_tasks', build_export_queries()[0], expected_index=False, source='export_manager')
+register_hot_query('export_all_comments', build_export_queries()[1], source='export_manager')
+register_hot_query('export_since_tasks', build_export_queries(SINCE_CONDITION, SINCE_INDEX)[0],
+                   ('2025-01-01 00:00:00',), source='export_manager')
+register_hot_query('export_since_comments', build_export_queries(SINCE_CONDITION, SINCE_INDEX)[1],
+                   ('2025-01-01 00:00:00',), source='export_manager')
+register_hot_query('export_by_ids_tasks', build_export_queries("id IN (?,?)")[0], (1, 2), source='export_manager')
@@ -7,10 +7,195 @@ ToDoLite - Менеджер импорта задач
 import sqlite3
 import json
 import csv
+import hashlib
+import itertools
+import queue
+import threading
+import time
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
 import os
 from logger import logger
+from markdown_utils import validate_markdown
+from backup_catalog import file_sha256
+from date_utils import normalize_task_dates
+from metrics import get_metrics_registry
+
+# Размер куска, читаемого из JSON файла при потоковом разборе
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Количество задач, вставляемых одной транзакцией
+IMPORT_BATCH_SIZE = 1000
+
+# Сколько прочитанных пачек может ждать валидации (ограничивает память конвейера)
+IMPORT_QUEUE_SIZE = 4
+
+# Максимум процессов валидации по умолчанию
+IMPORT_MAX_WORKERS = 4
+
+# Пул процессов запускается, только когда прочитано больше стольких строк:
+# запуск интерпретаторов (особенно в Windows) дольше валидации небольшого файла
+IMPORT_POOL_MIN_ROWS = 2 * IMPORT_BATCH_SIZE
+
+IMPORT_SECONDS = get_metrics_registry().histogram(
+    'todolite_import_duration_seconds', 'Длительность импорта')
+IMPORT_TASKS = get_metrics_registry().counter(
+    'todolite_import_tasks_total', 'Обработано задач при импорте', ('result',))
+IMPORT_THROUGHPUT = get_metrics_registry().gauge(
+    'todolite_import_throughput_tasks_per_second', 'Скорость последнего импорта')
+
+# Поля tasks, заполняемые при импорте (в порядке значений prepare_task_row, плюс id)
+TASK_INSERT_FIELDS = ('id', 'title', 'short_description', 'full_description', 'status', 'priority',
+                      'eisenhower_priority', 'assigned_to', 'scheduled_date', 'due_date', 'reminder_time',
+                      'related_threads', 'tags', 'created_at', 'updated_at')
+# Поля, которые перезаписываются у существующей задачи при conflict_resolution='overwrite'
+TASK_OVERWRITE_FIELDS = tuple(field for field in TASK_INSERT_FIELDS if field not in ('id', 'created_at'))
+
+VALID_STATUSES = frozenset(['new', 'later', 'tracking', 'working', 'waiting', 'think', 'done', 'cancelled'])
+VALID_PRIORITIES = frozenset(['low', 'medium', 'high', 'urgent'])
+VALID_EISENHOWER = frozenset(['urgent_important', 'urgent_not_important', 'not_urgent_important', 'not_urgent_not_important'])
+
+def validate_task_data(task_data):
+    """Валидирует данные задачи."""
+    # Проверяем обязательные поля
+    if not task_data.get('title'):
+        return False, "Отсутствует обязательное поле: title"
+    
+    # Проверяем типы данных
+    if not isinstance(task_data['title'], str):
+        return False, "Поле 'title' должно быть строкой"
+    
+    # description не обязательное поле
+    
+    # Проверяем статус
+    if 'status' in task_data and task_data['status'] not in VALID_STATUSES:
+        return False, f"Недопустимый статус: {task_data['status']}"
+    
+    # Проверяем приоритет
+    if 'priority' in task_data and task_data['priority'] not in VALID_PRIORITIES:
+        return False, f"Недопустимый приоритет: {task_data['priority']}"
+    
+    # Проверяем Eisenhower приоритет
+    if 'eisenhower' in task_data and task_data['eisenhower'] not in VALID_EISENHOWER:
+        return False, f"Недопустимый Eisenhower приоритет: {task_data['eisenhower']}"
+    
+    return True, "OK"
+
+
+def normalize_task_data(task_data):
+    """
+    Приводит задачу из файла импорта к единому виду.
+
+    Пустые значения отбрасываются, теги и комментарии приводятся к спискам,
+    даты - к формату БД ('YYYY-MM-DD', напоминание - 'YYYY-MM-DDTHH:MM').
+    Поля экспорта (short_description, eisenhower_priority) принимаются
+    наравне с полями формата импорта (description, eisenhower).
+
+    Raises:
+        ValueError: Если дату не удалось разобрать
+    """
+    task = {key: value for key, value in task_data.items() if value is not None and value != ''}
+    
+    if isinstance(task.get('title'), str):
+        task['title'] = task['title'].strip()
+    
+    if isinstance(task.get('tags'), str):
+        task['tags'] = [tag.strip() for tag in task['tags'].split(',') if tag.strip()]
+    if isinstance(task.get('comments'), str):
+        task['comments'] = [comment.strip() for comment in task['comments'].split('|') if comment.strip()]
+    
+    normalize_task_dates(task)
+    
+    description = task.get('description', '')
+    task.setdefault('short_description', description)
+    task.setdefault('full_description', description)
+    if 'eisenhower_priority' in task:
+        task.setdefault('eisenhower', task['eisenhower_priority'])
+    return task
+
+
+def prepare_task_row(task, now):
+    """
+    Преобразует нормализованную задачу в строку для вставки и список комментариев.
+
+    Returns:
+        Кортеж (значения полей TASK_INSERT_FIELDS без id, [(текст, created_at), ...])
+    """
+    tags_string = None
+    if task.get('tags'):
+        tags_string = ', '.join([tag.strip() for tag in task['tags'] if tag.strip()]) or None
+    task_row = (
+        task.get('title', ''),
+        task.get('short_description', ''),
+        task.get('full_description', ''),
+        task.get('status', 'new'),
+        task.get('priority', 'medium'),
+        task.get('eisenhower', 'not_urgent_not_important'),
+        task.get('assigned_to'),
+        task.get('scheduled_date'),
+        task.get('due_date'),
+        task.get('reminder_time'),
+        task.get('related_threads'),
+        tags_string,
+        now,
+        now
+    )
+
+    comments = []
+    for comment in task.get('comments') or []:
+        # Комментарий - строка (старый формат) или запись {id, text, created_at}
+        if isinstance(comment, dict):
+            comment_text = comment.get('text') or ''
+            comment_created_at = comment.get('created_at') or now
+        else:
+            comment_text = comment
+            comment_created_at = now
+        if comment_text.strip():
+            comments.append((comment_text.strip(), comment_created_at))
+    return task_row, comments
+
+
+def task_fingerprint(task):
+    """Отпечаток содержимого нормализованной задачи (не зависит от порядка полей)."""
+    canonical = json.dumps(task, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _validate_and_normalize_chunk(chunk):
+    """
+    Стадия валидации конвейера импорта (выполняется в процессе пула).
+
+    Args:
+        chunk: Список пар (номер задачи в файле, данные задачи)
+
+    Returns:
+        Кортеж (результаты, время обработки в секундах); результат -
+        (номер, заголовок, (отпечаток, строка, комментарии)) для корректной
+        задачи или (номер, None, текст ошибки)
+    """
+    started = time.perf_counter()
+    now = datetime.now().isoformat()
+    results = []
+    for number, task_data in chunk:
+        try:
+            if not isinstance(task_data, dict):
+                results.append((number, None, "Задача должна быть объектом"))
+                continue
+            task = normalize_task_data(task_data)
+            is_valid, error_msg = validate_task_data(task)
+            if is_valid and task.get('full_description'):
+                is_valid, error_msg = validate_markdown(task['full_description'])
+            if not is_valid:
+                results.append((number, None, error_msg))
+                continue
+            task_row, comments = prepare_task_row(task, now)
+            results.append((number, task['title'], (task_fingerprint(task), task_row, comments)))
+        except Exception as e:
+            results.append((number, None, str(e)))
+    return results, time.perf_counter() - started
+
 
 class ImportManager:
     """
@@ -23,223 +208,574 @@ class ImportManager:
     
     def _validate_task_data(self, task_data):
         """Валидирует данные задачи."""
-        required_fields = ['title']
-        
-        for field in required_fields:
-            if field not in task_data or not task_data[field]:
-                return False, f"Отсутствует обязательное поле: {field}"
-        
-        # Проверяем типы данных
-        if not isinstance(task_data['title'], str):
-            return False, "Поле 'title' должно быть строкой"
-        
-        # description не обязательное поле
-        
-        # Проверяем статус
-        valid_statuses = ['new', 'later', 'tracking', 'working', 'waiting', 'think', 'done', 'cancelled']
-        if 'status' in task_data and task_data['status'] not in valid_statuses:
-            return False, f"Недопустимый статус: {task_data['status']}"
-        
-        # Проверяем приоритет
-        valid_priorities = ['low', 'medium', 'high', 'urgent']
-        if 'priority' in task_data and task_data['priority'] not in valid_priorities:
-            return False, f"Недопустимый приоритет: {task_data['priority']}"
-        
-        # Проверяем Eisenhower приоритет
-        valid_eisenhower = ['urgent_important', 'urgent_not_important', 'not_urgent_important', 'not_urgent_not_important']
-        if 'eisenhower' in task_data and task_data['eisenhower'] not in valid_eisenhower:
-            return False, f"Недопустимый Eisenhower приоритет: {task_data['eisenhower']}"
-        
-        return True, "OK"
+        try:
+            return validate_task_data(normalize_task_data(task_data))
+        except ValueError as e:
+            return False, str(e)
     
+    def _iter_import_file(self, file_path):
+        """
+        Возвращает итератор задач из файла импорта.
+
+        Файл читается потоково: задачи разбираются по мере чтения,
+        поэтому память не зависит от размера файла. Ошибки формата
+        возникают при итерации.
+        """
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext == '.json':
+            return self._parse_json(file_path)
+        elif file_ext == '.ndjson':
+            return self._parse_ndjson(file_path)
+        elif file_ext == '.csv':
+            return self._parse_csv(file_path)
+        elif file_ext == '.xml':
+            return self._parse_xml(file_path)
+        else:
+            logger.error(f"Неподдерживаемый формат файла: {file_ext}", "IMPORT")
+            return None
+
     def _parse_import_file(self, file_path):
         """Парсит файл импорта и возвращает список задач."""
         try:
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            if file_ext == '.json':
-                return self._parse_json(file_path)
-            elif file_ext == '.csv':
-                return self._parse_csv(file_path)
-            elif file_ext == '.xml':
-                return self._parse_xml(file_path)
-            else:
-                logger.error(f"Неподдерживаемый формат файла: {file_ext}", "IMPORT")
+            tasks = self._iter_import_file(file_path)
+            if tasks is None:
                 return None
+            return list(tasks)
                 
         except Exception as e:
             logger.error(f"Ошибка парсинга файла {file_path}: {e}", "IMPORT")
             return None
     
-    def _parse_json(self, file_path):
-        """Парсит JSON файл."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Проверяем структуру файла
-            if isinstance(data, dict) and 'tasks' in data:
-                tasks = data['tasks']
-                logger.info(f"Найдено {len(tasks)} задач в JSON файле", "IMPORT")
-                return tasks
-            elif isinstance(data, list):
-                logger.info(f"Найдено {len(data)} задач в JSON файле", "IMPORT")
-                return data
-            else:
-                logger.error("Некорректная структура JSON файла", "IMPORT")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Ошибка чтения JSON файла: {e}", "IMPORT")
-            return None
+    def _parse_json(self, file_path, chunk_size=JSON_CHUNK_SIZE):
+        """
+        Потоково парсит JSON файл.
+
+        Поддерживается массив задач на верхнем уровне или объект с ключом
+        "tasks". Файл читается кусками, элементы массива декодируются
+        по одному через JSONDecoder.raw_decode; остальные ключи объекта
+        (например, export_info) пропускаются.
+        """
+        decoder = json.JSONDecoder()
+        with open(file_path, 'r', encoding='utf-8') as f:
+            buf = ''
+            pos = 0
+            eof = False
+
+            def fill():
+                # Дочитывает следующий кусок, отбрасывая уже разобранную часть буфера
+                nonlocal buf, pos, eof
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    eof = True
+                buf = buf[pos:] + chunk
+                pos = 0
+
+            def skip_ws():
+                nonlocal pos
+                while True:
+                    while pos < len(buf) and buf[pos] in ' \t\r\n':
+                        pos += 1
+                    if pos < len(buf) or eof:
+                        return
+                    fill()
+
+            def decode():
+                # Значение может не поместиться в буфер - дочитываем, пока не декодируется целиком
+                nonlocal pos
+                skip_ws()
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(buf, pos)
+                        # Число на границе буфера может быть обрезано
+                        if end < len(buf) or eof:
+                            pos = end
+                            return value
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    fill()
+
+            def expect(char):
+                nonlocal pos
+                skip_ws()
+                if pos >= len(buf) or buf[pos] != char:
+                    found = buf[pos] if pos < len(buf) else 'конец файла'
+                    raise ValueError(f"Некорректная структура JSON файла: ожидалось '{char}', найдено {found!r}")
+                pos += 1
+
+            skip_ws()
+            if pos < len(buf) and buf[pos] == '{':
+                # Объект: ищем ключ "tasks", остальные значения пропускаем
+                pos += 1
+                while True:
+                    skip_ws()
+                    if pos < len(buf) and buf[pos] == '}':
+                        raise ValueError("Некорректная структура JSON файла: нет ключа 'tasks'")
+                    key = decode()
+                    expect(':')
+                    skip_ws()
+                    if key == 'tasks':
+                        break
+                    decode()
+                    skip_ws()
+                    if pos < len(buf) and buf[pos] == ',':
+                        pos += 1
+
+            expect('[')
+            count = 0
+            skip_ws()
+            if pos < len(buf) and buf[pos] == ']':
+                logger.info("Найдено 0 задач в JSON файле", "IMPORT")
+                return
+            while True:
+                yield decode()
+                count += 1
+                skip_ws()
+                if pos < len(buf) and buf[pos] == ']':
+                    break
+                expect(',')
+            logger.info(f"Найдено {count} задач в JSON файле", "IMPORT")
+    
+    def _parse_ndjson(self, file_path):
+        """Потоково парсит NDJSON файл (одна задача в строке)."""
+        count = 0
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+                    count += 1
+        logger.info(f"Найдено {count} задач в NDJSON файле", "IMPORT")
     
     def _parse_csv(self, file_path):
-        """Парсит CSV файл."""
-        try:
-            tasks = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                
-                for row_num, row in enumerate(reader, 1):
-                    # Обрабатываем специальные поля
-                    if 'comments' in row and row['comments']:
-                        row['comments'] = [comment.strip() for comment in row['comments'].split('|') if comment.strip()]
-                    else:
-                        row['comments'] = []
-                    
-                    if 'tags' in row and row['tags']:
-                        row['tags'] = [tag.strip() for tag in row['tags'].split(',') if tag.strip()]
-                    else:
-                        row['tags'] = []
-                    
-                    # Преобразуем пустые строки в None
-                    for key, value in row.items():
-                        if value == '':
-                            row[key] = None
-                    
-                    tasks.append(row)
-            
-            logger.info(f"Найдено {len(tasks)} задач в CSV файле", "IMPORT")
-            return tasks
+        """Потоково парсит CSV файл."""
+        count = 0
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
             
-        except Exception as e:
-            logger.error(f"Ошибка чтения CSV файла: {e}", "IMPORT")
-            return None
+            for row in reader:
+                # Обрабатываем специальные поля
+                if 'comments' in row and row['comments']:
+                    row['comments'] = [comment.strip() for comment in row['comments'].split('|') if comment.strip()]
+                else:
+                    row['comments'] = []
+                
+                if 'tags' in row and row['tags']:
+                    row['tags'] = [tag.strip() for tag in row['tags'].split(',') if tag.strip()]
+                else:
+                    row['tags'] = []
+                
+                # Преобразуем пустые строки в None
+                for key, value in row.items():
+                    if value == '':
+                        row[key] = None
+                
+                yield row
+                count += 1
+        
+        logger.info(f"Найдено {count} задач в CSV файле", "IMPORT")
     
     def _parse_xml(self, file_path):
-        """Парсит XML файл."""
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+        """
+        Потоково парсит XML файл через iterparse.
+
+        Каждый разобранный элемент <task> удаляется из дерева,
+        поэтому в памяти находится только текущая задача.
+        """
+        count = 0
+        stack = []
+        for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag != 'task':
+                continue
             
-            tasks = []
+            task = {}
             
-            # Ищем задачи в XML
-            for task_element in root.findall('.//task'):
-                task = {}
-                
-                # Обрабатываем основные поля
-                for child in task_element:
-                    if child.tag == 'comments':
-                        # Обрабатываем комментарии
-                        comments = []
-                        for comment_elem in child.findall('comment'):
-                            if comment_elem.text:
+            # Обрабатываем основные поля
+            for child in elem:
+                if child.tag == 'comments':
+                    # Обрабатываем комментарии
+                    comments = []
+                    for comment_elem in child.findall('comment'):
+                        if comment_elem.text:
+                            if comment_elem.get('created_at'):
+                                comments.append({
+                                    'text': comment_elem.text.strip(),
+                                    'created_at': comment_elem.get('created_at')
+                                })
+                            else:
                                 comments.append(comment_elem.text.strip())
-                        task['comments'] = comments
-                    elif child.tag == 'tags':
-                        # Обрабатываем теги
-                        tags = []
-                        for tag_elem in child.findall('tag'):
-                            if tag_elem.text:
-                                tags.append(tag_elem.text.strip())
-                        task['tags'] = tags
-                    else:
-                        # Обычные поля
-                        if child.text:
-                            task[child.tag] = child.text.strip()
-                
-                tasks.append(task)
+                    task['comments'] = comments
+                elif child.tag == 'tags':
+                    # Обрабатываем теги
+                    tags = []
+                    for tag_elem in child.findall('tag'):
+                        if tag_elem.text:
+                            tags.append(tag_elem.text.strip())
+                    task['tags'] = tags
+                else:
+                    # Обычные поля
+                    if child.text:
+                        task[child.tag] = child.text.strip()
             
-            logger.info(f"Найдено {len(tasks)} задач в XML файле", "IMPORT")
-            return tasks
+            # Освобождаем память: разобранная задача больше не нужна
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
             
-        except Exception as e:
-            logger.error(f"Ошибка чтения XML файла: {e}", "IMPORT")
-            return None
+            yield task
+            count += 1
+        
+        logger.info(f"Найдено {count} задач в XML файле", "IMPORT")
     
+    def _prepare_task(self, task_data):
+        """Преобразует данные задачи в строку для вставки и список комментариев."""
+        return prepare_task_row(normalize_task_data(task_data), datetime.now().isoformat())
+
+    def _next_task_id(self, cursor):
+        """Возвращает следующий свободный id задачи (с учетом AUTOINCREMENT)."""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'tasks'")
+        row = cursor.fetchone()
+        seq = row[0] if row and row[0] else 0
+        cursor.execute("SELECT MAX(id) FROM tasks")
+        max_id = cursor.fetchone()[0] or 0
+        return max(seq, max_id) + 1
+
+    def _insert_batch(self, conn, batch):
+        """
+        Вставляет пачку подготовленных задач одной транзакцией.
+
+        Id задач назначаются явно, чтобы комментарии можно было вставить
+        одним executemany без чтения lastrowid по каждой задаче.
+
+        Returns:
+            Id первой вставленной задачи
+        """
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            next_id = self._next_task_id(cursor)
+            task_rows = []
+            comment_rows = []
+            for offset, (task_row, comments) in enumerate(batch):
+                task_id = next_id + offset
+                task_rows.append((task_id,) + task_row)
+                comment_rows.extend((task_id, text, created_at) for text, created_at in comments)
+
+            cursor.executemany(f"""
+                INSERT INTO tasks ({', '.join(TASK_INSERT_FIELDS)})
+                VALUES ({', '.join('?' * len(TASK_INSERT_FIELDS))})
+            """, task_rows)
+            if comment_rows:
+                cursor.executemany("""
+                    INSERT INTO task_comments (task_id, comment, created_at)
+                    VALUES (?, ?, ?)
+                """, comment_rows)
+            cursor.execute("COMMIT")
+            return next_id
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+
     def _create_task(self, task_data):
         """Создает задачу в базе данных."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Подготавливаем данные для вставки
-            task_fields = {
-                'title': task_data.get('title', ''),
-                'short_description': task_data.get('description', ''),
-                'full_description': task_data.get('description', ''),
-                'status': task_data.get('status', 'new'),
-                'priority': task_data.get('priority', 'medium'),
-                'eisenhower_priority': task_data.get('eisenhower', 'not_urgent_not_important'),
-                'assigned_to': task_data.get('assigned_to'),
-                'due_date': task_data.get('due_date'),
-                'related_threads': task_data.get('related_threads'),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            # Вставляем задачу
-            cursor.execute("""
-                INSERT INTO tasks (title, short_description, full_description, status, priority, eisenhower_priority, 
-                                 assigned_to, due_date, related_threads, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, tuple(task_fields.values()))
-            
-            task_id = cursor.lastrowid
-            
-            # Добавляем комментарии
-            if task_data.get('comments'):
-                for comment_text in task_data['comments']:
-                    if comment_text.strip():
-                        cursor.execute("""
-                            INSERT INTO task_comments (task_id, comment, created_at)
-                            VALUES (?, ?, ?)
-                        """, (task_id, comment_text.strip(), datetime.now().isoformat()))
-            
-            # Добавляем теги (хранятся как строка в поле tags)
-            if task_data.get('tags'):
-                tags_string = ', '.join([tag.strip() for tag in task_data['tags'] if tag.strip()])
-                cursor.execute("""
-                    UPDATE tasks SET tags = ? WHERE id = ?
-                """, (tags_string, task_id))
-            
-            conn.commit()
-            conn.close()
-            
-            return task_id
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                return self._insert_batch(conn, [self._prepare_task(task_data)])
+            finally:
+                conn.close()
             
         except Exception as e:
             logger.error(f"Ошибка создания задачи: {e}", "IMPORT")
             return None
     
-    def import_tasks(self, file_path, conflict_resolution='skip'):
+    def _ensure_import_tables(self, conn):
+        """Создает таблицы заданий импорта и отпечатков строк."""
+        conn.execute('''CREATE TABLE IF NOT EXISTS import_jobs
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                         source_path TEXT,
+                         source_hash TEXT NOT NULL,
+                         conflict_resolution TEXT NOT NULL,
+                         status TEXT NOT NULL DEFAULT 'running',
+                         rows_done INTEGER NOT NULL DEFAULT 0,
+                         imported INTEGER NOT NULL DEFAULT 0,
+                         updated INTEGER NOT NULL DEFAULT 0,
+                         skipped INTEGER NOT NULL DEFAULT 0,
+                         errors INTEGER NOT NULL DEFAULT 0,
+                         started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                         finished_at TIMESTAMP)''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_source_hash ON import_jobs(source_hash)")
+        conn.execute('''CREATE TABLE IF NOT EXISTS import_fingerprints
+                        (fingerprint TEXT PRIMARY KEY,
+                         task_id INTEGER NOT NULL,
+                         job_id INTEGER)''')
+        # Конфликты по заголовку ищутся по tasks через idx_tasks_title (index_advisor)
+
+        # Рабочие таблицы пачки (временные, видны только этому соединению)
+        batch_fields = ', '.join(TASK_INSERT_FIELDS[1:])
+        conn.execute(f'''CREATE TEMP TABLE IF NOT EXISTS import_batch
+                         (row_number INTEGER PRIMARY KEY,
+                          fingerprint TEXT NOT NULL,
+                          base_title TEXT NOT NULL,
+                          target_id INTEGER,
+                          is_new INTEGER NOT NULL DEFAULT 0,
+                          {batch_fields})''')
+        conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_import_batch_title ON import_batch(title)")
+        conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_import_batch_fingerprint ON import_batch(fingerprint)")
+        conn.execute('''CREATE TEMP TABLE IF NOT EXISTS import_batch_comments
+                        (row_number INTEGER NOT NULL,
+                         seq INTEGER NOT NULL,
+                         comment TEXT NOT NULL,
+                         created_at TEXT)''')
+
+    def _start_job(self, conn, file_path, source_hash, conflict_resolution):
+        """
+        Возобновляет незавершенное задание для того же файла или создает новое.
+
+        Returns:
+            dict: Строка import_jobs
+        """
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute("""
+                SELECT * FROM import_jobs
+                WHERE source_hash = ? AND conflict_resolution = ? AND status != 'completed'
+                ORDER BY id DESC LIMIT 1
+            """, (source_hash, conflict_resolution)).fetchone()
+            if row:
+                conn.execute("UPDATE import_jobs SET status = 'running', source_path = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                             (file_path, row['id']))
+                logger.info(f"Возобновление импорта #{row['id']} после задачи {row['rows_done']}", "IMPORT")
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO import_jobs (source_path, source_hash, conflict_resolution) VALUES (?, ?, ?)",
+                    (file_path, source_hash, conflict_resolution)
+                )
+                row = conn.execute("SELECT * FROM import_jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()
+            return dict(row)
+        finally:
+            conn.row_factory = None
+
+    def _resolve_conflicts(self, cursor, conflict_resolution):
+        """
+        Разрешает конфликты заголовков для строк пачки (запросами над import_batch).
+
+        Returns:
+            Количество пропущенных строк
+        """
+        if conflict_resolution == 'overwrite':
+            # Внутри пачки побеждает последняя строка с тем же заголовком
+            cursor.execute("""
+                DELETE FROM import_batch
+                WHERE row_number NOT IN (SELECT MAX(row_number) FROM import_batch GROUP BY title)
+            """)
+            skipped = cursor.rowcount
+            cursor.execute("""
+                UPDATE import_batch
+                SET target_id = (SELECT MIN(t.id) FROM tasks t WHERE t.title = import_batch.title)
+                WHERE title IN (SELECT title FROM tasks)
+            """)
+            return skipped
+
+        if conflict_resolution == 'rename':
+            # Конфликтующим строкам добавляется суффикс " (n)", пока заголовок не станет уникальным
+            suffix = 1
+            while True:
+                cursor.execute("""
+                    UPDATE import_batch
+                    SET title = base_title || ' (' || ? || ')'
+                    WHERE title IN (SELECT title FROM tasks)
+                       OR EXISTS (SELECT 1 FROM import_batch b
+                                  WHERE b.title = import_batch.title AND b.row_number < import_batch.row_number)
+                """, (suffix,))
+                if cursor.rowcount == 0:
+                    return 0
+                suffix += 1
+
+        # 'skip': задачи с существующим заголовком и повторы внутри пачки не импортируются
+        cursor.execute("DELETE FROM import_batch WHERE title IN (SELECT title FROM tasks)")
+        skipped = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM import_batch
+            WHERE row_number NOT IN (SELECT MIN(row_number) FROM import_batch GROUP BY title)
+        """)
+        return skipped + cursor.rowcount
+
+    def _write_chunk(self, conn, job, results, conflict_resolution, rows_done):
+        """
+        Записывает пачку одной транзакцией вместе с контрольной точкой задания.
+
+        Строки, уже импортированные ранее (задача с тем же отпечатком
+        существует), пропускаются, поэтому повторный запуск идемпотентен.
+
+        Returns:
+            dict: Счетчики пачки (imported, updated, skipped, errors) и error_details
+        """
+        stats = {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+        error_details = []
+        batch_rows = []
+        comment_rows = []
+        for number, title, payload in results:
+            if title is None:
+                stats['errors'] += 1
+                error_details.append(f"Задача {number}: {payload}")
+                continue
+            fingerprint, task_row, comments = payload
+            batch_rows.append((number, fingerprint, title) + task_row)
+            comment_rows.extend(
+                (number, seq, text, created_at) for seq, (text, created_at) in enumerate(comments)
+            )
+
+        fields = ', '.join(TASK_INSERT_FIELDS[1:])
+        overwrite_fields = ', '.join(TASK_OVERWRITE_FIELDS)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if batch_rows:
+                cursor.executemany(
+                    f"INSERT INTO import_batch (row_number, fingerprint, base_title, {fields}) "
+                    f"VALUES ({', '.join('?' * (len(TASK_INSERT_FIELDS) + 2))})",
+                    batch_rows
+                )
+                if comment_rows:
+                    cursor.executemany(
+                        "INSERT INTO import_batch_comments (row_number, seq, comment, created_at) VALUES (?, ?, ?, ?)",
+                        comment_rows
+                    )
+
+                # Уже импортированные строки и повторы внутри пачки
+                cursor.execute("""
+                    DELETE FROM import_batch
+                    WHERE fingerprint IN (SELECT f.fingerprint FROM import_fingerprints f
+                                          JOIN tasks t ON t.id = f.task_id)
+                """)
+                stats['skipped'] += cursor.rowcount
+                cursor.execute("""
+                    DELETE FROM import_batch
+                    WHERE row_number NOT IN (SELECT MIN(row_number) FROM import_batch GROUP BY fingerprint)
+                """)
+                stats['skipped'] += cursor.rowcount
+
+                stats['skipped'] += self._resolve_conflicts(cursor, conflict_resolution)
+
+                # Новым задачам назначаем id явно, чтобы связать с ними комментарии и отпечатки
+                new_rows = [row[0] for row in cursor.execute(
+                    "SELECT row_number FROM import_batch WHERE target_id IS NULL ORDER BY row_number"
+                ).fetchall()]
+                if new_rows:
+                    next_id = self._next_task_id(cursor)
+                    cursor.executemany(
+                        "UPDATE import_batch SET target_id = ?, is_new = 1 WHERE row_number = ?",
+                        [(next_id + offset, row_number) for offset, row_number in enumerate(new_rows)]
+                    )
+                    cursor.execute(f"""
+                        INSERT INTO tasks (id, {fields})
+                        SELECT target_id, {fields} FROM import_batch WHERE is_new = 1 ORDER BY row_number
+                    """)
+                    stats['imported'] += len(new_rows)
+
+                if conflict_resolution == 'overwrite':
+                    cursor.execute(f"""
+                        UPDATE tasks
+                        SET ({overwrite_fields}) = (SELECT {overwrite_fields} FROM import_batch b
+                                                    WHERE b.target_id = tasks.id)
+                        WHERE id IN (SELECT target_id FROM import_batch WHERE is_new = 0)
+                    """)
+                    stats['updated'] += cursor.rowcount
+                    cursor.execute("""
+                        DELETE FROM task_comments
+                        WHERE task_id IN (SELECT target_id FROM import_batch WHERE is_new = 0)
+                    """)
+
+                cursor.execute("""
+                    INSERT INTO task_comments (task_id, comment, created_at)
+                    SELECT b.target_id, c.comment, c.created_at
+                    FROM import_batch_comments c
+                    JOIN import_batch b ON b.row_number = c.row_number
+                    ORDER BY c.row_number, c.seq
+                """)
+                cursor.execute(
+                    "INSERT OR REPLACE INTO import_fingerprints (fingerprint, task_id, job_id) "
+                    "SELECT fingerprint, target_id, ? FROM import_batch",
+                    (job['id'],)
+                )
+                cursor.execute("DELETE FROM import_batch")
+                cursor.execute("DELETE FROM import_batch_comments")
+
+            # Контрольная точка фиксируется в той же транзакции, что и данные пачки
+            cursor.execute("""
+                UPDATE import_jobs
+                SET rows_done = ?, imported = imported + ?, updated = updated + ?,
+                    skipped = skipped + ?, errors = errors + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (rows_done, stats['imported'], stats['updated'], stats['skipped'], stats['errors'], job['id']))
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+
+        for key, value in stats.items():
+            job[key] += value
+            IMPORT_TASKS.labels(result=key).inc(value)
+        job['rows_done'] = rows_done
+        stats['error_details'] = error_details
+        return stats
+
+    def _default_workers(self):
+        """Количество процессов валидации по умолчанию (один CPU оставляем парсеру и записи)."""
+        return max(1, min(IMPORT_MAX_WORKERS, (os.cpu_count() or 1) - 1))
+
+    def import_tasks(self, file_path, conflict_resolution='skip', batch_size=IMPORT_BATCH_SIZE,
+                     progress_callback=None, workers=None):
         """
         Импортирует задачи из файла.
+
+        Импорт выполняется конвейером из трех стадий:
+        парсинг (отдельный поток) → валидация и нормализация пачек
+        (пул процессов) → запись (единственный владелец соединения с БД).
+        Стадии связаны ограниченными очередями, поэтому память не зависит
+        от размера файла.
+
+        Импорт идемпотентен и возобновляем: задание хранится в import_jobs
+        (хеш файла и номер последней записанной строки фиксируются в той же
+        транзакции, что и пачка), а для каждой строки сохраняется отпечаток
+        содержимого. Повторный запуск для того же файла продолжает с места
+        остановки, уже импортированные строки пропускаются.
         
         Args:
             file_path: Путь к файлу импорта
-            conflict_resolution: Стратегия разрешения конфликтов ('skip', 'overwrite', 'rename')
+            conflict_resolution: Стратегия разрешения конфликтов по заголовку:
+                'skip' - пропустить, 'overwrite' - перезаписать существующую задачу,
+                'rename' - импортировать с суффиксом " (n)"
+            batch_size: Количество задач в одной пачке (и транзакции)
+            progress_callback: Функция progress_callback(processed, total), вызывается после каждой пачки
+                               (total = None: файл читается потоково и размер заранее неизвестен)
+            workers: Количество процессов валидации (None = по числу CPU, 1 = без пула);
+                     пул запускается, только если в файле больше IMPORT_POOL_MIN_ROWS строк
         
         Returns:
-            dict: Результат импорта с статистикой
+            dict: Результат импорта со статистикой и метриками стадий
         """
+        started = time.perf_counter()
         try:
             logger.info(f"Начало импорта из файла: {file_path}", "IMPORT")
             
-            # Парсим файл
-            tasks_data = self._parse_import_file(file_path)
-            if not tasks_data:
+            if conflict_resolution not in ('skip', 'overwrite', 'rename'):
+                return {
+                    'success': False,
+                    'error': f'Неизвестная стратегия разрешения конфликтов: {conflict_resolution}',
+                    'imported': 0,
+                    'skipped': 0,
+                    'errors': 0
+                }
+            
+            tasks_data = self._iter_import_file(file_path)
+            if tasks_data is None:
                 return {
                     'success': False,
                     'error': 'Не удалось прочитать файл импорта',
@@ -248,57 +784,193 @@ class ImportManager:
                     'errors': 0
                 }
             
-            # Статистика импорта
-            imported_count = 0
-            skipped_count = 0
-            error_count = 0
+            if workers is None:
+                workers = self._default_workers()
+            
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                self._ensure_import_tables(conn)
+                job = self._start_job(conn, file_path, file_sha256(file_path), conflict_resolution)
+            except Exception:
+                conn.close()
+                raise
+            resumed_from = job['rows_done']
+            
             errors = []
+            processed = resumed_from
+            parse_errors = []
+            metrics = {stage: {'items': 0, 'seconds': 0.0} for stage in ('parse', 'validate', 'write')}
             
-            # Импортируем каждую задачу
-            for i, task_data in enumerate(tasks_data):
+            # Стадия парсинга: читает пачки в отдельном потоке
+            parsed_queue = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+            stop_event = threading.Event()
+            
+            def parse_stage():
+                numbered_tasks = enumerate(tasks_data, 1)
                 try:
-                    # Валидируем данные
-                    is_valid, error_msg = self._validate_task_data(task_data)
-                    if not is_valid:
-                        error_count += 1
-                        errors.append(f"Задача {i+1}: {error_msg}")
-                        continue
+                    # Строки до контрольной точки уже записаны
+                    if resumed_from:
+                        for _ in itertools.islice(numbered_tasks, resumed_from):
+                            pass
+                    while not stop_event.is_set():
+                        started = time.perf_counter()
+                        chunk = []
+                        try:
+                            chunk.extend(itertools.islice(numbered_tasks, batch_size))
+                        except Exception as e:
+                            # Ошибка формата в середине файла: прочитанные до нее задачи импортируются
+                            parse_errors.append(e)
+                        metrics['parse']['seconds'] += time.perf_counter() - started
+                        metrics['parse']['items'] += len(chunk)
+                        if chunk:
+                            parsed_queue.put(chunk)
+                        if parse_errors or not chunk:
+                            break
+                except Exception as e:
+                    parse_errors.append(e)
+                finally:
+                    parsed_queue.put(None)
+            
+            parser_thread = threading.Thread(target=parse_stage, daemon=True)
+            parser_thread.start()
+            
+            executor = None
+            pool_allowed = workers > 1
+            pool_used = False
+            submitted_rows = 0
+            
+            def submit(chunk):
+                # Стадия валидации: пачка уходит в пул процессов, без пула - выполняется сразу
+                nonlocal executor, pool_allowed, pool_used, submitted_rows
+                submitted_rows += len(chunk)
+                if executor is None and pool_allowed and submitted_rows > IMPORT_POOL_MIN_ROWS:
+                    try:
+                        executor = ProcessPoolExecutor(max_workers=workers)
+                        pool_used = True
+                    except Exception as e:
+                        logger.warning(f"Пул процессов валидации недоступен, валидация в текущем процессе: {e}", "IMPORT")
+                        pool_allowed = False
+                if executor is not None:
+                    try:
+                        return executor.submit(_validate_and_normalize_chunk, chunk)
+                    except Exception as e:
+                        logger.warning(f"Пул процессов валидации недоступен, валидация в текущем процессе: {e}", "IMPORT")
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = None
+                        pool_allowed = False
+                future = Future()
+                future.set_result(_validate_and_normalize_chunk(chunk))
+                return future
+            
+            try:
+                # Пачки в обработке (порядок сохраняется); ограничивает связь валидации и записи
+                pending = deque()
+                window = max(2, workers * 2)
+                exhausted = False
+                while True:
+                    while not exhausted and len(pending) < window:
+                        chunk = parsed_queue.get()
+                        if chunk is None:
+                            exhausted = True
+                            break
+                        pending.append((chunk, submit(chunk)))
+                    if not pending:
+                        break
                     
-                    # Проверяем конфликты (по заголовку)
-                    if conflict_resolution == 'skip':
-                        conn = sqlite3.connect(self.db_path)
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT id FROM tasks WHERE title = ?", (task_data['title'],))
-                        if cursor.fetchone():
-                            skipped_count += 1
-                            conn.close()
-                            continue
-                        conn.close()
+                    chunk, future = pending.popleft()
+                    try:
+                        results, validate_seconds = future.result()
+                    except Exception as e:
+                        logger.warning(f"Ошибка пула процессов валидации, повтор в текущем процессе: {e}", "IMPORT")
+                        results, validate_seconds = _validate_and_normalize_chunk(chunk)
+                    metrics['validate']['items'] += len(results)
+                    metrics['validate']['seconds'] += validate_seconds
                     
-                    # Создаем задачу
-                    task_id = self._create_task(task_data)
-                    if task_id:
-                        imported_count += 1
-                        logger.debug(f"Импортирована задача: {task_data['title']}", "IMPORT")
-                    else:
-                        error_count += 1
-                        errors.append(f"Задача {i+1}: Ошибка создания в БД")
-                        
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Задача {i+1}: {str(e)}")
-                    logger.error(f"Ошибка импорта задачи {i+1}: {e}", "IMPORT")
+                    # Стадия записи: пачка и контрольная точка - одна транзакция
+                    write_started = time.perf_counter()
+                    batch_stats = self._write_chunk(conn, job, results, conflict_resolution, chunk[-1][0])
+                    errors.extend(batch_stats['error_details'])
+                    metrics['write']['items'] += len(results)
+                    metrics['write']['seconds'] += time.perf_counter() - write_started
+                    
+                    processed = chunk[-1][0]
+                    logger.debug(f"Импорт: обработано {processed}", "IMPORT")
+                    if progress_callback:
+                        progress_callback(processed, None)
+                
+                parse_error = parse_errors[0] if parse_errors else None
+                conn.execute(
+                    "UPDATE import_jobs SET status = ?, updated_at = CURRENT_TIMESTAMP, "
+                    "finished_at = CASE WHEN ? = 'completed' THEN CURRENT_TIMESTAMP END WHERE id = ?",
+                    ('failed' if parse_error is not None else 'completed',) * 2 + (job['id'],)
+                )
+            finally:
+                conn.close()
+                stop_event.set()
+                # Освобождаем поток парсинга, если он ждет места в очереди
+                while parser_thread.is_alive():
+                    try:
+                        parsed_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+            
+            if parse_error is not None:
+                logger.error(f"Ошибка чтения файла импорта после задачи {processed}: {parse_error}", "IMPORT")
+            
+            if not processed:
+                error = 'Не удалось прочитать файл импорта'
+                if parse_error is not None:
+                    error += f': {parse_error}'
+                return {
+                    'success': False,
+                    'error': error,
+                    'imported': 0,
+                    'skipped': 0,
+                    'errors': 0
+                }
+            
+            if parse_error is not None:
+                errors.append(f"Файл прочитан не полностью (после задачи {processed}): {parse_error}")
+            
+            for stage, stage_metrics in metrics.items():
+                seconds = stage_metrics['seconds']
+                stage_metrics['seconds'] = round(seconds, 4)
+                stage_metrics['throughput'] = round(stage_metrics['items'] / seconds, 1) if seconds > 0 else None
+                logger.debug(
+                    f"Стадия {stage}: {stage_metrics['items']} задач за {seconds:.3f} с "
+                    f"({stage_metrics['throughput']} задач/с)", "IMPORT"
+                )
             
             result = {
                 'success': True,
-                'imported': imported_count,
-                'skipped': skipped_count,
-                'errors': error_count,
-                'total': len(tasks_data),
-                'error_details': errors
+                'job_id': job['id'],
+                'resumed_from': resumed_from,
+                'imported': job['imported'],
+                'updated': job['updated'],
+                'skipped': job['skipped'],
+                'errors': job['errors'],
+                'total': processed,
+                'error_details': errors,
+                'workers': workers if pool_used else 1,
+                'metrics': metrics
             }
             
-            logger.success(f"Импорт завершен: {imported_count} импортировано, {skipped_count} пропущено, {error_count} ошибок", "IMPORT")
+            seconds = time.perf_counter() - started
+            IMPORT_SECONDS.observe(seconds)
+            if seconds > 0:
+                # Строки до контрольной точки при возобновлении не обрабатывались
+                IMPORT_THROUGHPUT.set((processed - resumed_from) / seconds)
+            
+            summary = (f"{job['imported']} импортировано, {job['updated']} обновлено, "
+                       f"{job['skipped']} пропущено, {job['errors']} ошибок")
+            if parse_error is not None:
+                result['success'] = False
+                result['error'] = str(parse_error)
+                logger.warning(f"Импорт прерван: {summary}", "IMPORT")
+            else:
+                logger.success(f"Импорт завершен: {summary}", "IMPORT")
             return result
             
         except Exception as e:
@@ -311,51 +983,64 @@ class ImportManager:
                 'errors': 0
             }
     
-    def preview_import(self, file_path):
+    def preview_import(self, file_path, limit=10, count_all=False):
         """
         Предварительный просмотр импорта без сохранения в БД.
+
+        Читаются только первые limit задач; при count_all=True файл
+        дочитывается до конца для подсчета общей статистики.
         
         Returns:
             dict: Информация о задачах для импорта
         """
         try:
-            tasks_data = self._parse_import_file(file_path)
-            if not tasks_data:
+            tasks_data = self._iter_import_file(file_path)
+            if tasks_data is None:
                 return None
             
             preview_data = {
-                'total_tasks': len(tasks_data),
+                'total_tasks': 0,
                 'valid_tasks': 0,
                 'invalid_tasks': 0,
                 'tasks_preview': [],
-                'errors': []
+                'errors': [],
+                'has_more': False
             }
             
-            # Анализируем первые 10 задач
-            for i, task_data in enumerate(tasks_data[:10]):
+            # Анализируем первые limit задач
+            for i, task_data in enumerate(itertools.islice(tasks_data, limit)):
+                preview_data['total_tasks'] += 1
                 is_valid, error_msg = self._validate_task_data(task_data)
                 
                 if is_valid:
                     preview_data['valid_tasks'] += 1
+                    description = task_data.get('description') or ''
                     preview_data['tasks_preview'].append({
                         'title': task_data.get('title', ''),
-                        'description': task_data.get('description', '')[:100] + '...' if len(task_data.get('description', '')) > 100 else task_data.get('description', ''),
+                        'description': description[:100] + '...' if len(description) > 100 else description,
                         'status': task_data.get('status', 'new'),
                         'priority': task_data.get('priority', 'medium'),
                         'tags': task_data.get('tags', []),
-                        'comments_count': len(task_data.get('comments', []))
+                        'comments_count': len(task_data.get('comments') or [])
                     })
                 else:
                     preview_data['invalid_tasks'] += 1
                     preview_data['errors'].append(f"Задача {i+1}: {error_msg}")
             
-            # Подсчитываем общую статистику
-            for task_data in tasks_data:
-                is_valid, _ = self._validate_task_data(task_data)
-                if is_valid:
-                    preview_data['valid_tasks'] += 1
-                else:
-                    preview_data['invalid_tasks'] += 1
+            if preview_data['total_tasks'] == 0:
+                return None
+            
+            if count_all:
+                # Подсчитываем общую статистику по оставшимся задачам
+                for task_data in tasks_data:
+                    preview_data['total_tasks'] += 1
+                    is_valid, _ = self._validate_task_data(task_data)
+                    if is_valid:
+                        preview_data['valid_tasks'] += 1
+                    else:
+                        preview_data['invalid_tasks'] += 1
+            else:
+                preview_data['has_more'] = next(tasks_data, None) is not None
             
             return preview_data
             
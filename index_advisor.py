@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Индексы под реальные запросы и проверка планов выполнения
+
+Модули регистрируют свои "горячие" запросы (доска, архив, напоминания,
+миграция категорий, теги) через register_hot_query. При старте создаются
+составные и частичные индексы под эти запросы, а план каждого запроса
+проверяется через EXPLAIN QUERY PLAN и выводится в лог отчетом.
+"""
+
+import sqlite3
+import importlib
+from logger import logger
+
+# Ранг приоритета для сортировки доски. Выражение в запросе должно
+# совпадать с выражением индекса idx_tasks_board_rank, поэтому оба
+# строятся из этой константы.
+PRIORITY_RANK_SQL = "CASE {column} WHEN 'high' THEN 1 WHEN 'medium' THEN 2 ELSE 3 END"
+
+# Момент последнего изменения задачи (инкрементальный экспорт), индекс idx_tasks_changed_at
+CHANGED_AT_SQL = "datetime(COALESCE(updated_at, created_at))"
+
+# Индексы под горячие запросы: (имя, таблица, колонки/выражения, условие частичного индекса или None, нужные колонки)
+INDEX_DEFINITIONS = (
+    # Доска (kanban/eisenhower): активные задачи по рангу приоритета и дедлайну
+    ('idx_tasks_board_rank', 'tasks',
+     f"({PRIORITY_RANK_SQL.format(column='priority')}), due_date", "archived = 0",
+     ('priority', 'due_date', 'archived')),
+    # Список активных задач по дате создания
+    ('idx_tasks_active_created', 'tasks', "created_at DESC", "archived = 0",
+     ('created_at', 'archived')),
+    # Архив по дате архивирования
+    ('idx_tasks_archive', 'tasks', "archived_at DESC", "archived = 1",
+     ('archived_at', 'archived')),
+    # Миграция категорий и напоминания: покрывающий индекс по активным задачам с датами
+    ('idx_tasks_active_dated', 'tasks', "status, due_date, scheduled_date",
+     "archived = 0 AND (due_date IS NOT NULL OR scheduled_date IS NOT NULL)",
+     ('status', 'due_date', 'scheduled_date', 'archived')),
+    # Миграция категорий: задачи, которым подошло время сменить колонку (next_migration_at)
+    ('idx_tasks_next_migration', 'tasks', "next_migration_at",
+     "archived = 0 AND status NOT IN ('done', 'cancelled') AND next_migration_at IS NOT NULL",
+     ('next_migration_at', 'status', 'archived')),
+    # Подсчет тегов: покрывающий индекс только по задачам с тегами
+    ('idx_tasks_tags', 'tasks', "tags", "tags IS NOT NULL AND tags != ''",
+     ('tags',)),
+    # Импорт: поиск конфликтов по заголовку
+    ('idx_tasks_title', 'tasks', "title", None,
+     ('title',)),
+    # Инкрементальный экспорт: задачи, измененные с момента since
+    ('idx_tasks_changed_at', 'tasks', CHANGED_AT_SQL, None,
+     ('created_at', 'updated_at')),
+)
+
+# Индексы, которые заменены частичными и только замедляют запись
+OBSOLETE_INDEXES = ('idx_tasks_archived', 'idx_tasks_migration_date')
+
+# Модули, регистрирующие горячие запросы при импорте
+HOT_QUERY_MODULES = ('database_manager', 'reminder_manager', 'category_migration_manager', 'export_manager')
+
+# Реестр горячих запросов: имя -> описание
+HOT_QUERIES = {}
+
+
+def register_hot_query(name, sql, params=(), expected_index=True, source=None):
+    """
+    Регистрирует запрос для проверки плана.
+
+    Args:
+        name: Уникальное имя запроса (например, 'board_kanban')
+        sql: Текст запроса или функция db_path -> текст (для запросов,
+             которые строятся под схему конкретной БД)
+        params: Пример параметров для EXPLAIN
+        expected_index: Должен ли запрос обходиться без полного сканирования tasks
+        source: Модуль-владелец запроса (для отчета)
+    """
+    HOT_QUERIES[name] = {
+        'sql': sql,
+        'params': tuple(params),
+        'expected_index': expected_index,
+        'source': source,
+    }
+
+
+def load_hot_queries():
+    """Импортирует модули, регистрирующие горячие запросы."""
+    for module_name in HOT_QUERY_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить запросы модуля {module_name}: {e}", "INDEX")
+    return HOT_QUERIES
+
+
+def _table_columns(cursor, table):
+    cursor.execute("PRAGMA table_info(%s)" % table)
+    return {column[1] for column in cursor.fetchall()}
+
+
+def ensure_indexes(conn):
+    """
+    Создает индексы под горячие запросы (для колонок, которые есть в схеме).
+
+    Активные задачи должны иметь archived = 0 (не NULL): частичные индексы
+    с условием archived = 0 используются только запросами с тем же условием.
+
+    Returns:
+        Список имен созданных индексов
+    """
+    c = conn.cursor()
+    columns = _table_columns(c, 'tasks')
+    if not columns:
+        return []
+
+    if 'archived' in columns:
+        c.execute("UPDATE tasks SET archived = 0 WHERE archived IS NULL")
+        if c.rowcount:
+            logger.database(f"Нормализовано значений archived: {c.rowcount}", "INDEX")
+
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    existing = {row[0] for row in c.fetchall()}
+
+    created = []
+    for name, table, expression, where, required in INDEX_DEFINITIONS:
+        if name in existing or not set(required) <= columns:
+            continue
+        try:
+            sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table}({expression})"
+            if where:
+                sql += f" WHERE {where}"
+            c.execute(sql)
+            created.append(name)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Ошибка создания индекса {name}: {e}", "INDEX")
+
+    for name in OBSOLETE_INDEXES:
+        if name in existing:
+            c.execute(f"DROP INDEX IF EXISTS {name}")
+            logger.database(f"Удален индекс {name} (заменен частичными индексами)", "INDEX")
+
+    # Статистика нужна планировщику, чтобы выбирать частичные индексы и MULTI-INDEX OR
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if created or not c.fetchone():
+        c.execute("ANALYZE")
+    else:
+        c.execute("PRAGMA optimize")
+    conn.commit()
+
+    for name in created:
+        logger.database(f"Создан индекс {name}", "INDEX")
+    return created
+
+
+def explain(conn, sql, params=()):
+    """Возвращает строки плана EXPLAIN QUERY PLAN (колонка detail)."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def find_full_scans(plan):
+    """
+    Возвращает шаги плана с полным сканированием таблицы.
+
+    'SCAN tasks USING INDEX ...' - обход индекса (частичного или по порядку
+    сортировки), полным сканированием не считается.
+    """
+    scans = []
+    for detail in plan:
+        words = detail.split()
+        if len(words) < 2 or words[0] != 'SCAN' or 'USING' in words:
+            continue
+        # Подзапросы и строка-константа - не таблицы
+        if words[1].startswith('(') or words[1] == 'CONSTANT':
+            continue
+        scans.append(detail)
+    return scans
+
+
+def _resolve_sql(entry, db_path):
+    sql = entry['sql']
+    return sql(db_path) if callable(sql) else sql
+
+
+def check_query_plans(conn, db_path, queries=None):
+    """
+    Проверяет планы зарегистрированных запросов.
+
+    Returns:
+        Список словарей {name, source, plan, full_scans, temp_btree, ok, error}
+    """
+    report = []
+    for name, entry in sorted((queries if queries is not None else HOT_QUERIES).items()):
+        item = {'name': name, 'source': entry['source'], 'plan': [], 'full_scans': [],
+                'temp_btree': False, 'ok': True, 'error': None}
+        try:
+            plan = explain(conn, _resolve_sql(entry, db_path), entry['params'])
+            item['plan'] = plan
+            item['full_scans'] = find_full_scans(plan)
+            item['temp_btree'] = any('USE TEMP B-TREE' in detail for detail in plan)
+            item['ok'] = not (entry['expected_index'] and item['full_scans'])
+        except sqlite3.Error as e:
+            item['ok'] = False
+            item['error'] = str(e)
+        report.append(item)
+    return report
+
+
+def log_report(report):
+    """Выводит отчет о планах запросов в лог."""
+    for item in report:
+        if item['error']:
+            logger.warning(f"{item['name']}: ошибка EXPLAIN: {item['error']}", "INDEX")
+            continue
+        plan = '; '.join(item['plan'])
+        suffix = ' (сортировка во временном B-дереве)' if item['temp_btree'] else ''
+        if item['ok']:
+            logger.debug(f"{item['name']}: {plan}{suffix}", "INDEX")
+        else:
+            logger.warning(f"{item['name']}: полное сканирование - {plan}{suffix}", "INDEX")
+    problems = sum(1 for item in report if not item['ok'])
+    if problems:
+        logger.warning(f"Планы запросов: {problems} из {len(report)} без подходящего индекса", "INDEX")
+    else:
+        logger.database(f"Планы запросов: все {len(report)} используют индексы", "INDEX")
+
+
+def run_index_advisor(db_path='tasks.db'):
+    """
+    Создает недостающие индексы и проверяет планы горячих запросов.
+
+    Returns:
+        Отчет check_query_plans
+    """
+    load_hot_queries()
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_indexes(conn)
+        report = check_query_plans(conn, db_path)
+    finally:
+        conn.close()
+    log_report(report)
+    return report
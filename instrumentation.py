@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Инструментирование запросов: фазы, Server-Timing, профилирование
+
+Время каждого HTTP-запроса раскладывается по фазам (db, render, markdown,
+config, app - остальное). Фазы считаются без вложенных: время Markdown внутри
+рендера шаблона попадает в markdown, а не в render. Разбивка отдается в
+заголовке Server-Timing и накапливается в скользящих гистограммах по
+маршрутам, фазам и SQL-запросам (см. /api/debug/timings).
+
+Профилирование (cProfile) включается в конфигурации и запускается для
+отдельного запроса флагом ?_profile=1 или для доли запросов (profile_sample_rate).
+"""
+
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from logger import logger
+
+try:
+    from flask import g, request, has_request_context
+except ImportError:  # модуль используется и вне веб-приложения
+    g = request = None
+
+    def has_request_context():
+        return False
+
+# Границы корзин гистограмм, мс (последняя корзина - все, что больше)
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Скользящее окно: WINDOW_SLOTS интервалов по slot_seconds
+WINDOW_SLOTS = 10
+
+# Фазы в порядке вывода в Server-Timing
+PHASES = ('db', 'render', 'markdown', 'config')
+
+# Сколько последних профилей хранить в памяти
+PROFILE_HISTORY = 20
+
+DEFAULT_SETTINGS = {
+    'enabled': True,
+    'server_timing': True,
+    'profiler_enabled': False,
+    'profile_sample_rate': 0.0,
+    'window_minutes': 10,
+}
+
+
+class RollingHistogram:
+    """
+    Гистограмма за последние N минут.
+
+    Окно разбито на WINDOW_SLOTS интервалов; при переходе в новый интервал
+    самый старый обнуляется, поэтому память постоянна, а старые замеры
+    перестают влиять на перцентили.
+    """
+
+    def __init__(self, window_seconds=600, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.slot_seconds = max(1.0, window_seconds / WINDOW_SLOTS)
+        self._slots = [self._empty_slot() for _ in range(WINDOW_SLOTS)]
+        self._slot_ids = [None] * WINDOW_SLOTS
+        self._lock = threading.Lock()
+
+    def _empty_slot(self):
+        return {'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+
+    def _slot(self, now):
+        slot_id = int(now // self.slot_seconds)
+        index = slot_id % WINDOW_SLOTS
+        if self._slot_ids[index] != slot_id:
+            self._slots[index] = self._empty_slot()
+            self._slot_ids[index] = slot_id
+        return self._slots[index]
+
+    def observe(self, value_ms, now=None):
+        """Добавляет замер (мс)."""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            slot = self._slot(time.time() if now is None else now)
+            slot['counts'][index] += 1
+            slot['count'] += 1
+            slot['sum'] += value_ms
+            if value_ms > slot['max']:
+                slot['max'] = value_ms
+
+    def snapshot(self, now=None):
+        """
+        Сводка за окно: count, sum_ms, avg_ms, max_ms, p50/p95/p99 (оценка
+        по верхней границе корзины) и накопленные значения корзин.
+        """
+        now = time.time() if now is None else now
+        current = int(now // self.slot_seconds)
+        counts = [0] * (len(self.buckets) + 1)
+        count, total, maximum = 0, 0.0, 0.0
+        with self._lock:
+            for slot_id, slot in zip(self._slot_ids, self._slots):
+                if slot_id is None or current - slot_id >= WINDOW_SLOTS:
+                    continue
+                for i, value in enumerate(slot['counts']):
+                    counts[i] += value
+                count += slot['count']
+                total += slot['sum']
+                maximum = max(maximum, slot['max'])
+
+        def quantile(fraction):
+            if not count:
+                return 0.0
+            rank = fraction * count
+            seen = 0
+            for i, value in enumerate(counts):
+                seen += value
+                if seen >= rank:
+                    return float(self.buckets[i]) if i < len(self.buckets) else round(maximum, 3)
+            return round(maximum, 3)
+
+        return {
+            'count': count,
+            'sum_ms': round(total, 3),
+            'avg_ms': round(total / count, 3) if count else 0.0,
+            'max_ms': round(maximum, 3),
+            'p50_ms': quantile(0.50),
+            'p95_ms': quantile(0.95),
+            'p99_ms': quantile(0.99),
+            'buckets': {('+Inf' if i == len(self.buckets) else str(self.buckets[i])): value
+                        for i, value in enumerate(counts)},
+        }
+
+
+class RequestTiming:
+    """Время фаз одного запроса (хранится в flask.g)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        # Стек времени вложенных фаз: родитель вычитает время детей
+        self._stack = []
+
+    def push(self):
+        self._stack.append(0.0)
+
+    def pop(self, name, elapsed):
+        """Закрывает фазу, начатую push(): учитывается время без вложенных фаз."""
+        children = self._stack.pop() if self._stack else 0.0
+        self.add(name, elapsed - children)
+        if self._stack:
+            self._stack[-1] += elapsed
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + max(0.0, seconds)
+
+    def add_leaf(self, name, elapsed):
+        """Фаза без вложенных (например, SQL-запрос), измеренная снаружи."""
+        self.add(name, elapsed)
+        if self._stack:
+            self._stack[-1] += elapsed
+
+
+class Instrumentation:
+    """
+    Реестр гистограмм и хуки Flask.
+
+    Гистограммы: route:<endpoint>, phase:<фаза>, query:<начало SQL>.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.profiles = deque(maxlen=PROFILE_HISTORY)
+        self._profile_counter = 0
+
+    @property
+    def enabled(self):
+        return bool(self.settings.get('enabled', True))
+
+    def histogram(self, key):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    window = float(self.settings.get('window_minutes', 10)) * 60
+                    histogram = self._histograms[key] = RollingHistogram(window)
+        return histogram
+
+    def observe(self, key, seconds):
+        self.histogram(key).observe(seconds * 1000)
+
+    def snapshot(self):
+        """Сводка всех гистограмм, сгруппированная по виду (route, phase, query)."""
+        result = {}
+        for key, histogram in sorted(self._histograms.items()):
+            kind, _, name = key.partition(':')
+            result.setdefault(kind, {})[name] = histogram.snapshot()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    # --- Фазы текущего запроса -------------------------------------------
+
+    def current(self):
+        if not self.enabled or not has_request_context():
+            return None
+        return g.get('_request_timing')
+
+    def record_query(self, sql, seconds):
+        """Учитывает выполненный SQL-запрос (вызывается из DatabaseManager)."""
+        if not self.enabled:
+            return
+        self.observe('query:' + query_label(sql), seconds)
+        timing = self.current()
+        if timing is not None:
+            timing.queries += 1
+            timing.add_leaf('db', seconds)
+
+    # --- Хуки Flask ------------------------------------------------------
+
+    def init_app(self, app):
+        """Регистрирует хуки запроса и учет времени рендеринга шаблонов."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        try:
+            from flask import before_render_template, template_rendered
+            before_render_template.connect(self._before_render, app, weak=False)
+            template_rendered.connect(self._after_render, app, weak=False)
+        except Exception as e:
+            logger.warning(f"Время рендеринга шаблонов не учитывается: {e}", "TIMING")
+
+    def _before_request(self):
+        if not self.enabled:
+            return
+        g._request_timing = RequestTiming()
+        if self._should_profile():
+            profiler = cProfile.Profile()
+            g._request_profiler = profiler
+            profiler.enable()
+
+    def _should_profile(self):
+        if not self.settings.get('profiler_enabled'):
+            return False
+        if request.args.get('_profile'):
+            return True
+        rate = float(self.settings.get('profile_sample_rate') or 0)
+        return rate > 0 and random.random() < rate
+
+    def _after_request(self, response):
+        timing = g.pop('_request_timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing.started
+
+        profiler = g.pop('_request_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profile_id = self._store_profile(profiler, total)
+            response.headers['X-Profile-Id'] = str(profile_id)
+
+        accounted = sum(timing.phases.values())
+        timing.phases['app'] = max(0.0, total - accounted)
+
+        endpoint = request.endpoint or 'unknown'
+        self.observe('route:' + endpoint, total)
+        for name, seconds in timing.phases.items():
+            self.observe('phase:' + name, seconds)
+
+        if self.settings.get('server_timing', True):
+            response.headers['Server-Timing'] = server_timing_header(timing, total)
+        return response
+
+    def _before_render(self, sender, template=None, context=None, **extra):
+        timing = self.current()
+        if timing is not None:
+            g._render_started = time.perf_counter()
+            timing.push()
+
+    def _after_render(self, sender, template=None, context=None, **extra):
+        timing = self.current()
+        started = g.pop('_render_started', None) if timing is not None else None
+        if started is not None:
+            timing.pop('render', time.perf_counter() - started)
+
+    # --- Профили ---------------------------------------------------------
+
+    def _store_profile(self, profiler, total):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(40)
+        with self._lock:
+            self._profile_counter += 1
+            profile_id = self._profile_counter
+        self.profiles.append({
+            'id': profile_id,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'total_ms': round(total * 1000, 3),
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'report': stream.getvalue(),
+        })
+        logger.debug(f"Профиль {profile_id}: {request.path} ({total * 1000:.1f} мс)", "TIMING")
+        return profile_id
+
+    def get_profile(self, profile_id):
+        for profile in self.profiles:
+            if profile['id'] == profile_id:
+                return profile
+        return None
+
+
+def query_label(sql, length=60):
+    """Короткая метка запроса для гистограммы: первые слова SQL без лишних пробелов."""
+    label = ' '.join(sql.split())
+    return label if len(label) <= length else label[:length] + '...'
+
+
+def server_timing_header(timing, total):
+    """Заголовок Server-Timing: фазы в мс, число SQL-запросов и общее время."""
+    parts = []
+    for name in PHASES + ('app',):
+        if name not in timing.phases:
+            continue
+        entry = f"{name};dur={timing.phases[name] * 1000:.2f}"
+        if name == 'db':
+            entry += f';desc="{timing.queries} queries"'
+        parts.append(entry)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(parts)
+
+
+@contextmanager
+def phase(name):
+    """Контекст для учета фазы запроса (вне запроса ничего не делает)."""
+    timing = get_instrumentation().current()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    timing.push()
+    try:
+        yield
+    finally:
+        timing.pop(name, time.perf_counter() - started)
+
+
+def timed_phase(name):
+    """Декоратор: время вызова функции учитывается в фазе name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Глобальный экземпляр
+_instrumentation = None
+
+def get_instrumentation():
+    """Получает глобальный экземпляр Instrumentation (настройки из config.json)"""
+    global _instrumentation
+    if _instrumentation is None:
+        settings = None
+        try:
+            from config_manager import get_config_manager
+            settings = get_config_manager().get_instrumentation_config()
+        except Exception as e:
+            logger.warning(f"Настройки инструментирования не загружены: {e}", "TIMING")
+        _instrumentation = Instrumentation(settings)
+    return _instrumentation
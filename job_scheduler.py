@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Единый планировщик фоновых задач
+
+Миграция категорий, напоминания, резервное копирование и отгрузка журнала
+регистрируются как задачи одного планировщика вместо отдельных потоков
+с циклами time.sleep(1):
+
+    scheduler = get_job_scheduler()
+    scheduler.add_job('reminders', manager.check, IntervalTrigger(60))
+    scheduler.add_job('backup', run_backup, CronTrigger('0 3 * * *'), jitter_seconds=60)
+
+Задачи хранятся в очереди с приоритетом по времени запуска; поток-диспетчер
+спит ровно до ближайшего запуска (без задач - не просыпается вовсе). Каждый
+запуск выполняется в своем потоке, поэтому долгая задача не задерживает
+остальные. Повторный запуск, пока предыдущий не завершился, пропускается.
+Сторож (max_runtime_seconds) сообщает о зависших запусках - прервать поток
+в Python нельзя, поэтому задача только помечается и не запускается снова
+до завершения. История запусков хранится в таблице job_runs
+(см. /api/admin/jobs), опоздание и длительность - в метриках. Запуски,
+в которых не было работы (функция вернула IDLE), в историю не пишутся,
+чтобы простаивающее приложение не писало в БД задач.
+"""
+
+import time
+import heapq
+import random
+import sqlite3
+import threading
+import itertools
+from datetime import datetime, timedelta
+from logger import logger
+from metrics import get_metrics_registry
+
+DEFAULT_HISTORY_SIZE = 200
+
+# Результат функции задачи "работы не было": запуск учитывается только в метриках
+IDLE = 'idle'
+
+# Даже без задач к запуску диспетчер сверяется с часами не реже раза в час
+# (на случай перевода системного времени)
+MAX_WAIT_SECONDS = 3600
+
+JOB_RUNS = get_metrics_registry().counter(
+    'todolite_job_runs_total', 'Запуски фоновых задач', ('job', 'status'))
+JOB_LAG_SECONDS = get_metrics_registry().histogram(
+    'todolite_job_lag_seconds', 'Опоздание запуска фоновой задачи относительно расписания', ('job',))
+JOB_DURATION_SECONDS = get_metrics_registry().histogram(
+    'todolite_job_duration_seconds', 'Длительность фоновой задачи', ('job',))
+
+
+class IntervalTrigger:
+    """Запуск через равные промежутки (без накопления сдвига)."""
+
+    def __init__(self, seconds):
+        self.seconds = max(1.0, float(seconds))
+
+    def next_after(self, previous, now):
+        if previous is None:
+            return now + self.seconds
+        candidate = previous + self.seconds
+        # Пропущенные запуски (процесс спал, задача шла дольше интервала) не догоняем
+        return candidate if candidate > now else now
+
+    def describe(self):
+        return f"каждые {self.seconds:g}с"
+
+
+class CronTrigger:
+    """
+    Расписание в формате cron: минута час день месяц день_недели.
+
+    Поддерживаются *, списки (1,15), диапазоны (1-5), шаг (*/10, 8-18/2)
+    и сокращения @hourly, @daily, @weekly, @monthly. Воскресенье - 0 или 7.
+    Как в cron, если заданы и день месяца, и день недели, достаточно
+    совпадения любого из них.
+    """
+
+    ALIASES = {
+        '@hourly': '0 * * * *',
+        '@daily': '0 0 * * *',
+        '@weekly': '0 0 * * 0',
+        '@monthly': '0 0 1 * *',
+    }
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = self.ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron-выражение должно содержать 5 полей: {expression!r}")
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = self._parse_field(fields[2], 1, 31)
+        self.months = self._parse_field(fields[3], 1, 12)
+        self.weekdays = frozenset(day % 7 for day in self._parse_field(fields[4], 0, 7))
+        self._days_restricted = fields[2] != '*'
+        self._weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(spec, low, high):
+        values = set()
+        for part in spec.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_text, end_text = part.split('-', 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Недопустимое значение cron-поля: {spec!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, previous, now):
+        start = max(previous or now, now)
+        moment = datetime.fromtimestamp(start).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError(f"Cron-выражение {self.expression!r} не срабатывает в ближайшие 5 лет")
+
+    def describe(self):
+        return f"cron {self.expression}"
+
+
+class Job:
+    """Зарегистрированная задача и состояние ее последнего запуска."""
+
+    def __init__(self, name, func, trigger, jitter_seconds=0, max_runtime_seconds=None):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.jitter_seconds = float(jitter_seconds or 0)
+        self.max_runtime_seconds = max_runtime_seconds
+        # Плановое время (next_run) и оно же со случайным сдвигом (next_run_at)
+        self.next_run = None
+        self.next_run_at = None
+        self.generation = 0
+        self.running = False
+        self.run_id = 0
+        self.started_at = None
+        self.overrun = False
+        self.last_status = None
+        self.last_started_at = None
+        self.last_duration = None
+        self.last_error = None
+
+    def to_dict(self):
+        def fmt(ts):
+            return datetime.fromtimestamp(ts).isoformat(timespec='seconds') if ts else None
+        return {
+            'name': self.name,
+            'trigger': self.trigger.describe(),
+            'jitter_seconds': self.jitter_seconds,
+            'max_runtime_seconds': self.max_runtime_seconds,
+            'next_run_at': fmt(self.next_run_at),
+            'running': self.running,
+            'running_seconds': round(time.time() - self.started_at, 3) if self.running else None,
+            'overrun': self.overrun,
+            'last_status': self.last_status,
+            'last_started_at': fmt(self.last_started_at),
+            'last_duration_ms': round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+            'last_error': self.last_error,
+        }
+
+
+class JobScheduler:
+    """Очередь задач с поток-диспетчером и историей запусков в SQLite."""
+
+    def __init__(self, db_path='tasks.db', history_size=DEFAULT_HISTORY_SIZE, default_max_runtime_seconds=None):
+        self.db_path = db_path
+        self.history_size = int(history_size)
+        self.default_max_runtime_seconds = default_max_runtime_seconds
+        self.jobs = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        logger.info(f"JobScheduler инициализирован (история: {self.history_size} запусков на задачу)", "JOBS")
+
+    # --- Регистрация задач ----------------------------------------------
+
+    def add_job(self, name, func, trigger, jitter_seconds=0, max_runtime_seconds=None, run_immediately=False):
+        """
+        Регистрирует задачу или заменяет расписание уже зарегистрированной.
+
+        Args:
+            name: Имя задачи (ключ в истории и метриках)
+            func: Функция без аргументов
+            trigger: IntervalTrigger или CronTrigger
+            jitter_seconds: Случайная задержка запуска 0..N секунд
+            max_runtime_seconds: Порог сторожа (None - из настроек jobs)
+            run_immediately: Первый запуск сразу, а не через интервал
+        """
+        if max_runtime_seconds is None:
+            max_runtime_seconds = self.default_max_runtime_seconds
+        with self._cond:
+            job = self.jobs.get(name)
+            if job is None:
+                job = self.jobs[name] = Job(name, func, trigger, jitter_seconds, max_runtime_seconds)
+            else:
+                # Выполняющийся запуск не трогаем, меняем только расписание
+                job.func, job.trigger = func, trigger
+                job.jitter_seconds = float(jitter_seconds or 0)
+                job.max_runtime_seconds = max_runtime_seconds
+            now = time.time()
+            if run_immediately:
+                self._schedule(job, now, jitter=False)
+            else:
+                self._schedule(job, job.trigger.next_after(None, now))
+        self._ensure_started()
+        logger.info(f"Задача {name} запланирована ({trigger.describe()}), запуск: {job.to_dict()['next_run_at']}", "JOBS")
+        return job
+
+    def remove_job(self, name, timeout=None):
+        """Снимает задачу с расписания; timeout - сколько ждать завершения текущего запуска."""
+        with self._cond:
+            job = self.jobs.pop(name, None)
+            if job is None:
+                return False
+            job.generation += 1
+            if timeout:
+                deadline = time.monotonic() + timeout
+                while job.running and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                if job.running:
+                    logger.warning(f"Задача {name} снята с расписания, но еще выполняется", "JOBS")
+            self._cond.notify_all()
+        logger.info(f"Задача {name} снята с расписания", "JOBS")
+        return True
+
+    def reschedule(self, name, run_at):
+        """Переносит следующий запуск задачи на время run_at (timestamp)."""
+        with self._cond:
+            job = self.jobs.get(name)
+            if job is None:
+                return False
+            self._schedule(job, run_at)
+        return True
+
+    def run_now(self, name):
+        """
+        Запускает задачу вне расписания (следующий плановый запуск сохраняется).
+
+        Только в ведущем процессе: задачи, оставшиеся в копии планировщика
+        другого процесса (например, унаследованные при fork), не запускаются.
+        """
+        from leader_election import get_leader_elector
+        if not get_leader_elector().is_leader:
+            logger.warning(f"Задача {name} не запущена: процесс не ведущий", "JOBS")
+            return False
+        with self._cond:
+            job = self.jobs.get(name)
+            if job is None:
+                return False
+        self._dispatch(job, time.time(), manual=True)
+        return True
+
+    def get_job(self, name):
+        return self.jobs.get(name)
+
+    # --- Диспетчер -------------------------------------------------------
+
+    def _schedule(self, job, base_time, jitter=True):
+        """Ставит следующий запуск в очередь (вызывается под self._cond)."""
+        job.generation += 1
+        job.next_run = base_time
+        job.next_run_at = base_time + (random.uniform(0, job.jitter_seconds) if jitter and job.jitter_seconds else 0)
+        heapq.heappush(self._queue, (job.next_run_at, next(self._sequence), 'run', job.name, job.generation))
+        self._cond.notify_all()
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                when, _, kind, name, marker = self._queue[0]
+                job = self.jobs.get(name)
+                if kind == 'run' and (job is None or job.generation != marker):
+                    heapq.heappop(self._queue)  # задача снята или перепланирована
+                    continue
+                now = time.time()
+                if when > now:
+                    self._cond.wait(min(when - now, MAX_WAIT_SECONDS))
+                    continue
+                heapq.heappop(self._queue)
+                if kind == 'watchdog':
+                    self._check_watchdog(name, marker)
+                    continue
+                self._schedule(job, job.trigger.next_after(job.next_run, now))
+                scheduled_at = when
+                self._cond.release()
+                try:
+                    self._dispatch(job, scheduled_at)
+                finally:
+                    self._cond.acquire()
+
+    def _dispatch(self, job, scheduled_at, manual=False):
+        with self._cond:
+            skipped = job.running
+            if not skipped:
+                job.running = True
+                job.overrun = False
+                job.run_id += 1
+                job.started_at = time.time()
+                run_id = job.run_id
+                if job.max_runtime_seconds:
+                    heapq.heappush(self._queue, (job.started_at + job.max_runtime_seconds, next(self._sequence),
+                                                 'watchdog', job.name, run_id))
+                    self._cond.notify_all()
+        if skipped:
+            logger.warning(
+                f"Задача {job.name} еще выполняется ({time.time() - job.started_at:.0f}с), запуск пропущен", "JOBS")
+            JOB_RUNS.labels(job=job.name, status='skipped').inc()
+            self._record(job.name, scheduled_at, None, None, 'skipped', 'предыдущий запуск не завершен')
+            return
+        threading.Thread(
+            target=self._execute, args=(job, run_id, scheduled_at, manual),
+            name=f"job-{job.name}", daemon=True
+        ).start()
+
+    def _execute(self, job, run_id, scheduled_at, manual):
+        started = job.started_at
+        lag = 0.0 if manual else max(0.0, started - scheduled_at)
+        JOB_LAG_SECONDS.labels(job=job.name).observe(lag)
+        status, error = 'success', None
+        try:
+            if job.func() == IDLE:
+                status = IDLE
+        except Exception as e:
+            status, error = 'error', str(e)
+            logger.error(f"Ошибка задачи {job.name}: {e}", "JOBS")
+        finished = time.time()
+        duration = finished - started
+        JOB_DURATION_SECONDS.labels(job=job.name).observe(duration)
+
+        with self._cond:
+            if job.overrun and status in ('success', IDLE):
+                status = 'overrun'
+            job.running = False
+            job.last_status = status
+            job.last_started_at = started
+            job.last_duration = duration
+            job.last_error = error
+            self._cond.notify_all()
+        JOB_RUNS.labels(job=job.name, status=status).inc()
+        if status != IDLE:
+            self._record(job.name, scheduled_at, started, finished, status, error, lag)
+        logger.debug(f"Задача {job.name}: {status} за {duration * 1000:.1f} мс (опоздание {lag * 1000:.1f} мс)", "JOBS")
+
+    def _check_watchdog(self, name, run_id):
+        """Вызывается под self._cond, когда истек max_runtime_seconds запуска run_id."""
+        job = self.jobs.get(name)
+        if job is None or not job.running or job.run_id != run_id or job.overrun:
+            return
+        job.overrun = True
+        JOB_RUNS.labels(job=name, status='watchdog').inc()
+        logger.error(
+            f"Задача {name} выполняется дольше {job.max_runtime_seconds:g}с; "
+            f"следующие запуски будут пропускаться до ее завершения", "JOBS")
+
+    def stop(self, timeout=5):
+        """Останавливает диспетчер и ждет выполняющиеся задачи не дольше timeout секунд."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            deadline = time.monotonic() + timeout
+            while any(job.running for job in self.jobs.values()) and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info("JobScheduler остановлен", "JOBS")
+
+    # --- История ---------------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                scheduled_at REAL,
+                started_at REAL,
+                finished_at REAL,
+                status TEXT NOT NULL,
+                lag_ms REAL,
+                duration_ms REAL,
+                error TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs(job, id)')
+        return conn
+
+    def _record(self, name, scheduled_at, started, finished, status, error=None, lag=None):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute('''
+                    INSERT INTO job_runs (job, scheduled_at, started_at, finished_at, status, lag_ms, duration_ms, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    name, scheduled_at, started, finished, status,
+                    round(lag * 1000, 3) if lag is not None else None,
+                    round((finished - started) * 1000, 3) if started and finished else None,
+                    error,
+                ))
+                # Храним последние history_size запусков каждой задачи
+                conn.execute('''
+                    DELETE FROM job_runs WHERE job = ? AND id <= (
+                        SELECT id FROM job_runs WHERE job = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+                    )
+                ''', (name, name, self.history_size))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"История запуска задачи {name} не сохранена: {e}", "JOBS")
+
+    def get_history(self, job=None, limit=50):
+        """Последние запуски (новые первыми), по всем процессам с этой БД."""
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            if job:
+                rows = conn.execute('SELECT * FROM job_runs WHERE job = ? ORDER BY id DESC LIMIT ?', (job, limit))
+            else:
+                rows = conn.execute('SELECT * FROM job_runs ORDER BY id DESC LIMIT ?', (limit,))
+            history = []
+            for row in rows.fetchall():
+                entry = dict(row)
+                for field in ('scheduled_at', 'started_at', 'finished_at'):
+                    if entry[field]:
+                        entry[field] = datetime.fromtimestamp(entry[field]).isoformat(timespec='seconds')
+                history.append(entry)
+            return history
+        finally:
+            conn.close()
+
+    def get_status(self):
+        with self._cond:
+            jobs = [job.to_dict() for job in sorted(self.jobs.values(), key=lambda job: job.next_run_at or 0)]
+        return {'running': self._running, 'jobs': jobs}
+
+
+# Глобальный экземпляр
+_job_scheduler = None
+_job_scheduler_lock = threading.Lock()
+
+def get_job_scheduler(db_path='tasks.db'):
+    """Получает глобальный экземпляр JobScheduler (настройки из jobs в config.json)"""
+    global _job_scheduler
+    if _job_scheduler is None:
+        with _job_scheduler_lock:
+            if _job_scheduler is None:
+                settings = {}
+                try:
+                    from config_manager import get_config_manager
+                    settings = get_config_manager().get_jobs_config()
+                except Exception as e:
+                    logger.warning(f"Настройки планировщика задач не загружены: {e}", "JOBS")
+                max_runtime_minutes = settings.get('max_runtime_minutes', 30)
+                _job_scheduler = JobScheduler(
+                    db_path,
+                    history_size=settings.get('history_size', DEFAULT_HISTORY_SIZE),
+                    default_max_runtime_seconds=max_runtime_minutes * 60 if max_runtime_minutes else None,
+                )
+    return _job_scheduler
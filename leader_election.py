@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Выбор ведущего процесса для фоновых планировщиков
+
+Планировщики (миграция категорий, напоминания, резервное копирование)
+должны работать ровно в одном процессе, даже если запущено несколько
+воркеров, трей и сервер одновременно. Процессы соревнуются за строку-аренду
+в таблице scheduler_leases базы задач: владелец продлевает аренду каждые
+heartbeat_seconds, остальные периодически пытаются ее захватить. Если
+ведущий завершился или завис, аренда истекает через lease_ttl_seconds
+и ее забирает другой процесс.
+
+    elector = get_leader_elector()
+    elector.on_elected(start_schedulers)
+    elector.on_demoted(stop_schedulers)
+    elector.start()
+
+Срок аренды считается по системным часам, поэтому процессы на разных
+машинах с общей БД должны иметь синхронизированное время.
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from logger import logger
+from metrics import get_metrics_registry
+
+DEFAULT_LEASE_NAME = 'schedulers'
+DEFAULT_TTL_SECONDS = 30
+DEFAULT_HEARTBEAT_SECONDS = 10
+
+IS_LEADER = get_metrics_registry().gauge(
+    'todolite_scheduler_leader', 'Процесс владеет арендой планировщиков (1 - ведущий)', ('lease',))
+LEADER_CHANGES = get_metrics_registry().counter(
+    'todolite_scheduler_leader_changes_total', 'Получение и потеря аренды планировщиков', ('lease', 'event'))
+
+# Захват или продление одним запросом: строка обновляется, только если
+# аренда наша или уже истекла, поэтому два процесса не получат ее одновременно
+_ACQUIRE_SQL = '''
+    INSERT INTO scheduler_leases (name, owner, acquired_at, heartbeat_at, expires_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        owner = excluded.owner,
+        acquired_at = CASE WHEN scheduler_leases.owner = excluded.owner
+                           THEN scheduler_leases.acquired_at ELSE excluded.acquired_at END,
+        heartbeat_at = excluded.heartbeat_at,
+        expires_at = excluded.expires_at
+    WHERE scheduler_leases.owner = excluded.owner OR scheduler_leases.expires_at < excluded.heartbeat_at
+'''
+
+
+def _make_owner_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """Аренда в SQLite с продлением в фоновом потоке."""
+
+    def __init__(self, db_path='tasks.db', name=DEFAULT_LEASE_NAME, enabled=True,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+        self.db_path = db_path
+        self.name = name
+        self.enabled = enabled
+        self.ttl_seconds = float(ttl_seconds)
+        # Продлеваем заметно чаще срока аренды, иначе ее заберут при первой задержке
+        self.heartbeat_seconds = min(float(heartbeat_seconds), self.ttl_seconds / 2)
+        self.owner = _make_owner_id()
+        self.is_leader = False
+        self.last_renewed = None
+        self._elected = []
+        self._demoted = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        logger.info(
+            f"LeaderElector инициализирован (аренда: {self.ttl_seconds:g}с, "
+            f"продление: {self.heartbeat_seconds:g}с, включен: {self.enabled})", "LEADER"
+        )
+
+    def on_elected(self, callback):
+        """Функция, вызываемая при получении аренды (запуск планировщиков)."""
+        self._elected.append(callback)
+
+    def on_demoted(self, callback):
+        """Функция, вызываемая при потере или освобождении аренды (остановка планировщиков)."""
+        self._demoted.append(callback)
+
+    # --- Аренда ----------------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                acquired_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        return conn
+
+    def try_acquire(self):
+        """Захватывает или продлевает аренду. Возвращает True, если процесс - ведущий."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute(_ACQUIRE_SQL, (self.name, self.owner, now, now, now + self.ttl_seconds))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def release(self):
+        """Освобождает аренду, чтобы другой процесс подхватил ее сразу, не дожидаясь истечения."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM scheduler_leases WHERE name = ? AND owner = ?", (self.name, self.owner))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Не удалось освободить аренду {self.name}: {e}", "LEADER")
+
+    def current_holder(self):
+        """Текущий владелец аренды: {'owner', 'acquired_at', 'heartbeat_at', 'expires_at'} или None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT owner, acquired_at, heartbeat_at, expires_at FROM scheduler_leases WHERE name = ?",
+                (self.name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[3] < time.time():
+            return None
+        return dict(zip(('owner', 'acquired_at', 'heartbeat_at', 'expires_at'), row))
+
+    # --- Переходы состояний ---------------------------------------------
+
+    def _become_leader(self):
+        self.is_leader = True
+        IS_LEADER.labels(lease=self.name).set(1)
+        LEADER_CHANGES.labels(lease=self.name, event='elected').inc()
+        logger.success(f"Процесс {self.owner} стал ведущим ({self.name}), запуск планировщиков", "LEADER")
+        self._run_callbacks(self._elected)
+
+    def _step_down(self, reason):
+        self.is_leader = False
+        IS_LEADER.labels(lease=self.name).set(0)
+        LEADER_CHANGES.labels(lease=self.name, event='demoted').inc()
+        logger.warning(f"Процесс {self.owner} больше не ведущий ({self.name}): {reason}", "LEADER")
+        self._run_callbacks(self._demoted)
+
+    def _run_callbacks(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика смены ведущего {getattr(callback, '__name__', callback)}: {e}", "LEADER")
+
+    def _tick(self):
+        """Одна попытка захвата или продления аренды."""
+        try:
+            acquired = self.try_acquire()
+        except Exception as e:
+            logger.error(f"Ошибка продления аренды {self.name}: {e}", "LEADER")
+            # Не смогли продлить: пока аренда не истекла, она наша; после - ее может забрать другой
+            if self.is_leader and time.time() - self.last_renewed >= self.ttl_seconds:
+                self._step_down("аренда не продлена вовремя")
+            return
+
+        if acquired:
+            self.last_renewed = time.time()
+            if not self.is_leader:
+                self._become_leader()
+        elif self.is_leader:
+            self._step_down("аренду захватил другой процесс")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._tick()
+            self._stop_event.wait(self.heartbeat_seconds)
+
+    def start(self):
+        """Запускает участие в выборах (без аренды - сразу становится ведущим)."""
+        with self._lock:
+            if self._thread is not None or self.is_leader:
+                logger.warning("LeaderElector уже запущен", "LEADER")
+                return
+            self._stop_event.clear()
+            if not self.enabled:
+                logger.info("Выбор ведущего отключен, планировщики запускаются в этом процессе", "LEADER")
+                self._become_leader()
+                return
+            # Первая попытка синхронно: планировщики стартуют до возврата из start()
+            self._tick()
+            self._thread = threading.Thread(target=self._run, name='leader-election', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Прекращает участие: останавливает планировщики и освобождает аренду."""
+        with self._lock:
+            self._stop_event.set()
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+                self._thread = None
+            if self.is_leader:
+                self._step_down("процесс завершается")
+                if self.enabled:
+                    self.release()
+
+    def get_status(self):
+        """Состояние для диагностики."""
+        status = {
+            'enabled': self.enabled,
+            'lease': self.name,
+            'owner': self.owner,
+            'is_leader': self.is_leader,
+            'ttl_seconds': self.ttl_seconds,
+            'heartbeat_seconds': self.heartbeat_seconds,
+        }
+        if self.enabled:
+            try:
+                status['holder'] = self.current_holder()
+            except Exception as e:
+                status['holder_error'] = str(e)
+        return status
+
+
+# Глобальный экземпляр
+_leader_elector = None
+
+def get_leader_elector(db_path='tasks.db'):
+    """Получает глобальный экземпляр LeaderElector (настройки из leader_election в config.json)"""
+    global _leader_elector
+    if _leader_elector is None:
+        settings = {}
+        try:
+            from config_manager import get_config_manager
+            settings = get_config_manager().get_leader_election_config()
+        except Exception as e:
+            logger.warning(f"Настройки выбора ведущего не загружены: {e}", "LEADER")
+        _leader_elector = LeaderElector(
+            db_path,
+            enabled=settings.get('enabled', True),
+            ttl_seconds=settings.get('lease_ttl_seconds', DEFAULT_TTL_SECONDS),
+            heartbeat_seconds=settings.get('heartbeat_seconds', DEFAULT_HEARTBEAT_SECONDS),
+        )
+    return _leader_elector
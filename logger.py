@@ -1,7 +1,24 @@
 """
 Простая система логирования с цветным выводом
+
+Уровень проверяется до форматирования сообщения, поэтому отключенные
+сообщения почти ничего не стоят. Сообщение может быть функцией (вызывается
+только если уровень включен) или шаблоном с аргументами после тега:
+
+    logger.debug(lambda: f"Дамп: {expensive()}", "TAG")
+    logger.form("due_date = '%s'", "FORM_DATA", due_date)
+
+В асинхронном режиме запись (stdout, файлы) выполняется фоновым потоком,
+а поток запроса только кладет запись в очередь. Формат вывода - цветной
+текст или JSON-строки; файловые приемники ротируются по размеру.
 """
+import os
 import sys
+import json
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 from typing import Optional
 
@@ -10,7 +27,7 @@ class Colors:
     RESET = '\033[0m'
     BOLD = '\033[1m'
     DIM = '\033[2m'
-    
+
     # Цвета текста
     BLACK = '\033[30m'
     RED = '\033[31m'
@@ -20,7 +37,7 @@ class Colors:
     MAGENTA = '\033[35m'
     CYAN = '\033[36m'
     WHITE = '\033[37m'
-    
+
     # Яркие цвета
     BRIGHT_RED = '\033[91m'
     BRIGHT_GREEN = '\033[92m'
@@ -30,9 +47,127 @@ class Colors:
     BRIGHT_CYAN = '\033[96m'
     BRIGHT_WHITE = '\033[97m'
 
+# Числовые уровни: сообщение выводится, если его уровень не ниже порога.
+# Тематические уровни (TASK, DATABASE, HTTP) - информационные, FORM - отладочный
+LEVELS = {
+    'DEBUG': 10,
+    'FORM': 10,
+    'INFO': 20,
+    'TASK': 20,
+    'DATABASE': 20,
+    'HTTP': 20,
+    'SUCCESS': 25,
+    'WARNING': 30,
+    'ERROR': 40,
+    'CRITICAL': 50,
+}
+
+# Сколько записей может ждать фоновой записи; при переполнении новые записи отбрасываются
+QUEUE_SIZE = 10000
+
+class LogRecord:
+    """Запись лога: сообщение уже подставлено, форматирование выполняет приемник"""
+    __slots__ = ('created', 'level', 'tag', 'message', 'logger_name', 'stream')
+
+    def __init__(self, created, level, tag, message, logger_name, stream):
+        self.created = created
+        self.level = level
+        self.tag = tag
+        self.message = message
+        self.logger_name = logger_name
+        # stdout на момент вызова (учитывает contextlib.redirect_stdout)
+        self.stream = stream
+
+    def to_json(self):
+        return json.dumps({
+            'time': datetime.fromtimestamp(self.created).isoformat(timespec='milliseconds'),
+            'level': self.level,
+            'tag': self.tag,
+            'message': self.message,
+            'logger': self.logger_name,
+        }, ensure_ascii=False)
+
+class ConsoleSink:
+    """Вывод в stdout: цветной текст или JSON-строки"""
+
+    def __init__(self, logger, format='text'):
+        self.logger = logger
+        self.format = format
+
+    def emit(self, record):
+        stream = record.stream or sys.stdout
+        if self.format == 'json':
+            line = record.to_json()
+        else:
+            line = self.logger._format_message(record.level, record.message, record.tag, record.created)
+        stream.write(line + '\n')
+
+    def flush(self):
+        try:
+            sys.stdout.flush()
+        except Exception:
+            pass
+
+    def close(self):
+        self.flush()
+
+class RotatingFileSink:
+    """Запись в файл с ротацией по размеру: todolite.log -> todolite.log.1 -> ... .N"""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5, format='json'):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.backup_count = int(backup_count)
+        self.format = format
+        self._file = None
+        self._size = 0
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def emit(self, record):
+        if self.format == 'json':
+            line = record.to_json() + '\n'
+        else:
+            timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+            tag_part = f"[{record.tag}] " if record.tag else ""
+            line = f"{timestamp} {record.level:8} {tag_part}{record.message}\n"
+        if self._file is None:
+            self._open()
+        data_size = len(line.encode('utf-8'))
+        if self.max_bytes and self._size and self._size + data_size > self.max_bytes:
+            self._rotate()
+        self._file.write(line)
+        self._size += data_size
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 class Logger:
     """Простой логгер с цветным выводом"""
-    
+
     def __init__(self, name: str = "ToDoLite"):
         self.name = name
         self.colors = {
@@ -47,61 +182,224 @@ class Logger:
             'HTTP': Colors.CYAN,
             'FORM': Colors.YELLOW
         }
-    
-    def _format_message(self, level: str, message: str, tag: Optional[str] = None) -> str:
+        self.use_colors = True
+        # До configure() выводится все, синхронно - как раньше
+        self.level = LEVELS['DEBUG']
+        self.sinks = [ConsoleSink(self)]
+        self.async_mode = False
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, level=None, format=None, async_mode=None, colors=None, console=None, file=None):
+        """
+        Настраивает логгер (обычно из секции logging в config.json)
+
+        Args:
+            level: Минимальный уровень ('DEBUG', 'INFO', 'WARNING', ...)
+            format: Формат вывода в консоль: 'text' или 'json'
+            async_mode: Писать из фонового потока
+            colors: ANSI-цвета в текстовом формате
+            console: Выводить в stdout
+            file: Настройки файла {'enabled', 'path', 'max_bytes', 'backup_count', 'format'}
+        """
+        if level is not None:
+            self.level = LEVELS.get(str(level).upper(), LEVELS['INFO'])
+        if colors is not None:
+            self.use_colors = bool(colors)
+
+        sinks = []
+        console_sink = next((sink for sink in self.sinks if isinstance(sink, ConsoleSink)), None)
+        if console is None:
+            console = console_sink is not None
+        if console:
+            sinks.append(ConsoleSink(self, format or (console_sink.format if console_sink else 'text')))
+        if file is None:
+            sinks.extend(sink for sink in self.sinks if isinstance(sink, RotatingFileSink))
+        elif file.get('enabled', True) and file.get('path'):
+            sinks.append(RotatingFileSink(
+                file['path'],
+                max_bytes=file.get('max_bytes', 10 * 1024 * 1024),
+                backup_count=file.get('backup_count', 5),
+                format=file.get('format', 'json')
+            ))
+
+        # Старые приемники закрываются после того, как очередь дописана
+        self.flush()
+        with self._lock:
+            old_sinks = [sink for sink in self.sinks if sink not in sinks]
+            self.sinks = sinks
+        for sink in old_sinks:
+            sink.close()
+
+        if async_mode is not None:
+            self.async_mode = bool(async_mode)
+            if not self.async_mode:
+                self._stop_writer()
+
+    def is_enabled_for(self, level: str) -> bool:
+        """Будет ли выведено сообщение уровня level"""
+        return LEVELS.get(level, 0) >= self.level
+
+    def _format_message(self, level: str, message: str, tag: Optional[str] = None, created: Optional[float] = None) -> str:
         """Форматирует сообщение с цветами и временной меткой"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        moment = datetime.fromtimestamp(created) if created is not None else datetime.now()
+        timestamp = moment.strftime("%H:%M:%S")
+        if not self.use_colors:
+            tag_part = f"[{tag}] " if tag else ""
+            return f"{timestamp} {level:8} {tag_part}{message}"
+
         color = self.colors.get(level, Colors.WHITE)
-        
+
         if tag:
             tag_part = f"[{Colors.BOLD}{Colors.WHITE}{tag}{Colors.RESET}] "
         else:
             tag_part = ""
-        
+
         level_part = f"{color}{level:8}{Colors.RESET}"
         time_part = f"{Colors.DIM}{timestamp}{Colors.RESET}"
-        
+
         return f"{time_part} {level_part} {tag_part}{message}"
-    
-    def debug(self, message: str, tag: Optional[str] = None):
+
+    def _log(self, level, message, tag, args):
+        if LEVELS[level] < self.level:
+            return
+        try:
+            if callable(message):
+                message = message()
+            elif args:
+                message = message % args
+        except Exception as e:
+            message = f"{message} {args!r} (ошибка форматирования: {e})"
+        record = LogRecord(time.time(), level, tag, str(message), self.name, sys.stdout)
+        if self.async_mode:
+            self._enqueue(record)
+        else:
+            self._emit(record)
+
+    def _emit(self, record):
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception:
+                # Закрытый поток (например, перенаправленный stdout) не должен ронять приложение
+                pass
+
+    # --- Фоновая запись ---------------------------------------------------
+
+    def _enqueue(self, record):
+        if self._thread is None or self._pid != os.getpid():
+            self._start_writer()
+        try:
+            if LEVELS[record.level] >= LEVELS['WARNING']:
+                # Предупреждения и ошибки не теряем: ждем место в очереди
+                self._queue.put(record, timeout=1)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self):
+        with self._lock:
+            # После fork поток родителя в дочернем процессе не существует
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._writer_loop, args=(self._queue,),
+                                            name='LoggerWriter', daemon=True)
+            self._thread.start()
+
+    def _writer_loop(self, records):
+        reported_drops = 0
+        while True:
+            record = records.get()
+            try:
+                if record is None:
+                    return
+                self._emit(record)
+                if records.empty():
+                    for sink in self.sinks:
+                        sink.flush()
+                    if self.dropped != reported_drops:
+                        lost = self.dropped - reported_drops
+                        reported_drops = self.dropped
+                        self._emit(LogRecord(time.time(), 'WARNING', 'LOGGER',
+                                             f"Очередь логов переполнена, потеряно записей: {lost}",
+                                             self.name, None))
+            finally:
+                records.task_done()
+
+    def _stop_writer(self):
+        thread, records = self._thread, self._queue
+        if thread is None or self._pid != os.getpid():
+            return
+        records.put(None)
+        thread.join(timeout=5)
+        self._thread = None
+        self._queue = None
+
+    def flush(self):
+        """Дожидается записи всех сообщений из очереди"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+        for sink in self.sinks:
+            try:
+                sink.flush()
+            except Exception:
+                pass
+
+    def close(self):
+        """Дописывает очередь и закрывает приемники (вызывается при выходе)"""
+        self._stop_writer()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+
+    def debug(self, message: str, tag: Optional[str] = None, *args):
         """Отладочное сообщение"""
-        print(self._format_message("DEBUG", message, tag))
-    
-    def info(self, message: str, tag: Optional[str] = None):
+        self._log("DEBUG", message, tag, args)
+
+    def info(self, message: str, tag: Optional[str] = None, *args):
         """Информационное сообщение"""
-        print(self._format_message("INFO", message, tag))
-    
-    def success(self, message: str, tag: Optional[str] = None):
+        self._log("INFO", message, tag, args)
+
+    def success(self, message: str, tag: Optional[str] = None, *args):
         """Сообщение об успехе"""
-        print(self._format_message("SUCCESS", message, tag))
-    
-    def warning(self, message: str, tag: Optional[str] = None):
+        self._log("SUCCESS", message, tag, args)
+
+    def warning(self, message: str, tag: Optional[str] = None, *args):
         """Предупреждение"""
-        print(self._format_message("WARNING", message, tag))
-    
-    def error(self, message: str, tag: Optional[str] = None):
+        self._log("WARNING", message, tag, args)
+
+    def error(self, message: str, tag: Optional[str] = None, *args):
         """Ошибка"""
-        print(self._format_message("ERROR", message, tag))
-    
-    def critical(self, message: str, tag: Optional[str] = None):
+        self._log("ERROR", message, tag, args)
+
+    def critical(self, message: str, tag: Optional[str] = None, *args):
         """Критическая ошибка"""
-        print(self._format_message("CRITICAL", message, tag))
-    
-    def task(self, message: str, tag: Optional[str] = None):
+        self._log("CRITICAL", message, tag, args)
+
+    def task(self, message: str, tag: Optional[str] = None, *args):
         """Сообщение о задаче"""
-        print(self._format_message("TASK", message, tag))
-    
-    def database(self, message: str, tag: Optional[str] = None):
+        self._log("TASK", message, tag, args)
+
+    def database(self, message: str, tag: Optional[str] = None, *args):
         """Сообщение о базе данных"""
-        print(self._format_message("DATABASE", message, tag))
-    
-    def http(self, message: str, tag: Optional[str] = None):
+        self._log("DATABASE", message, tag, args)
+
+    def http(self, message: str, tag: Optional[str] = None, *args):
         """HTTP сообщение"""
-        print(self._format_message("HTTP", message, tag))
-    
-    def form(self, message: str, tag: Optional[str] = None):
+        self._log("HTTP", message, tag, args)
+
+    def form(self, message: str, tag: Optional[str] = None, *args):
         """Сообщение о форме"""
-        print(self._format_message("FORM", message, tag))
+        self._log("FORM", message, tag, args)
 
 # Создаем глобальный экземпляр логгера
 logger = Logger("ToDoLite")
+atexit.register(logger.close)
@@ -6,7 +6,14 @@ ToDoLite - Утилиты для работы с Markdown
 
 import markdown
 import re
+import threading
+from functools import lru_cache
 from logger import logger
+from instrumentation import timed_phase
+from metrics import get_metrics_registry
+
+# Размер кэша HTML по тексту Markdown (описания и комментарии на доске повторяются от запроса к запросу)
+MARKDOWN_CACHE_SIZE = 2048
 
 class MarkdownProcessor:
     """
@@ -342,10 +349,23 @@ def get_markdown_processor():
         _markdown_processor = MarkdownProcessor()
     return _markdown_processor
 
-def markdown_to_html(markdown_text):
-    """Конвертирует Markdown в HTML"""
+# Экземпляр markdown.Markdown хранит состояние разбора, поэтому конвертация сериализуется
+_markdown_lock = threading.Lock()
+
+@lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def _cached_to_html(markdown_text):
     processor = get_markdown_processor()
-    return processor.to_html(markdown_text)
+    with _markdown_lock:
+        return processor.to_html(markdown_text)
+
+get_metrics_registry().register_cache('markdown', _cached_to_html.cache_info)
+
+@timed_phase('markdown')
+def markdown_to_html(markdown_text):
+    """Конвертирует Markdown в HTML (результат кэшируется по тексту)"""
+    if not markdown_text:
+        return ""
+    return _cached_to_html(markdown_text)
 
 def markdown_preview(markdown_text, max_length=500):
     """Получает предпросмотр Markdown"""
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Реестр метрик в текстовом формате Prometheus
+
+Счетчики, значения и гистограммы с метками без внешних зависимостей.
+Подсистемы объявляют свои метрики при импорте:
+
+    BACKUP_SECONDS = get_metrics_registry().histogram(
+        'todolite_backup_duration_seconds', 'Длительность бэкапа', ('destination',))
+    BACKUP_SECONDS.labels(destination=path).observe(seconds)
+
+Значения, которые удобнее вычислить в момент опроса (попадания в кэши,
+их размер), отдаются через коллекторы и register_cache. Вывод - /metrics.
+"""
+
+import math
+import threading
+from logger import logger
+
+# Границы корзин по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if math.isnan(value):
+            return 'NaN'
+        return repr(value)
+    return str(value)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+class _Metric:
+    """Базовый класс метрики с метками: значение хранится отдельно для каждого набора меток."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Возвращает метрику для конкретных значений меток."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name}: для метрики с метками используйте labels()")
+        return self._children[()]
+
+    def samples(self):
+        """Список (суффикс имени, метки, значение) для вывода."""
+        result = []
+        for key, child in sorted(self._children.items()):
+            labels = list(zip(self.labelnames, key))
+            result.extend(child.samples(labels))
+        return result
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Счетчик не может уменьшаться")
+        with self._lock:
+            self.value += amount
+
+    def samples(self, labels):
+        return [('_total', labels, self.value)]
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик (имя выводится с суффиксом _total)."""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        if name.endswith('_total'):
+            name = name[:-len('_total')]
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = float(value)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def samples(self, labels):
+        return [('', labels, self.value)]
+
+
+class Gauge(_Metric):
+    """Текущее значение, может расти и уменьшаться."""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.sum += value
+
+    def samples(self, labels):
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            result.append(('_bucket', labels + [('le', _format_value(float(bound)))], cumulative))
+        result.append(('_bucket', labels + [('le', '+Inf')], self.count))
+        result.append(('_count', labels, self.count))
+        result.append(('_sum', labels, self.sum))
+        return result
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам (накопительно, как в Prometheus)."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    """Реестр метрик и коллекторов."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом или метками")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector):
+        """
+        Регистрирует функцию, вызываемую при каждом опросе.
+
+        Коллектор возвращает список (имя, тип, описание, [(метки-словарь, значение), ...]).
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def register_cache(self, name, cache_info):
+        """
+        Регистрирует кэш для метрик попаданий.
+
+        Args:
+            name: Значение метки cache ('tags', 'config', 'markdown')
+            cache_info: Функция, возвращающая объект с hits, misses, currsize
+                        (например, cache_info функции с functools.lru_cache)
+        """
+        with self._lock:
+            self._caches[name] = cache_info
+
+    def _collect_caches(self):
+        hits, misses, entries, ratios = [], [], [], []
+        for name, cache_info in sorted(self._caches.items()):
+            info = cache_info()
+            labels = {'cache': name}
+            total = info.hits + info.misses
+            hits.append((labels, info.hits))
+            misses.append((labels, info.misses))
+            entries.append((labels, info.currsize))
+            ratios.append((labels, round(info.hits / total, 4) if total else 0.0))
+        if not hits:
+            return []
+        return [
+            ('todolite_cache_hits_total', 'counter', 'Попадания в кэш', hits),
+            ('todolite_cache_misses_total', 'counter', 'Промахи кэша', misses),
+            ('todolite_cache_entries', 'gauge', 'Записей в кэше', entries),
+            ('todolite_cache_hit_ratio', 'gauge', 'Доля попаданий в кэш', ratios),
+        ]
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            family = metric.name + '_total' if metric.type_name == 'counter' else metric.name
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.type_name}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in [self._collect_caches] + list(self._collectors):
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"Ошибка коллектора метрик {getattr(collector, '__name__', collector)}: {e}", "METRICS")
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def init_app(app, registry=None):
+    """Счетчик и гистограмма длительности HTTP-запросов по маршрутам."""
+    import time
+    from flask import g, request
+
+    registry = registry or get_metrics_registry()
+    requests_total = registry.counter(
+        'todolite_http_requests_total', 'HTTP-запросы', ('route', 'method', 'status'))
+    request_seconds = registry.histogram(
+        'todolite_http_request_duration_seconds', 'Длительность HTTP-запросов', ('route',))
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            route = request.endpoint or 'unknown'
+            request_seconds.labels(route=route).observe(time.perf_counter() - started)
+            requests_total.labels(route=route, method=request.method, status=response.status_code).inc()
+        return response
+
+
+# Глобальный экземпляр
+_metrics_registry = None
+_registry_lock = threading.Lock()
+
+def get_metrics_registry():
+    """Получает глобальный экземпляр MetricsRegistry"""
+    global _metrics_registry
+    if _metrics_registry is None:
+        with _registry_lock:
+            if _metrics_registry is None:
+                _metrics_registry = MetricsRegistry()
+    return _metrics_registry
@@ -6,11 +6,40 @@
 """
 
 import sqlite3
-import threading
 import time
 from datetime import datetime, timedelta
 from logger import logger
 from notifications_windows import notify
+from date_utils import parse_datetime, DATE_FORMAT, DATETIME_FORMAT
+from index_advisor import register_hot_query
+from metrics import get_metrics_registry
+from job_scheduler import get_job_scheduler, IntervalTrigger, IDLE
+
+# Кандидаты на напоминание: каждая ветка OR отбирается своим индексом (MULTI-INDEX OR)
+REMINDER_CANDIDATES_SQL = """
+    SELECT id, title, short_description, due_date, scheduled_date, reminder_time, status, priority
+    FROM tasks 
+    WHERE (reminder_time BETWEEN ? AND ?
+           OR (reminder_time IS NULL AND due_date BETWEEN ? AND ?)
+           OR (reminder_time IS NULL AND due_date IS NULL AND scheduled_date BETWEEN ? AND ?))
+    AND status NOT IN ('done', 'cancelled')
+    AND archived = 0
+"""
+
+register_hot_query(
+    'reminder_candidates', REMINDER_CANDIDATES_SQL,
+    ('2025-01-01T09:54', '2025-01-01T10:01', '2025-01-01', '2025-01-02', '2025-01-01', '2025-01-02'),
+    source='reminder_manager'
+)
+
+REMINDER_LAG_SECONDS = get_metrics_registry().gauge(
+    'todolite_reminder_scheduler_lag_seconds', 'Опоздание последней проверки напоминаний относительно расписания')
+REMINDER_CHECK_SECONDS = get_metrics_registry().histogram(
+    'todolite_reminder_check_duration_seconds', 'Длительность проверки напоминаний')
+REMINDERS_SENT = get_metrics_registry().counter(
+    'todolite_reminders_sent_total', 'Отправлено напоминаний')
+
+REMINDER_JOB = 'reminders'
 
 class ReminderManager:
     """
@@ -20,7 +49,7 @@ class ReminderManager:
     def __init__(self, db_path='tasks.db'):
         self.db_path = db_path
         self.running = False
-        self.thread = None
+        self._next_check = None
         self.check_interval = 60  # Проверка каждую минуту
         self.reminder_times = [15, 30, 60, 1440]  # За 15 мин, 30 мин, 1 час, 1 день до дедлайна
         
@@ -31,23 +60,26 @@ class ReminderManager:
         Получает задачи, для которых нужно отправить напоминания.
         Возвращает список задач с информацией о времени до дедлайна.
         """
+        now = datetime.now()
+        
+        # Даты хранятся в каноническом виде, поэтому кандидатов отбираем
+        # диапазонами по индексам: напоминания за последние минуты и
+        # дедлайны/даты взятия в работу в пределах максимального интервала
+        reminder_from = (now - timedelta(minutes=6)).strftime(DATETIME_FORMAT)
+        reminder_to = (now + timedelta(minutes=1)).strftime(DATETIME_FORMAT)
+        date_from = now.strftime(DATE_FORMAT)
+        date_to = (now + timedelta(minutes=max(self.reminder_times))).strftime(DATE_FORMAT)
+        
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
         
-        # Получаем задачи с установленными датами или напоминаниями, которые не выполнены и не архивированы
-        c.execute("""
-            SELECT id, title, short_description, due_date, scheduled_date, reminder_time, status, priority
-            FROM tasks 
-            WHERE (due_date IS NOT NULL OR scheduled_date IS NOT NULL OR reminder_time IS NOT NULL)
-            AND status NOT IN ('done', 'cancelled')
-            AND (archived IS NULL OR archived = 0)
-        """)
+        # Получаем задачи с подходящими датами или напоминаниями, которые не выполнены и не архивированы
+        c.execute(REMINDER_CANDIDATES_SQL, (reminder_from, reminder_to, date_from, date_to, date_from, date_to))
         
         tasks = c.fetchall()
         conn.close()
         
         reminder_tasks = []
-        now = datetime.now()
         
         for task in tasks:
             task_id, title, short_desc, due_date, scheduled_date, reminder_time, status, priority = task
@@ -57,42 +89,25 @@ class ReminderManager:
             target_date = None
             reminder_type = None
             
-            if reminder_time:
-                # Используем точное время напоминания
-                try:
-                    # Пробуем разные форматы времени
-                    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
-                        try:
-                            target_datetime = datetime.strptime(reminder_time, fmt)
-                            target_date = reminder_time
-                            reminder_type = 'reminder'
-                            break
-                        except ValueError:
-                            continue
-                    else:
-                        logger.warning(f"Неверный формат времени напоминания для задачи {task_id}: {reminder_time}", "REMINDER")
-                        continue
-                except Exception as e:
-                    logger.warning(f"Ошибка парсинга времени напоминания для задачи {task_id}: {e}", "REMINDER")
-                    continue
-            elif due_date:
-                # Используем дату дедлайна
-                try:
-                    target_datetime = datetime.strptime(due_date, '%Y-%m-%d')
+            try:
+                if reminder_time:
+                    # Используем точное время напоминания
+                    target_datetime = parse_datetime(reminder_time)
+                    target_date = reminder_time
+                    reminder_type = 'reminder'
+                elif due_date:
+                    # Используем дату дедлайна
+                    target_datetime = parse_datetime(due_date)
                     target_date = due_date
                     reminder_type = 'due'
-                except ValueError:
-                    logger.warning(f"Неверный формат даты дедлайна для задачи {task_id}: {due_date}", "REMINDER")
-                    continue
-            elif scheduled_date:
-                # Используем дату взятия в работу
-                try:
-                    target_datetime = datetime.strptime(scheduled_date, '%Y-%m-%d')
+                elif scheduled_date:
+                    # Используем дату взятия в работу
+                    target_datetime = parse_datetime(scheduled_date)
                     target_date = scheduled_date
                     reminder_type = 'scheduled'
-                except ValueError:
-                    logger.warning(f"Неверный формат даты взятия в работу для задачи {task_id}: {scheduled_date}", "REMINDER")
-                    continue
+            except ValueError as e:
+                logger.warning(f"Неверный формат даты для задачи {task_id}: {e}", "REMINDER")
+                continue
             
             if target_datetime:
                 # Вычисляем разность во времени
@@ -233,7 +248,11 @@ class ReminderManager:
     def check_reminders(self):
         """
         Проверяет и отправляет напоминания для всех подходящих задач.
+        
+        Returns:
+            Количество найденных задач для напоминания
         """
+        started = time.perf_counter()
         try:
             reminder_tasks = self.get_tasks_with_reminders()
             
@@ -242,38 +261,40 @@ class ReminderManager:
                 
                 for task_info in reminder_tasks:
                     self.send_reminder(task_info)
+                REMINDERS_SENT.inc(len(reminder_tasks))
             else:
                 logger.debug("Задач для напоминания не найдено", "REMINDER")
+            return len(reminder_tasks)
                 
         except Exception as e:
             logger.error(f"Ошибка при проверке напоминаний: {e}", "REMINDER")
+            return 0
+        finally:
+            REMINDER_CHECK_SECONDS.observe(time.perf_counter() - started)
     
-    def _run_scheduler(self):
+    def _scheduled_check(self):
         """
-        Основной цикл планировщика напоминаний.
+        Проверка напоминаний по расписанию (задача reminders планировщика задач).
         """
-        while self.running:
-            try:
-                self.check_reminders()
-                
-                # Ждем до следующей проверки
-                for _ in range(self.check_interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
-                    
-            except Exception as e:
-                logger.error(f"Ошибка в планировщике напоминаний: {e}", "REMINDER")
-                time.sleep(60)  # Ждем минуту при ошибке
+        # Опоздание относительно расписания: длительная проверка или занятый процесс
+        now = time.monotonic()
+        if self._next_check is not None:
+            REMINDER_LAG_SECONDS.set(max(0.0, now - self._next_check))
+        self._next_check = now + self.check_interval
+        if not self.check_reminders():
+            return IDLE
     
     def start(self):
         """
-        Запускает планировщик напоминаний в отдельном потоке.
+        Запускает планировщик напоминаний (задача reminders планировщика задач).
         """
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
-            self.thread.start()
+            self._next_check = None
+            get_job_scheduler().add_job(
+                REMINDER_JOB, self._scheduled_check, IntervalTrigger(self.check_interval),
+                max_runtime_seconds=self.check_interval * 5, run_immediately=True
+            )
             logger.info("Планировщик напоминаний запущен", "REMINDER")
         else:
             logger.warning("Планировщик напоминаний уже запущен", "REMINDER")
@@ -284,10 +305,7 @@ class ReminderManager:
         """
         if self.running:
             self.running = False
-            if self.thread and self.thread.is_alive():
-                self.thread.join(timeout=5)
-                if self.thread.is_alive():
-                    logger.warning("Поток планировщика напоминаний не завершился корректно", "REMINDER")
+            get_job_scheduler().remove_job(REMINDER_JOB, timeout=5)
             logger.info("Планировщик напоминаний остановлен", "REMINDER")
         else:
             logger.warning("Планировщик напоминаний не запущен", "REMINDER")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Журнал медленных SQL-запросов
+
+Запросы DatabaseManager, выполнявшиеся дольше database.slow_query_ms,
+попадают в кольцевой буфер вместе с нормализованным текстом (отпечатком),
+формой параметров, временем выполнения, ожиданием блокировки и планом
+EXPLAIN QUERY PLAN. По отпечаткам ведется сводка для
+/api/admin/slow_queries (топ самых медленных запросов).
+"""
+
+import re
+import time
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from logger import logger
+from index_advisor import explain, find_full_scans
+from metrics import get_metrics_registry
+
+DEFAULT_SLOW_QUERY_MS = 100
+DEFAULT_LOG_SIZE = 200
+
+# Сколько разных отпечатков хранить в сводке (редкие вытесняются)
+MAX_FINGERPRINTS = 500
+
+# План одного и того же отпечатка перечитывается не чаще, чем раз в N секунд
+PLAN_CACHE_SECONDS = 300
+
+SLOW_QUERIES = get_metrics_registry().counter(
+    'todolite_db_slow_queries_total', 'Запросы дольше порога database.slow_query_ms')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Нормализованный текст запроса: литералы заменены на ?, списки IN (?, ?, ...)
+    свернуты в IN (...), пробелы схлопнуты. Запросы, отличающиеся только
+    значениями, получают один отпечаток.
+    """
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('IN (...)', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def params_shape(params):
+    """Форма параметров без значений: типы и длины строк (значения могут быть личными данными)."""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: _value_shape(value) for key, value in params.items()}
+    return [_value_shape(value) for value in params]
+
+
+def _value_shape(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+class SlowQueryLog:
+    """Кольцевой буфер медленных запросов и сводка по отпечаткам."""
+
+    def __init__(self, threshold_ms=DEFAULT_SLOW_QUERY_MS, size=DEFAULT_LOG_SIZE):
+        self.threshold_ms = float(threshold_ms)
+        self.entries = deque(maxlen=int(size))
+        self._stats = {}
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold_ms > 0
+
+    def record(self, db_path, sql, params, seconds, lock_wait_seconds=0.0):
+        """
+        Учитывает выполненный запрос; медленный записывается в журнал.
+
+        Args:
+            db_path: БД, на которой выполнялся запрос (для EXPLAIN)
+            sql, params: Запрос и его параметры
+            seconds: Время выполнения без ожидания блокировки
+            lock_wait_seconds: Ожидание блокировки DatabaseManager
+        """
+        duration_ms = seconds * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return None
+
+        key = fingerprint(sql)
+        plan = self._plan(db_path, key, sql, params)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'fingerprint': key,
+            'params_shape': params_shape(params),
+            'duration_ms': round(duration_ms, 3),
+            'lock_wait_ms': round(lock_wait_seconds * 1000, 3),
+            'plan': plan,
+            'full_scans': find_full_scans(plan),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    # Вытесняем самый редкий отпечаток
+                    rarest = min(self._stats, key=lambda k: (self._stats[k]['count'], self._stats[k]['last_seen']))
+                    del self._stats[rarest]
+                    self._plans.pop(rarest, None)
+                stats = self._stats[key] = {
+                    'fingerprint': key, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'lock_wait_ms': 0.0, 'last_seen': None, 'plan': plan,
+                    'full_scans': entry['full_scans'], 'params_shape': entry['params_shape'],
+                }
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['lock_wait_ms'] += entry['lock_wait_ms']
+            stats['last_seen'] = entry['time']
+            stats['plan'] = plan
+            stats['full_scans'] = entry['full_scans']
+
+        SLOW_QUERIES.inc()
+        scan_note = f", полное сканирование: {'; '.join(entry['full_scans'])}" if entry['full_scans'] else ''
+        logger.warning(
+            f"Медленный запрос {entry['duration_ms']:.1f} мс (ожидание блокировки {entry['lock_wait_ms']:.1f} мс)"
+            f"{scan_note}: {key[:200]}", "SLOW_QUERY"
+        )
+        return entry
+
+    def _plan(self, db_path, key, sql, params):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._plans.get(key)
+        if cached and now - cached[0] < PLAN_CACHE_SECONDS:
+            return cached[1]
+        # EXPLAIN выполняется без блокировки: параллельный запрос того же
+        # отпечатка в худшем случае перечитает план еще раз
+        try:
+            conn = sqlite3.connect(db_path)
+            try:
+                plan = explain(conn, sql, params or ())
+            finally:
+                conn.close()
+        except Exception as e:
+            plan = [f"EXPLAIN недоступен: {e}"]
+        with self._lock:
+            self._plans[key] = (now, plan)
+            if len(self._plans) > MAX_FINGERPRINTS:
+                # Планы хранятся только для отпечатков из сводки
+                for stale in [k for k in self._plans if k != key and k not in self._stats]:
+                    del self._plans[stale]
+        return plan
+
+    def top(self, limit=10, order='max_ms'):
+        """Самые медленные отпечатки (order: max_ms, total_ms, avg_ms, count)."""
+        with self._lock:
+            items = [dict(stats) for stats in self._stats.values()]
+        for item in items:
+            item['avg_ms'] = item['total_ms'] / item['count'] if item['count'] else 0.0
+            for field in ('total_ms', 'max_ms', 'avg_ms', 'lock_wait_ms'):
+                item[field] = round(item[field], 3)
+        if order not in ('max_ms', 'total_ms', 'avg_ms', 'count'):
+            order = 'max_ms'
+        items.sort(key=lambda item: item[order], reverse=True)
+        return items[:limit]
+
+    def recent(self, limit=50):
+        """Последние медленные запросы (новые первыми)."""
+        with self._lock:
+            return list(self.entries)[-limit:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+            self._stats.clear()
+            self._plans.clear()
+
+
+# Глобальный экземпляр
+_slow_query_log = None
+
+def get_slow_query_log():
+    """Получает глобальный экземпляр SlowQueryLog (порог из database.slow_query_ms)"""
+    global _slow_query_log
+    if _slow_query_log is None:
+        threshold_ms, size = DEFAULT_SLOW_QUERY_MS, DEFAULT_LOG_SIZE
+        try:
+            from config_manager import get_config_manager
+            database_config = get_config_manager().get_database_config()
+            threshold_ms = database_config['slow_query_ms']
+            size = database_config['slow_query_log_size']
+        except Exception as e:
+            logger.warning(f"Настройки журнала медленных запросов не загружены: {e}", "SLOW_QUERY")
+        _slow_query_log = SlowQueryLog(threshold_ms, size)
+    return _slow_query_log
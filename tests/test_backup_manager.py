@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты резервного копирования: направления backup.destinations и каталог копий
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from backup_manager import BackupManager
+
+
+class BackupManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.db_path = os.path.join(self.workdir, 'tasks.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT)")
+        conn.execute("INSERT INTO tasks (title) VALUES ('задача')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def make_manager(self, backup_settings):
+        config_path = os.path.join(self.workdir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({'backup': dict({'enabled': True}, **backup_settings)}, f)
+        return BackupManager(config_path, self.db_path)
+
+    def test_destinations_without_legacy_paths(self):
+        first = os.path.join(self.workdir, 'first')
+        second = os.path.join(self.workdir, 'second')
+        manager = self.make_manager({'destinations': [first, second]})
+
+        created = manager.create_backup()
+        self.assertIsNotNone(created)
+        self.assertEqual(os.path.dirname(created), first)
+        self.assertEqual(len(manager.create_backup_all()), 2)
+
+        # Имя копии - с точностью до секунды, поэтому в first может оказаться одна копия
+        backups = manager.get_backup_list()
+        self.assertEqual({os.path.dirname(b['path']) for b in backups}, {first, second})
+        on_disk = [name for directory in (first, second) for name in os.listdir(directory)
+                   if name.startswith('todolite_backup_')]
+        self.assertEqual(len(backups), len(on_disk))
+
+    def test_legacy_paths_still_work(self):
+        primary = os.path.join(self.workdir, 'primary')
+        manager = self.make_manager({'primary_paths': [primary]})
+        self.assertIsNotNone(manager.create_backup())
+        self.assertEqual(len(manager.get_backup_list()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты дня следующей смены категории (next_migration_at) и реестра запусков миграции
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import category_migration_manager
+from category_migration_manager import CategoryMigrationManager
+
+
+def frozen_datetime(today):
+    """Подмена datetime модуля миграции: datetime.now() возвращает полдень дня today"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.combine(today, datetime.min.time()).replace(hour=12)
+    return mock.patch.object(category_migration_manager, 'datetime', FrozenDatetime)
+
+
+class NextMigrationDateTest(unittest.TestCase):
+    def setUp(self):
+        # Без БД и конфигурации: нужны только правила по датам
+        self.manager = CategoryMigrationManager.__new__(CategoryMigrationManager)
+
+    def next_date(self, today, due_date=None, scheduled_date=None):
+        with frozen_datetime(today):
+            return self.manager.get_next_migration_date(due_date, scheduled_date)
+
+    def category(self, today, due_date):
+        with frozen_datetime(today):
+            return self.manager.get_category_by_date(due_date, None)
+
+    def test_no_date(self):
+        self.assertIsNone(self.next_date(date(2025, 1, 1)))
+
+    def test_far_task_moves_on_monday_before_its_week(self):
+        # Дата - четверг 2025-01-23. В понедельник 2025-01-13 вторник следующей недели -
+        # 2025-01-21 (еще "Далекие"), в понедельник 2025-01-20 - 2025-01-28 ("На неделе")
+        self.assertEqual(self.next_date(date(2025, 1, 1), '2025-01-23'), date(2025, 1, 20))
+        self.assertEqual(self.category(date(2025, 1, 19), '2025-01-23'), 'think')
+        self.assertEqual(self.category(date(2025, 1, 20), '2025-01-23'), 'waiting')
+
+    def test_tuesday_of_next_week_is_already_in_window(self):
+        # Вторник 2025-01-14 попадает в окно "На неделе" с понедельника 2025-01-06
+        self.assertEqual(self.next_date(date(2025, 1, 1), '2025-01-14'), date(2025, 1, 6))
+
+    def test_tomorrow_today_and_overdue(self):
+        due = '2025-01-10'
+        self.assertEqual(self.next_date(date(2025, 1, 8), due), date(2025, 1, 9))
+        self.assertEqual(self.next_date(date(2025, 1, 9), due), date(2025, 1, 10))
+        # В сам день - следующий переход на следующий день (задача становится просроченной)
+        self.assertEqual(self.next_date(date(2025, 1, 10), due), date(2025, 1, 11))
+
+    def test_overdue_task_has_no_more_transitions(self):
+        self.assertIsNone(self.next_date(date(2025, 1, 11), '2025-01-10'))
+        self.assertIsNone(self.next_date(date(2025, 3, 1), '2025-01-10'))
+
+    def test_due_date_wins_over_scheduled_date(self):
+        self.assertEqual(self.next_date(date(2025, 1, 8), '2025-01-10', '2025-02-20'), date(2025, 1, 9))
+        self.assertEqual(self.next_date(date(2025, 1, 8), None, '2025-01-10'), date(2025, 1, 9))
+
+    def test_matches_category_rules(self):
+        # Ни одна смена категории не происходит раньше next_migration_at,
+        # и next_migration_at не наступает раньше реальной смены
+        start = date(2025, 1, 1)
+        for target_offset in range(40):
+            due = (start + timedelta(days=target_offset)).isoformat()
+            for today_offset in range(30):
+                today = start + timedelta(days=today_offset)
+                expected = self.next_date(today, due)
+                current = self.category(today, due)
+                actual = None
+                for step in range(1, 45):
+                    day = today + timedelta(days=step)
+                    if self.category(day, due) != current:
+                        actual = day
+                        break
+                with self.subTest(due=due, today=today):
+                    if actual is not None:
+                        self.assertEqual(expected, actual)
+                    elif expected is not None:
+                        # Единственный переход без смены колонки: задача становится просроченной
+                        self.assertEqual(expected, date.fromisoformat(due) + timedelta(days=1))
+
+
+class StubConfigManager:
+    def get_config(self):
+        return {'auto_migration': {'enabled': True, 'interval_minutes': 30}}
+
+
+class MigrationJobRegistryTest(unittest.TestCase):
+    """Два менеджера на одной БД - как два процесса (воркеры gunicorn)"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        db_path = os.path.join(self.workdir, 'tasks.db')
+        self.first = CategoryMigrationManager(db_path, StubConfigManager())
+        self.second = CategoryMigrationManager(db_path, StubConfigManager())
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_running_job_is_shared(self):
+        job, created = self.first._begin_job('manual')
+        self.assertTrue(created)
+
+        other, created = self.second._begin_job('scheduler')
+        self.assertFalse(created)
+        self.assertEqual(other.id, job.id)
+        self.assertEqual(self.second.get_job(job.id).state, 'running')
+        self.assertEqual(self.second.get_job().id, job.id)
+
+    def test_progress_and_finish_are_visible_to_other_process(self):
+        job, _ = self.first._begin_job('manual')
+        job.update(100, 3, total=250)
+        seen = self.second.get_job(job.id)
+        self.assertEqual((seen.checked, seen.moved, seen.total), (100, 3, 250))
+
+        job.finish()
+        finished = self.second.wait_for_job(seen, seen.version, 1)
+        self.assertEqual(finished.state, 'completed')
+        self.assertEqual(finished.to_dict()['result'], {'checked': 100, 'moved': 3})
+
+        self.first._active_job = None
+        _, created = self.second._begin_job('manual')
+        self.assertTrue(created)
+
+    def test_wait_times_out_without_changes(self):
+        job, _ = self.first._begin_job('manual')
+        started = time.monotonic()
+        seen = self.second.wait_for_job(self.second.get_job(job.id), job.version, 0.3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(seen.version, job.version)
+
+    def test_abandoned_job_is_failed(self):
+        job, _ = self.first._begin_job('manual')
+        conn = sqlite3.connect(self.first.db_path)
+        conn.execute("UPDATE migration_jobs SET heartbeat_at = 0")
+        conn.commit()
+        conn.close()
+
+        new_job, created = self.second._begin_job('manual')
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.id, job.id)
+        self.assertEqual(self.second.get_job(job.id).state, 'failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
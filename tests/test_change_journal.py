@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты журнала изменений: триггеры, отгрузка сегментов и воспроизведение
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import backup_scheduler
+from backup_manager import BackupManager
+from job_scheduler import JobScheduler
+from change_journal import datetime_to_ms
+from datetime import datetime
+
+
+class ChangeJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.db_path = os.path.join(self.workdir, 'tasks.db')
+        self.backup_dir = os.path.join(self.workdir, 'backups')
+        config_path = os.path.join(self.workdir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({'backup': {'enabled': True, 'destinations': [self.backup_dir],
+                                  'journal': {'enabled': True, 'ship_interval_seconds': 5}}}, f)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE tasks
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, status TEXT,
+                         updated_at TIMESTAMP, next_migration_at TEXT)''')
+        conn.execute('''CREATE TABLE task_comments
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER NOT NULL, comment TEXT NOT NULL)''')
+        conn.execute("INSERT INTO tasks (title, status) VALUES ('до снимка', 'new')")
+        conn.commit()
+        conn.close()
+
+        self.journal = BackupManager(config_path, self.db_path).journal
+        self.journal.install()
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def execute(self, *statements):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for sql in statements:
+                conn.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def snapshot(self):
+        path = os.path.join(self.workdir, f'snapshot_{len(os.listdir(self.workdir))}.db')
+        shutil.copy2(self.db_path, path)
+        return path
+
+    def journal_size(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM change_journal").fetchone()[0]
+        finally:
+            conn.close()
+
+    def dump(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            return {
+                'tasks': conn.execute("SELECT id, title, status FROM tasks ORDER BY id").fetchall(),
+                'task_comments': conn.execute("SELECT id, task_id, comment FROM task_comments ORDER BY id").fetchall(),
+            }
+        finally:
+            conn.close()
+
+    def test_replay_round_trip(self):
+        snapshot_path = self.snapshot()
+        self.execute(
+            "INSERT INTO tasks (title, status) VALUES ('новая', 'new')",
+            "INSERT INTO task_comments (task_id, comment) VALUES (2, 'комментарий')",
+            "UPDATE tasks SET status = 'working' WHERE id = 1",
+            "INSERT INTO tasks (title, status) VALUES ('удаленная', 'new')",
+            "DELETE FROM tasks WHERE id = 3",
+        )
+        self.assertEqual(self.journal.ship(), 5)
+        self.assertEqual(self.journal_size(), 0)
+
+        applied = self.journal.replay(snapshot_path, since_ms=0, until_ms=datetime_to_ms(datetime.now()) + 1000)
+        self.assertEqual(applied, 5)
+        self.assertEqual(self.dump(snapshot_path), self.dump(self.db_path))
+
+    def test_replay_stops_at_target_time(self):
+        snapshot_path = self.snapshot()
+        self.execute("UPDATE tasks SET title = 'первая правка' WHERE id = 1")
+        time.sleep(0.05)
+        target = datetime_to_ms(datetime.now())
+        time.sleep(0.05)
+        self.execute("UPDATE tasks SET title = 'вторая правка' WHERE id = 1")
+        self.journal.ship()
+
+        self.journal.replay(snapshot_path, since_ms=0, until_ms=target)
+        self.assertEqual(self.dump(snapshot_path)['tasks'], [(1, 'первая правка', 'new')])
+
+    def test_bookkeeping_updates_are_not_journaled(self):
+        self.execute(
+            "UPDATE tasks SET title = title, status = status",
+            "UPDATE tasks SET updated_at = CURRENT_TIMESTAMP",
+            "UPDATE tasks SET next_migration_at = '2025-01-01'",
+        )
+        self.assertEqual(self.journal_size(), 0)
+        self.execute("UPDATE tasks SET status = 'done'")
+        self.assertEqual(self.journal_size(), 1)
+
+    def test_reinstall_picks_up_new_columns(self):
+        self.execute("ALTER TABLE tasks ADD COLUMN tags TEXT")
+        self.journal.install()
+        self.execute("UPDATE tasks SET tags = 'дом'")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            data = json.loads(conn.execute("SELECT data FROM change_journal").fetchone()[0])
+        finally:
+            conn.close()
+        self.assertEqual(data['tags'], 'дом')
+        self.assertNotIn('next_migration_at', data)
+
+    def test_sync_removes_triggers_when_disabled(self):
+        self.journal.backup_manager.backup_settings['journal']['enabled'] = False
+        self.journal.sync()
+        self.execute("UPDATE tasks SET status = 'done'")
+        self.assertEqual(self.journal_size(), 0)
+        self.assertIsNone(self.journal.ship_interval_seconds)
+
+    def test_pending_age(self):
+        self.assertIsNone(self.journal.pending_age_seconds())
+        self.execute("UPDATE tasks SET status = 'done'")
+        self.assertLess(self.journal.pending_age_seconds(), 60)
+        self.journal.ship()
+        self.assertIsNone(self.journal.pending_age_seconds())
+
+    def test_shipping_job_follows_settings(self):
+        scheduler = JobScheduler(os.path.join(self.workdir, 'jobs.db'))
+        self.addCleanup(scheduler.stop, 1)
+        with mock.patch.object(backup_scheduler, 'get_job_scheduler', return_value=scheduler):
+            backup_scheduler.start_journal_shipping(self.journal.backup_manager)
+            self.assertIsNotNone(scheduler.get_job(backup_scheduler.JOURNAL_JOB))
+
+            self.journal.backup_manager.backup_settings['journal']['enabled'] = False
+            backup_scheduler.start_journal_shipping(self.journal.backup_manager)
+            self.assertIsNone(scheduler.get_job(backup_scheduler.JOURNAL_JOB))
+            self.execute("UPDATE tasks SET status = 'done'")
+            self.assertEqual(self.journal_size(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
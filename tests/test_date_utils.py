@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты разбора и нормализации дат (date_utils)
+"""
+
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from date_utils import parse_date, parse_datetime, normalize_date, normalize_datetime, normalize_task_dates
+
+
+class ParseDateTest(unittest.TestCase):
+    def test_empty_values(self):
+        for value in (None, '', '   '):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_date(value))
+                self.assertIsNone(parse_datetime(value))
+
+    def test_date_objects(self):
+        self.assertEqual(parse_date(date(2025, 1, 2)), date(2025, 1, 2))
+        # datetime - подкласс date: время отбрасывается
+        self.assertEqual(parse_date(datetime(2025, 1, 2, 23, 59)), date(2025, 1, 2))
+
+    def test_iso_formats(self):
+        for value in ('2025-01-02', ' 2025-01-02 ', '2025-01-02T10:30', '2025-01-02 10:30:15'):
+            with self.subTest(value=value):
+                self.assertEqual(parse_date(value), date(2025, 1, 2))
+
+    def test_legacy_formats(self):
+        for value in ('02.01.2025', '2025/01/02', '02/01/2025', '02.01.2025 10:30'):
+            with self.subTest(value=value):
+                self.assertEqual(parse_date(value), date(2025, 1, 2))
+
+    def test_leap_day(self):
+        self.assertEqual(parse_date('2024-02-29'), date(2024, 2, 29))
+        with self.assertRaises(ValueError):
+            parse_date('2023-02-29')
+
+    def test_invalid_values(self):
+        for value in ('2025-02-30', '2025-13-01', '2025-00-10', 'завтра', '2025-1-2', '2025-01-0212', '2025-01-02xyz',
+                      '2025-01-02 garbage', '2025-01-02Tfoo'):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_date(value)
+
+
+class ParseDatetimeTest(unittest.TestCase):
+    def test_date_only_is_midnight(self):
+        self.assertEqual(parse_datetime('2025-01-02'), datetime(2025, 1, 2))
+        self.assertEqual(parse_datetime(date(2025, 1, 2)), datetime(2025, 1, 2))
+
+    def test_iso_formats(self):
+        self.assertEqual(parse_datetime('2025-01-02T10:30'), datetime(2025, 1, 2, 10, 30))
+        self.assertEqual(parse_datetime('2025-01-02 10:30:15'), datetime(2025, 1, 2, 10, 30, 15))
+
+    def test_offset_is_converted_to_local_time(self):
+        # Время с часовым поясом переводится в локальное и хранится без зоны
+        for value, offset in (('2025-01-02T10:30:00Z', timezone.utc),
+                              ('2025-01-02T10:30+03:00', timezone(timedelta(hours=3)))):
+            with self.subTest(value=value):
+                expected = datetime(2025, 1, 2, 10, 30, tzinfo=offset).astimezone().replace(tzinfo=None)
+                self.assertEqual(parse_datetime(value), expected)
+                self.assertEqual(parse_date(value), expected.date())
+
+    def test_legacy_formats(self):
+        self.assertEqual(parse_datetime('02.01.2025 10:30'), datetime(2025, 1, 2, 10, 30))
+        self.assertEqual(parse_datetime('02.01.2025'), datetime(2025, 1, 2))
+
+    def test_invalid_values(self):
+        for value in ('2025-01-02T25:00', '2025-01-02T10:61', '2025-01-02T10:30:1x', '2025-01-02xyz', 'вечером'):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_datetime(value)
+
+
+class NormalizeTest(unittest.TestCase):
+    def test_canonical_form(self):
+        self.assertEqual(normalize_date('02.01.2025'), '2025-01-02')
+        self.assertEqual(normalize_datetime('02.01.2025 09:05'), '2025-01-02T09:05')
+        self.assertIsNone(normalize_date(''))
+
+    def test_normalize_task_dates(self):
+        task = {'title': 'x', 'due_date': '02.01.2025', 'scheduled_date': '', 'reminder_time': '2025-01-02 09:05:00'}
+        normalize_task_dates(task)
+        self.assertEqual(task, {'title': 'x', 'due_date': '2025-01-02', 'scheduled_date': None,
+                                'reminder_time': '2025-01-02T09:05'})
+
+    def test_normalize_task_dates_rejects_invalid(self):
+        with self.assertRaises(ValueError):
+            normalize_task_dates({'due_date': '31.02.2025'})
+
+
+if __name__ == '__main__':
+    unittest.main()
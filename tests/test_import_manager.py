@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты импорта: идемпотентность, возобновление и разрешение конфликтов
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from import_manager import ImportManager
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ImportManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.db_path = os.path.join(self.workdir, 'tasks.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''CREATE TABLE tasks
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+                         short_description TEXT, full_description TEXT, status TEXT DEFAULT 'new',
+                         priority TEXT DEFAULT 'medium', eisenhower_priority TEXT, assigned_to TEXT,
+                         scheduled_date TEXT, due_date TEXT, reminder_time TEXT, related_threads TEXT,
+                         tags TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)''')
+        conn.execute('''CREATE TABLE task_comments
+                        (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER NOT NULL,
+                         comment TEXT NOT NULL, created_at TIMESTAMP)''')
+        conn.commit()
+        conn.close()
+        self.manager = ImportManager(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def write_file(self, name, tasks):
+        path = os.path.join(self.workdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'tasks': tasks}, f, ensure_ascii=False)
+        return path
+
+    def rows(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_reimport_is_skipped(self):
+        path = self.write_file('tasks.json', [
+            {'title': 'Первая', 'comments': ['один', 'два']},
+            {'title': 'Вторая', 'status': 'working'},
+        ])
+        first = self.manager.import_tasks(path)
+        self.assertTrue(first['success'])
+        self.assertEqual(first['imported'], 2)
+
+        second = self.manager.import_tasks(path)
+        self.assertEqual(second['imported'], 0)
+        self.assertEqual(second['skipped'], 2)
+        self.assertEqual(len(self.rows("SELECT id FROM tasks")), 2)
+        self.assertEqual(len(self.rows("SELECT id FROM task_comments")), 2)
+
+    def test_resume_after_interruption(self):
+        path = self.write_file('tasks.json', [{'title': f'Задача {n}'} for n in range(1, 11)])
+
+        def interrupt(processed, total):
+            if processed >= 4:
+                raise Interrupted()
+
+        failed = self.manager.import_tasks(path, batch_size=2, progress_callback=interrupt, workers=1)
+        self.assertFalse(failed['success'])
+        self.assertEqual(len(self.rows("SELECT id FROM tasks")), 4)
+
+        resumed = self.manager.import_tasks(path, batch_size=2, workers=1)
+        self.assertTrue(resumed['success'])
+        self.assertEqual(resumed['resumed_from'], 4)
+        self.assertEqual(resumed['imported'], 10)
+        self.assertEqual(resumed['total'], 10)
+        titles = [row[0] for row in self.rows("SELECT title FROM tasks ORDER BY id")]
+        self.assertEqual(titles, [f'Задача {n}' for n in range(1, 11)])
+        self.assertEqual(self.rows("SELECT status FROM import_jobs"), [('completed',)])
+
+    def test_overwrite_replaces_fields_and_comments(self):
+        self.manager.import_tasks(self.write_file('old.json', [
+            {'title': 'Отчет', 'priority': 'low', 'comments': ['старый']},
+        ]))
+        result = self.manager.import_tasks(self.write_file('new.json', [
+            {'title': 'Отчет', 'priority': 'urgent', 'comments': ['новый']},
+            {'title': 'Отчет', 'priority': 'high'},
+        ]), conflict_resolution='overwrite')
+
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(self.rows("SELECT id, priority FROM tasks"), [(1, 'high')])
+        self.assertEqual(self.rows("SELECT comment FROM task_comments"), [])
+
+    def test_rename_adds_suffix(self):
+        self.manager.import_tasks(self.write_file('old.json', [{'title': 'Отчет'}]))
+        result = self.manager.import_tasks(self.write_file('new.json', [
+            {'title': 'Отчет', 'priority': 'high'},
+            {'title': 'Отчет', 'priority': 'low'},
+        ]), conflict_resolution='rename')
+
+        self.assertEqual(result['imported'], 2)
+        titles = [row[0] for row in self.rows("SELECT title FROM tasks ORDER BY id")]
+        self.assertEqual(titles, ['Отчет', 'Отчет (1)', 'Отчет (2)'])
+
+    def test_skip_keeps_existing(self):
+        self.manager.import_tasks(self.write_file('old.json', [{'title': 'Отчет', 'priority': 'low'}]))
+        result = self.manager.import_tasks(self.write_file('new.json', [
+            {'title': 'Отчет', 'priority': 'high'},
+        ]))
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['skipped'], 1)
+        self.assertEqual(self.rows("SELECT priority FROM tasks"), [('low',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты планировщика задач: история запусков и ручной запуск
+"""
+
+import os
+import threading
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from job_scheduler import JobScheduler, IntervalTrigger, IDLE
+from backup_scheduler import BackupScheduler
+
+
+class JobSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.scheduler = JobScheduler(os.path.join(self.workdir, 'tasks.db'))
+        self.results = [IDLE, 'done', IDLE]
+
+    def tearDown(self):
+        self.scheduler.stop(timeout=1)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def leader(self, is_leader):
+        return mock.patch('leader_election.get_leader_elector',
+                          return_value=SimpleNamespace(is_leader=is_leader))
+
+    def run_job(self):
+        return self.results.pop(0)
+
+    def wait_finished(self, name):
+        # Запись в историю идет после снятия флага running, ждем сам поток запуска
+        for thread in threading.enumerate():
+            if thread.name == f'job-{name}':
+                thread.join(timeout=2)
+
+    def test_idle_runs_are_not_recorded(self):
+        self.scheduler.add_job('sample', self.run_job, IntervalTrigger(3600))
+        with self.leader(True):
+            for _ in range(3):
+                self.assertTrue(self.scheduler.run_now('sample'))
+                self.wait_finished('sample')
+
+        history = self.scheduler.get_history('sample')
+        self.assertEqual([run['status'] for run in history], ['success'])
+        self.assertEqual(self.scheduler.get_job('sample').last_status, IDLE)
+
+    def test_run_now_requires_leadership(self):
+        self.scheduler.add_job('sample', self.run_job, IntervalTrigger(3600))
+        with self.leader(False):
+            self.assertFalse(self.scheduler.run_now('sample'))
+        self.assertEqual(self.results, [IDLE, 'done', IDLE])
+        self.assertEqual(self.scheduler.get_history('sample'), [])
+
+    def test_disabled_backup_run_is_idle(self):
+        backup = BackupScheduler.__new__(BackupScheduler)
+        with mock.patch.object(backup, 'update_config', create=True):
+            for running, enabled in ((True, False), (False, True)):
+                with self.subTest(running=running, enabled=enabled):
+                    backup.running, backup.enabled = running, enabled
+                    self.assertEqual(backup._scheduled_backup(), IDLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
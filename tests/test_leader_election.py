@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты выбора ведущего процесса (аренда в SQLite)
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from leader_election import LeaderElector
+
+# Короткая аренда, чтобы тесты не ждали ее истечения долго
+TTL_SECONDS = 0.3
+
+
+class LeaderElectionTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.db_path = os.path.join(self.workdir, 'tasks.db')
+        self.events = []
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def make_elector(self, label, enabled=True):
+        elector = LeaderElector(self.db_path, enabled=enabled, ttl_seconds=TTL_SECONDS, heartbeat_seconds=TTL_SECONDS / 3)
+        elector.on_elected(lambda: self.events.append((label, 'elected')))
+        elector.on_demoted(lambda: self.events.append((label, 'demoted')))
+        return elector
+
+    def test_only_one_holder(self):
+        first, second = self.make_elector('a'), self.make_elector('b')
+        self.assertTrue(first.try_acquire())
+        self.assertFalse(second.try_acquire())
+        # Продление своей аренды
+        self.assertTrue(first.try_acquire())
+        self.assertEqual(second.current_holder()['owner'], first.owner)
+
+    def test_takeover_after_expiry(self):
+        first, second = self.make_elector('a'), self.make_elector('b')
+        first._tick()
+        second._tick()
+        self.assertTrue(first.is_leader)
+        self.assertFalse(second.is_leader)
+
+        # Ведущий перестал продлевать аренду (завис или завершился)
+        time.sleep(TTL_SECONDS + 0.1)
+        self.assertIsNone(second.current_holder())
+        second._tick()
+        self.assertTrue(second.is_leader)
+
+        # Бывший ведущий узнает о потере аренды при следующей попытке продления
+        first._tick()
+        self.assertFalse(first.is_leader)
+        self.assertEqual(self.events, [('a', 'elected'), ('b', 'elected'), ('a', 'demoted')])
+
+    def test_release_hands_over_immediately(self):
+        first, second = self.make_elector('a'), self.make_elector('b')
+        self.assertTrue(first.try_acquire())
+        first.release()
+        self.assertTrue(second.try_acquire())
+
+    def test_stop_steps_down_and_releases(self):
+        first, second = self.make_elector('a'), self.make_elector('b')
+        first.start()
+        try:
+            self.assertTrue(first.is_leader)
+        finally:
+            first.stop()
+        self.assertFalse(first.is_leader)
+        self.assertEqual(self.events, [('a', 'elected'), ('a', 'demoted')])
+        self.assertTrue(second.try_acquire())
+
+    def test_background_renewal_keeps_lease(self):
+        first, second = self.make_elector('a'), self.make_elector('b')
+        first.start()
+        try:
+            time.sleep(TTL_SECONDS * 3)
+            self.assertFalse(second.try_acquire())
+            self.assertTrue(first.is_leader)
+        finally:
+            first.stop()
+
+    def test_disabled_election_is_always_leader(self):
+        elector = self.make_elector('a', enabled=False)
+        elector.start()
+        self.assertTrue(elector.is_leader)
+        elector.stop()
+        self.assertEqual(self.events, [('a', 'elected'), ('a', 'demoted')])
+
+
+if __name__ == '__main__':
+    unittest.main()
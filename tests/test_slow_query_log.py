@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты журнала медленных запросов
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import slow_query_log
+from slow_query_log import SlowQueryLog, fingerprint
+
+
+class SlowQueryLogTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='todolite_test_')
+        self.db_path = os.path.join(self.workdir, 'tasks.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT)")
+        conn.close()
+        self.log = SlowQueryLog(threshold_ms=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_fast_queries_are_ignored(self):
+        self.assertIsNone(self.log.record(self.db_path, "SELECT * FROM tasks", None, 0.001))
+        self.assertEqual(self.log.recent(), [])
+
+    def test_same_fingerprint_is_aggregated(self):
+        self.log.record(self.db_path, "SELECT * FROM tasks WHERE title = 'a'", None, 0.02)
+        self.log.record(self.db_path, "SELECT * FROM tasks WHERE title = 'bb'", None, 0.04)
+        top = self.log.top()
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0]['fingerprint'], fingerprint("SELECT * FROM tasks WHERE title = ?"))
+        self.assertEqual(top[0]['count'], 2)
+        self.assertEqual(top[0]['max_ms'], 40.0)
+        self.assertTrue(top[0]['full_scans'])
+
+    def test_plans_are_evicted_with_stats(self):
+        with mock.patch.object(slow_query_log, 'MAX_FINGERPRINTS', 3):
+            for width in range(1, 8):
+                columns = ', '.join(['title'] * width)
+                self.log.record(self.db_path, f"SELECT {columns} FROM tasks", None, 0.02)
+        self.assertEqual(len(self.log._stats), 3)
+        self.assertEqual(set(self.log._plans), set(self.log._stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
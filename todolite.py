@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ToDoLite - Запуск приложения на production WSGI-сервере
+
+    python -m todolite serve [--engine auto|waitress|gunicorn|werkzeug]
+                             [--host HOST] [--port PORT] [--workers N] [--threads N]
+                             [--no-schedulers]
+    python -m todolite dev     # сервер разработки Flask (debug, автоперезагрузка)
+    python -m todolite restore --at "2025-01-31 14:30"   # восстановление на момент времени
+
+Настройки сервера - секция server в config.json. Движок auto выбирает
+gunicorn для нескольких процессов (не Windows), иначе waitress, а если
+он не установлен - многопоточный сервер werkzeug.
+
+Фоновые планировщики работают в одном процессе, который выбирается
+арендой (leader_election.py): в процессе waitress/werkzeug, а у gunicorn -
+в одном из воркеров (каждый воркер после fork участвует в выборе; мастер
+потоков не запускает, поэтому воркеры не наследуют ни потоков, ни
+заполненного планировщика). Между несколькими серверами и треем
+планировщики распределяет тот же выбор ведущего. Для внешнего запуска
+(gunicorn todolite:application) планировщики не запускаются.
+"""
+
+import sys
+import argparse
+from datetime import datetime
+from logger import logger
+from config_manager import get_config_manager
+
+ENGINES = ('auto', 'waitress', 'gunicorn', 'werkzeug')
+
+
+def _load_application():
+    from app import app
+    return app
+
+
+def __getattr__(name):
+    # gunicorn todolite:application - приложение загружается при первом обращении
+    if name == 'application':
+        return _load_application()
+    raise AttributeError(name)
+
+
+def _is_available(module_name):
+    try:
+        __import__(module_name)
+        return True
+    except ImportError:
+        return False
+
+
+def choose_engine(settings):
+    """Выбирает WSGI-сервер с учетом настроек и установленных пакетов."""
+    engine = settings['engine']
+    if engine != 'auto':
+        if engine != 'werkzeug' and not _is_available(engine):
+            logger.warning(f"Сервер {engine} не установлен (pip install {engine}), используется werkzeug", "SERVER")
+            return 'werkzeug'
+        if engine == 'gunicorn' and sys.platform == 'win32':
+            logger.warning("gunicorn не работает в Windows, используется waitress/werkzeug", "SERVER")
+            return 'waitress' if _is_available('waitress') else 'werkzeug'
+        return engine
+    if settings['workers'] > 1 and sys.platform != 'win32' and _is_available('gunicorn'):
+        return 'gunicorn'
+    if _is_available('waitress'):
+        return 'waitress'
+    logger.warning("waitress не установлен (pip install waitress), используется многопоточный сервер werkzeug", "SERVER")
+    return 'werkzeug'
+
+
+def _journal_enabled():
+    try:
+        from backup_manager import BackupManager
+        return BackupManager().journal.enabled
+    except Exception:
+        return False
+
+
+def prepare_database():
+    """Схема, миграции и индексы - один раз до старта сервера."""
+    from app import init_db
+    logger.database("Инициализация базы данных", "DB_INIT")
+    init_db()
+    logger.success("База данных инициализирована", "DB_INIT")
+
+
+def _start_migration_scheduler():
+    try:
+        from category_migration_manager import get_migration_manager
+        migration_manager = get_migration_manager()
+        migration_manager.start_scheduler()
+        logger.success("Менеджер миграции категорий запущен", "MIGRATION")
+    except Exception as e:
+        logger.error(f"Ошибка запуска менеджера миграции категорий: {e}", "MIGRATION")
+
+
+def _stop_migration_scheduler():
+    try:
+        from category_migration_manager import get_migration_manager
+        get_migration_manager().stop_scheduler()
+    except Exception as e:
+        logger.error(f"Ошибка остановки менеджера миграции категорий: {e}", "MIGRATION")
+
+
+def _start_journal_shipping():
+    try:
+        from backup_scheduler import start_journal_shipping
+        start_journal_shipping()
+    except Exception as e:
+        logger.error(f"Ошибка запуска отгрузки журнала изменений: {e}", "JOURNAL")
+
+
+def _stop_journal_shipping():
+    try:
+        from backup_scheduler import stop_journal_shipping
+        stop_journal_shipping()
+    except Exception as e:
+        logger.error(f"Ошибка остановки отгрузки журнала изменений: {e}", "JOURNAL")
+
+
+def start_schedulers():
+    """
+    Участвует в выборе ведущего: планировщики приложения (миграция категорий,
+    отгрузка журнала изменений) работают, только пока этот процесс владеет арендой.
+    """
+    from leader_election import get_leader_elector
+    elector = get_leader_elector()
+    elector.on_elected(_start_migration_scheduler)
+    elector.on_elected(_start_journal_shipping)
+    elector.on_demoted(_stop_migration_scheduler)
+    elector.on_demoted(_stop_journal_shipping)
+    elector.start()
+
+
+def stop_schedulers():
+    from leader_election import get_leader_elector
+    get_leader_elector().stop()
+
+
+def serve_waitress(app, settings):
+    from waitress import serve
+    if settings['workers'] > 1:
+        logger.warning("waitress работает в одном процессе, workers игнорируется (используйте threads)", "SERVER")
+    serve(
+        app,
+        host=settings['host'],
+        port=settings['port'],
+        threads=settings['threads'],
+        backlog=settings['backlog'],
+        connection_limit=settings['connection_limit'],
+        channel_timeout=settings['timeout_seconds'],
+        ident='ToDoLite',
+    )
+
+
+def serve_gunicorn(app, settings, on_worker_start=None, on_worker_exit=None):
+    from gunicorn.app.base import BaseApplication
+
+    class ToDoLiteApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    def post_fork(server, worker):
+        # Воркер: потоки запускаются только после fork, мастер остается без потоков
+        if on_worker_start:
+            on_worker_start()
+
+    def worker_exit(server, worker):
+        # Освобождаем аренду сразу, чтобы ее подхватил другой воркер
+        if on_worker_exit:
+            on_worker_exit()
+
+    ToDoLiteApplication({
+        'bind': f"{settings['host']}:{settings['port']}",
+        'workers': settings['workers'],
+        'threads': settings['threads'],
+        'worker_class': 'gthread' if settings['threads'] > 1 else 'sync',
+        'keepalive': settings['keepalive_seconds'],
+        'backlog': settings['backlog'],
+        'worker_connections': settings['connection_limit'],
+        'timeout': settings['timeout_seconds'],
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }).run()
+
+
+def serve_werkzeug(app, settings):
+    from werkzeug.serving import make_server
+    if settings['workers'] > 1:
+        logger.warning("Сервер werkzeug работает в одном процессе, workers игнорируется", "SERVER")
+    server = make_server(settings['host'], settings['port'], app, threaded=True)
+    # Очередь ожидающих соединений (по умолчанию в werkzeug - 128)
+    server.socket.listen(settings['backlog'])
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def get_server_settings(args=None):
+    """Настройки сервера: config.json, поверх - аргументы командной строки."""
+    settings = get_config_manager().get_server_config()
+    for key in ('host', 'port', 'engine', 'workers', 'threads'):
+        value = getattr(args, key, None) if args is not None else None
+        if value is not None:
+            settings[key] = value
+    if args is not None and args.no_schedulers:
+        settings['run_schedulers'] = False
+    for key in ('port', 'workers', 'threads', 'keepalive_seconds', 'backlog', 'connection_limit', 'timeout_seconds'):
+        settings[key] = max(1, int(settings[key]))
+    return settings
+
+
+def cmd_serve(args):
+    settings = get_server_settings(args)
+    engine = choose_engine(settings)
+
+    prepare_database()
+    app = _load_application()
+
+    logger.http(
+        f"Запуск сервера {engine} на http://{settings['host']}:{settings['port']} "
+        f"(процессов: {settings['workers'] if engine == 'gunicorn' else 1}, потоков: {settings['threads']})",
+        "SERVER_START"
+    )
+
+    run_schedulers = settings['run_schedulers']
+    if not run_schedulers and _journal_enabled():
+        logger.warning("Журнал изменений включен, но планировщики отключены (--no-schedulers): "
+                       "журнал отгружается только ведущим процессом (трей или другой сервер)", "JOURNAL")
+    try:
+        if engine == 'gunicorn':
+            # Планировщики запускаются в воркерах; в мастере stop_schedulers ничего не делает
+            serve_gunicorn(app, settings,
+                           on_worker_start=start_schedulers if run_schedulers else None,
+                           on_worker_exit=stop_schedulers if run_schedulers else None)
+        else:
+            if run_schedulers:
+                start_schedulers()
+            if engine == 'waitress':
+                serve_waitress(app, settings)
+            else:
+                serve_werkzeug(app, settings)
+    except KeyboardInterrupt:
+        logger.warning("Сервер остановлен", "SERVER")
+    finally:
+        if run_schedulers:
+            stop_schedulers()
+    return 0
+
+
+def cmd_dev(args):
+    """Сервер разработки Flask, как python app.py."""
+    settings = get_server_settings(args)
+    prepare_database()
+    app = _load_application()
+    start_schedulers()
+    logger.http(f"Запуск Flask сервера на http://{settings['host']}:{settings['port']}", "SERVER_START")
+    # Без автоперезагрузки: иначе планировщики запускаются во втором процессе
+    app.run(debug=True, host=settings['host'], port=settings['port'], use_reloader=False)
+    return 0
+
+
+def cmd_restore(args):
+    """
+    Восстановление БД на момент времени: последний снимок до него и журнал
+    изменений поверх. Сервер и трей на время восстановления нужно остановить.
+    """
+    try:
+        target_time = datetime.fromisoformat(args.at)
+    except ValueError:
+        logger.error(f"Некорректный момент времени: {args.at} (ожидается YYYY-MM-DD HH:MM[:SS])", "BACKUP")
+        return 2
+    if target_time > datetime.now():
+        logger.error(f"Момент восстановления в будущем: {target_time}", "BACKUP")
+        return 2
+
+    from backup_manager import BackupManager
+    backup_manager = BackupManager()
+    if not backup_manager.journal.enabled:
+        logger.warning("Журнал изменений отключен (backup.journal.enabled): восстановление только на момент снимка", "BACKUP")
+    if not backup_manager.restore_to_point_in_time(target_time):
+        logger.error(f"Не удалось восстановить БД на {target_time}", "BACKUP")
+        return 1
+    logger.success(f"БД восстановлена на {target_time}", "BACKUP")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m todolite', description="ToDoLite")
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help="Запуск на production WSGI-сервере")
+    serve_parser.add_argument('--engine', choices=ENGINES, help="WSGI-сервер (по умолчанию server.engine)")
+    serve_parser.add_argument('--host', help="Адрес (по умолчанию server.host)")
+    serve_parser.add_argument('--port', type=int, help="Порт (по умолчанию server.port)")
+    serve_parser.add_argument('--workers', type=int, help="Процессов (gunicorn)")
+    serve_parser.add_argument('--threads', type=int, help="Потоков на процесс")
+    serve_parser.add_argument('--no-schedulers', action='store_true',
+                              help="Не запускать фоновые планировщики (их запускает другой процесс, например трей)")
+    serve_parser.set_defaults(handler=cmd_serve)
+
+    dev_parser = subparsers.add_parser('dev', help="Сервер разработки Flask (debug)")
+    dev_parser.add_argument('--host', help="Адрес (по умолчанию server.host)")
+    dev_parser.add_argument('--port', type=int, help="Порт (по умолчанию server.port)")
+    dev_parser.set_defaults(handler=cmd_dev, engine=None, workers=None, threads=None, no_schedulers=False)
+
+    restore_parser = subparsers.add_parser(
+        'restore', help="Восстановление БД на момент времени (снимок + журнал изменений); сервер должен быть остановлен")
+    restore_parser.add_argument('--at', required=True, help="Локальное время: YYYY-MM-DD HH:MM[:SS]")
+    restore_parser.set_defaults(handler=cmd_restore)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'handler', None):
+        parser.print_help()
+        return 0
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,10 +11,11 @@ from tkinter import scrolledtext
 import webbrowser
 from logger import logger
 from notifications_windows import register_tray_icon, notify, set_app_id
+from leader_election import get_leader_elector
 
 # Импортируем систему резервного копирования
 try:
-    from backup_scheduler import start_backup_scheduler, get_backup_scheduler
+    from backup_scheduler import start_backup_scheduler, get_backup_scheduler, start_journal_shipping, stop_journal_shipping
     from backup_manager import BackupManager
     from export_manager import ExportManager
     from import_manager import ImportManager
@@ -39,6 +40,7 @@ class TaskManagerTray:
         self.console_text = None
         self.is_console_visible = False
         self.is_server_running = False
+        self.leader_elector = None
         
         # Инициализируем менеджеры резервного копирования и экспорта/импорта
         if BACKUP_AVAILABLE:
@@ -197,9 +199,10 @@ class TaskManagerTray:
         try:
             self.log_message("Запуск сервера...")
             
-            # Запускаем сервер в отдельном процессе без консоли
+            # Запускаем сервер в отдельном процессе без консоли.
+            # Планировщики работают в процессе трея, поэтому серверу они не нужны
             self.server_process = subprocess.Popen(
-                [sys.executable, "app.py"],
+                [sys.executable, "todolite.py", "serve", "--no-schedulers"],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
@@ -353,10 +356,37 @@ class TaskManagerTray:
         except Exception as e:
             self.log_message(f"Ошибка проверки напоминаний: {e}")
     
-    def quit_app(self, icon=None, item=None):
-        """Завершает работу приложения"""
-        self.log_message("Завершение работы...")
+    def start_schedulers(self):
+        """Запускает фоновые планировщики (вызывается, когда трей стал ведущим процессом)"""
+        # Запускаем планировщик резервного копирования
+        if BACKUP_AVAILABLE:
+            try:
+                start_backup_scheduler()
+                self.log_message("Планировщик резервного копирования запущен")
+            except Exception as e:
+                self.log_message(f"Ошибка запуска планировщика резервного копирования: {e}")
+            
+            # Отгрузка журнала изменений (не зависит от включения резервного копирования)
+            start_journal_shipping()
+            
+            # Запускаем планировщик напоминаний
+            try:
+                start_reminder_scheduler()
+                self.log_message("Планировщик напоминаний запущен")
+            except Exception as e:
+                self.log_message(f"Ошибка запуска планировщика напоминаний: {e}")
         
+        # Запускаем менеджер миграции категорий
+        if MIGRATION_AVAILABLE:
+            try:
+                migration_manager = get_migration_manager()
+                migration_manager.start_scheduler()
+                self.log_message("Менеджер миграции категорий запущен")
+            except Exception as e:
+                self.log_message(f"Ошибка запуска менеджера миграции категорий: {e}")
+    
+    def stop_schedulers(self):
+        """Останавливает фоновые планировщики (трей перестал быть ведущим или завершается)"""
         # Останавливаем планировщик резервного копирования
         if BACKUP_AVAILABLE:
             try:
@@ -366,6 +396,8 @@ class TaskManagerTray:
             except Exception as e:
                 self.log_message(f"Ошибка остановки планировщика резервного копирования: {e}")
             
+            stop_journal_shipping()
+            
             # Останавливаем планировщик напоминаний
             try:
                 stop_reminder_scheduler()
@@ -381,6 +413,17 @@ class TaskManagerTray:
                 self.log_message("Менеджер миграции категорий остановлен")
             except Exception as e:
                 self.log_message(f"Ошибка остановки менеджера миграции категорий: {e}")
+    
+    def quit_app(self, icon=None, item=None):
+        """Завершает работу приложения"""
+        self.log_message("Завершение работы...")
+        
+        # Останавливаем планировщики и освобождаем аренду ведущего
+        if self.leader_elector:
+            try:
+                self.leader_elector.stop()
+            except Exception as e:
+                self.log_message(f"Ошибка остановки планировщиков: {e}")
         
         # Останавливаем сервер если запущен
         if self.is_server_running:
@@ -445,29 +488,14 @@ class TaskManagerTray:
             except Exception as e:
                 self.log_message(f"Ошибка восстановления БД на старте: {e}")
 
-            # Запускаем планировщик резервного копирования
-            if BACKUP_AVAILABLE:
-                try:
-                    start_backup_scheduler()
-                    self.log_message("Планировщик резервного копирования запущен")
-                except Exception as e:
-                    self.log_message(f"Ошибка запуска планировщика резервного копирования: {e}")
-                
-                # Запускаем планировщик напоминаний
-                try:
-                    start_reminder_scheduler()
-                    self.log_message("Планировщик напоминаний запущен")
-                except Exception as e:
-                    self.log_message(f"Ошибка запуска планировщика напоминаний: {e}")
-            
-            # Запускаем менеджер миграции категорий
-            if MIGRATION_AVAILABLE:
-                try:
-                    migration_manager = get_migration_manager()
-                    migration_manager.start_scheduler()
-                    self.log_message("Менеджер миграции категорий запущен")
-                except Exception as e:
-                    self.log_message(f"Ошибка запуска менеджера миграции категорий: {e}")
+            # Планировщики запускаются, только если трей станет ведущим процессом
+            try:
+                self.leader_elector = get_leader_elector()
+                self.leader_elector.on_elected(self.start_schedulers)
+                self.leader_elector.on_demoted(self.stop_schedulers)
+                self.leader_elector.start()
+            except Exception as e:
+                self.log_message(f"Ошибка выбора ведущего процесса: {e}")
         
         # Автоматически запускаем сервер
         self.start_server()